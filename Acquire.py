@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 16:12:44 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import re
+import glob
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from DataStore import check_spacecraft
+from Metrics import metrics
+
+# CDAWeb datasets of each spacecraft, as (IMF, plasma) or a single combined one
+DATASETS = {'ACE': ('ac_h0_mfi', 'ac_h0_swe'),
+            'STA': ('sta_l2_magplasma_1m',),
+            'STB': ('stb_l2_magplasma_1m',)}
+
+def fetch_dataset(dataset, start, end):
+    """
+    Download the CDF files of a CDAWeb dataset covering a period.
+
+    Parameters
+    ----------
+    dataset : string
+        CDAWeb dataset, e.g. 'ac_h0_mfi'.
+    start : datetime
+        Start time of observed period.
+    end : datetime
+        End time of observed period.
+
+    Returns
+    -------
+    downloaded_files : list
+        Paths of the downloaded files.
+    """
+    from sunpy.net import Fido
+    from sunpy.net import attrs as a
+    spacecraft = 'ACE' if dataset.startswith('ac_') else dataset[:3].upper()
+    with metrics.timer('fetch_seconds', spacecraft=spacecraft, dataset=dataset):
+        result = Fido.search(a.Time(start, end), getattr(a.cdaweb.Dataset, dataset))
+        downloaded_files = Fido.fetch(result, progress=False)
+    return list(downloaded_files)
+
+class LocalCDF():
+    def __init__(self, folder, latency=0.0):
+        """
+        Initializes a stand-in for fetch_dataset serving CDF files from disk.
+
+        Files are looked up recursively in folder by their CDAWeb name,
+        e.g. "ac_h0_mfi_20150317_v06.cdf", so a folder filled by Fido.fetch
+        can be reused offline.
+
+        Parameters
+        ----------
+        folder : string
+            Folder with the CDF files.
+        latency : float, optional
+            Seconds slept per request, to emulate the network. The default is 0.0.
+        """
+        self.folder = folder
+        self.latency = latency
+
+    def __call__(self, dataset, start, end):
+        """
+        Parameters
+        ----------
+        dataset : string
+            CDAWeb dataset, e.g. 'ac_h0_mfi'.
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        files : list
+            Files of the dataset for the days of the period, sorted by date.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        first = start.strftime('%Y%m%d')
+        last = end.strftime('%Y%m%d')
+        files = []
+        for path in glob.glob(os.path.join(self.folder, '**', dataset + '_*.cdf'), recursive=True):
+            match = re.match(re.escape(dataset) + r'_(\d{8})', os.path.basename(path))
+            if match and first <= match.group(1) <= last:
+                files.append(path)
+        if not files:
+            raise Exception("No " + dataset + " files between " + first + " and " + last + " in " + self.folder + ".")
+        return sorted(files)
+
+def to_frames(spacecraft, files, start, end):
+    """
+    Parameters
+    ----------
+    spacecraft : string
+        Either "ACE", "STA" or "STB".
+    files : list
+        List of downloaded files of each dataset of DATASETS[spacecraft].
+    start : datetime
+        Start time of observed period.
+    end : datetime
+        End time of observed period.
+
+    Returns
+    -------
+    IMF_df : pd.DataFrame
+        DataFrame of shape (n, 1) with column "BTOTAL".
+    plasma_df : pd.DataFrame
+        DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+    """
+    if spacecraft == 'ACE':
+        from ACE import to_IMF_df, to_plasma_df
+        return to_IMF_df(files[0], start, end), to_plasma_df(files[1], start, end)
+    from STEREO import to_STEREO_dfs
+    return to_STEREO_dfs(files[0], start, end)
+
+class Acquirer():
+    def __init__(self, downloader=fetch_dataset, max_in_flight=4):
+        """
+        Initializes a concurrent downloader of ACE and STEREO series.
+
+        The datasets of a request (MFI and SWE for ACE) are downloaded at the
+        same time in a thread pool of max_in_flight threads, which caps the
+        number of requests in flight across every caller, and are then
+        converted to DataFrames in a second pool, so that a slow conversion
+        never holds a download slot.
+
+        Parameters
+        ----------
+        downloader : callable, optional
+            Function downloader(dataset, start, end) returning the CDF files.
+            A LocalCDF instance can be given for tests. The default is
+            fetch_dataset (CDAWeb).
+        max_in_flight : int, optional
+            Largest number of downloads running at the same time.
+            The default is 4.
+        """
+        self.downloader = downloader
+        self.max_in_flight = max_in_flight
+        self._io = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='acquire-io')
+        self._parse = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='acquire-parse')
+
+    def submit(self, spacecraft, start, end):
+        """
+        Start the download of a period.
+
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Resolves to (IMF_df, plasma_df).
+        """
+        sc = check_spacecraft(spacecraft)
+        downloads = [self._io.submit(self.downloader, dataset, start, end) for dataset in DATASETS[sc]]
+        return self._parse.submit(lambda: to_frames(sc, [d.result() for d in downloads], start, end))
+
+    def fetch(self, spacecraft, start, end):
+        """
+        Download a period, with its datasets fetched concurrently.
+
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        return self.submit(spacecraft, start, end).result()
+
+    # same signature as DataStore.download, so an Acquirer can be the fetch of a SeriesStore
+    __call__ = fetch
+
+    async def afetch(self, spacecraft, start, end):
+        """
+        Coroutine version of fetch, for use in an asyncio event loop.
+
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        return await asyncio.wrap_future(self.submit(spacecraft, start, end))
+
+    def prefetch(self, spacecraft, periods, ahead=1):
+        """
+        Download a sequence of periods, keeping the next ones in flight while
+        the current one is processed by the caller.
+
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        periods : iterable
+            (start, end) tuples, consumed lazily.
+        ahead : int, optional
+            Number of periods downloaded ahead of the one being consumed.
+            The default is 1.
+
+        Yields
+        ------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        pending = deque()
+        try:
+            for start, end in periods:
+                pending.append(self.submit(spacecraft, start, end))
+                if len(pending) > ahead:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def days(self, spacecraft, start, end, ahead=1):
+        """
+        Download a long period one day at a time, as in DataStore.SeriesStore,
+        with the following days prefetched.
+
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of the period.
+        end : datetime
+            End time of the period.
+        ahead : int, optional
+            Number of days downloaded ahead. The default is 1.
+
+        Yields
+        ------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        def periods():
+            day = datetime(start.year, start.month, start.day)
+            while day <= end:
+                yield max(day, start), min(day + timedelta(days=1) - timedelta(microseconds=1), end)
+                day += timedelta(days=1)
+        return self.prefetch(spacecraft, periods(), ahead=ahead)
+
+    def close(self):
+        """
+        Stop the threads, after the pending downloads.
+
+        Returns
+        -------
+        None
+        """
+        self._io.shutdown()
+        self._parse.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# process-wide acquirer used by Get_ACE_data and Get_STEREO_data
+acquirer = Acquirer()
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:37:21 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import check_spacecraft, load_series
+from Render import render_window, window_bounds
+
+def read_jobs(path):
+    """
+    Parameters
+    ----------
+    path : string
+        CSV or Parquet file with columns 'time' (window centre),
+        'spacecraft' ("ACE", "STA" or "STB") and 'horizon' ("20m", "30m",
+        "60m" or "120m").
+
+    Returns
+    -------
+    jobs : pd.DataFrame
+        Columns 'time' (datetime), 'spacecraft' (upper case) and 'horizon',
+        in the order of the file.
+    """
+    jobs = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    missing = {'time', 'spacecraft', 'horizon'} - set(jobs.columns)
+    if missing:
+        raise Exception("The job list has no " + ', '.join(sorted(missing)) + " column.")
+    jobs = jobs[['time', 'spacecraft', 'horizon']].copy()
+    jobs['time'] = pd.to_datetime(jobs['time'])
+    jobs['spacecraft'] = [check_spacecraft(sc) for sc in jobs['spacecraft']]
+    jobs['horizon'] = jobs['horizon'].astype(str)
+    for horizon in jobs['horizon'].unique():
+        if horizon not in TIME_WINDOWS:
+            raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizon' column.")
+    return jobs.reset_index(drop=True)
+
+def jobs_hash(jobs):
+    """
+    Parameters
+    ----------
+    jobs : pd.DataFrame
+        DataFrame returned by read_jobs.
+
+    Returns
+    -------
+    digest : string
+        Hash of the content of the job list, stored in the checkpoint.
+    """
+    return hashlib.sha1(pd.util.hash_pandas_object(jobs, index=True).values.tobytes()).hexdigest()
+
+def _load_windows(rows, store):
+    # series of every job of a chunk, or the error that prevented loading it;
+    # the jobs of a spacecraft and day share a single load of their span
+    bounds = {index: window_bounds(row['time'].to_pydatetime(), TIME_WINDOWS[row['horizon']])
+              for index, row in rows.iterrows()}
+    groups = {}
+    for index, row in rows.iterrows():
+        groups.setdefault((row['spacecraft'], row['time'].date()), []).append(index)
+
+    windows = {}
+    for (sc, _), indices in groups.items():
+        start = min(bounds[i][0] for i in indices)
+        end = max(bounds[i][1] for i in indices)
+        try:
+            frames = load_series(sc, start, end, store=store)
+        except Exception:
+            # tell apart the jobs that can be served from those that fail
+            frames = None
+        for index in indices:
+            s, e = bounds[index]
+            try:
+                df_b, df_p = frames if frames is not None else load_series(sc, s, e, store=store)
+                windows[index] = (index, (df_b.loc[s:e], df_p.loc[s:e], s, e), None)
+            except Exception as error:
+                windows[index] = (index, None, str(error))
+    return [windows[index] for index in rows.index]
+
+class BatchRunner():
+    def __init__(self, output, store=None, registry=None, chunk_size=1024, batch_size=32, pool=None,
+                 renderer=render_window, output_format='parquet'):
+        """
+        Initializes a resumable runner of classification jobs.
+
+        Jobs are processed in chunks. The series of the next chunk are
+        loaded in a background thread while the current chunk is rendered
+        (in the pool if given) and classified in batches, horizon by
+        horizon. Each chunk is written as one part of the output
+        (output/part-NNNNN.parquet), then the checkpoint
+        (output/checkpoint.json) is updated, so an interrupted run resumes
+        after the last written part.
+
+        Parameters
+        ----------
+        output : string
+            Output folder.
+        store : DataStore.SeriesStore, optional
+            Store (or DataSource.DataSource) serving the series.
+            The default is None (download from CDAWeb).
+        registry : Registry.ModelRegistry, optional
+            Registry providing the models. The default is Registry.registry.
+        chunk_size : int, optional
+            Number of jobs per chunk and output part. The default is 1024.
+        batch_size : int, optional
+            Number of windows classified at a time. The default is 32.
+        pool : RenderPool.RenderPool, optional
+            Pool of worker processes rendering the windows. The default is None.
+        renderer : callable, optional
+            Function renderer(df_b, df_p, s, e) used without a pool.
+            The default is Render.render_window.
+        output_format : string, optional
+            'parquet' or 'csv'. The default is 'parquet'.
+        """
+        if output_format not in ('parquet', 'csv'):
+            raise Exception("Only 'parquet' or 'csv' are valid values for 'output_format' parameter.")
+        if registry is None:
+            from Registry import registry
+        self.output = output
+        self.store = store
+        self.registry = registry
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.pool = pool
+        self.renderer = renderer
+        self.output_format = output_format
+        self.checkpoint = os.path.join(output, 'checkpoint.json')
+
+    def state(self):
+        """
+        Returns
+        -------
+        state : dict
+            'done' (jobs written), 'parts' (parts written), 'failed' (jobs
+            whose data could not be loaded or rendered, with their error in
+            the parts) and 'jobs' (jobs_hash of the job list, or None).
+        """
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                return json.load(f)
+        return {'done': 0, 'parts': 0, 'failed': 0, 'jobs': None}
+
+    def _save_state(self, state):
+        with open(self.checkpoint + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.checkpoint + '.tmp', self.checkpoint)
+
+    def _write_part(self, part, table):
+        path = os.path.join(self.output, 'part-%05d.%s' % (part, self.output_format))
+        if self.output_format == 'parquet':
+            table.to_parquet(path + '.tmp', index=False)
+        else:
+            table.to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    def _render(self, selected, errors):
+        # rendered (index, image) pairs; a failing window is recorded in errors
+        done = 0
+        if self.pool is not None:
+            try:
+                for (index, _), image in zip(selected, self.pool.imap(window for _, window in selected)):
+                    done += 1
+                    yield index, image
+            except Exception:
+                # the pool stops at the first failure; the rest is rendered here
+                pass
+        for index, window in selected[done:]:
+            try:
+                image = self.renderer(*window)
+            except Exception as error:
+                errors[index] = str(error)
+                continue
+            yield index, image
+
+    def _classify(self, rows, windows):
+        outputs = {}
+        errors = {index: error for index, _, error in windows}
+        for horizon in rows['horizon'].unique():
+            selected = [(index, window) for index, window, error in windows
+                        if error is None and rows.at[index, 'horizon'] == horizon]
+            if not selected:
+                continue
+            # images are rendered lazily and classified batch_size at a time;
+            # indices are queued as their images are consumed
+            indices = deque()
+            def images():
+                for index, image in self._render(selected, errors):
+                    indices.append(index)
+                    yield image
+            with self.registry.use(horizon) as model:
+                for output in model.iter_predict_batch(images(), batch_size=self.batch_size):
+                    for row in output:
+                        outputs[indices.popleft()] = row
+
+        table = rows.copy()
+        probs = np.full((len(rows), 3), np.nan, dtype=np.float32)
+        for k, index in enumerate(rows.index):
+            if index in outputs:
+                probs[k] = outputs[index]
+        table.insert(0, 'job', rows.index)
+        table['prob_neg'], table['prob_ff'], table['prob_fr'] = probs[:, 0], probs[:, 1], probs[:, 2]
+        table['label'] = [LABELS[int(np.argmax(p))] if np.isfinite(p).all() else None for p in probs]
+        table['error'] = [errors[index] for index in rows.index]
+        return table
+
+    def run(self, jobs, verbose=False):
+        """
+        Parameters
+        ----------
+        jobs : string or pd.DataFrame
+            Job file or the DataFrame returned by read_jobs.
+        verbose : bool, optional
+            If True, print the progress after each part. The default is False.
+
+        Returns
+        -------
+        state : dict
+            Final state, see 'state'.
+        """
+        if isinstance(jobs, str):
+            jobs = read_jobs(jobs)
+        os.makedirs(self.output, exist_ok=True)
+        state = self.state()
+        digest = jobs_hash(jobs)
+        if state['done'] and state.get('jobs') != digest:
+            raise Exception("The checkpoint " + self.checkpoint + " was written for another job list.")
+        state['jobs'] = digest
+        starts = list(range(state['done'], len(jobs), self.chunk_size))
+        chunks = [jobs.iloc[start:start + self.chunk_size] for start in starts]
+
+        with ThreadPoolExecutor(max_workers=1) as loader:
+            pending = loader.submit(_load_windows, chunks[0], self.store) if chunks else None
+            for k, rows in enumerate(chunks):
+                windows = pending.result()
+                if k + 1 < len(chunks):
+                    pending = loader.submit(_load_windows, chunks[k + 1], self.store)
+                table = self._classify(rows, windows)
+                self._write_part(state['parts'], table)
+                state = {'done': int(rows.index[-1]) + 1, 'parts': state['parts'] + 1,
+                         'failed': state['failed'] + int(table['error'].notna().sum()), 'jobs': digest}
+                self._save_state(state)
+                if verbose:
+                    print(state['done'], '/', len(jobs), 'jobs,', state['failed'], 'failed')
+        return state
+
+def read_results(output):
+    """
+    Parameters
+    ----------
+    output : string
+        Output folder of a BatchRunner.
+
+    Returns
+    -------
+    results : pd.DataFrame
+        Every part written so far, in job order.
+    """
+    parts = sorted(p for p in os.listdir(output) if p.startswith('part-') and not p.endswith('.tmp'))
+    read = lambda p: pd.read_parquet(os.path.join(output, p)) if p.endswith('.parquet') else pd.read_csv(os.path.join(output, p))
+    return pd.concat([read(p) for p in parts], ignore_index=True) if parts else pd.DataFrame()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Classify a list of (time, spacecraft, horizon) jobs, resumably.')
+    parser.add_argument('jobs', help='CSV or Parquet file with time, spacecraft and horizon columns.')
+    parser.add_argument('output', help='Output folder (parts and checkpoint).')
+    parser.add_argument('--store', default='Data', help='Folder of the DataStore.SeriesStore.')
+    parser.add_argument('--cdf', default=None, help='Fill the store from local CDF files instead of CDAWeb.')
+    parser.add_argument('--archive', default=None, help='Read an archive written by DataSource.write_archive instead of a store.')
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Rendering processes; 0 renders in-process.')
+    parser.add_argument('--renderer', choices=['matplotlib', 'raster'], default='matplotlib')
+    parser.add_argument('--threads', type=int, default=None, help='TensorFlow intra-op threads.')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+    if args.archive is not None:
+        from DataSource import ArchiveSource
+        store = ArchiveSource(args.archive)
+    else:
+        from DataStore import SeriesStore, download
+        fetch = download
+        if args.cdf is not None:
+            from DataSource import LocalCDFSource
+            fetch = LocalCDFSource(args.cdf)
+        store = SeriesStore(args.store, fetch=fetch)
+
+    if args.renderer == 'raster':
+        from Raster import rasterize_window as renderer
+    else:
+        renderer = render_window
+    pool = None
+    if args.workers:
+        from RenderPool import RenderPool
+        pool = RenderPool(workers=args.workers, renderer=args.renderer)
+    try:
+        runner = BatchRunner(args.output, store=store, chunk_size=args.chunk_size, batch_size=args.batch_size,
+                             pool=pool, renderer=renderer, output_format=args.format)
+        state = runner.run(args.jobs, verbose=True)
+    finally:
+        if pool is not None:
+            pool.close()
+    print('Done:', state)
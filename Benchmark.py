@@ -0,0 +1,788 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:04:37 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+
+CASE_STUDIES = 'Case studies'
+CASE_LABELS = {datetime(2015, 3, 17, 4, 5): 1,   # FF shock seen by ACE
+               datetime(2016, 7, 22, 23, 12): 2} # FR shock seen by STEREO-A
+SPACECRAFT_NAMES = {'ACE': 'ACE', 'STEREO-A': 'STA', 'STEREO-B': 'STB'}
+
+def case_studies(folder=CASE_STUDIES):
+    """
+    List the windows saved in the case studies folder.
+
+    Parameters
+    ----------
+    folder : string, optional
+        Folder with files named "<spacecraft> <minutes> <%Y-%m-%d %H-%M-%S>.png",
+        as written by Example.py. The default is 'Case studies'.
+
+    Returns
+    -------
+    cases : list
+        One dict per image, with keys 'path', 'spacecraft' ("ACE", "STA"
+        or "STB"), 'horizon' (e.g. "30m"), 'date' (datetime) and 'label'
+        (0 Neg, 1 FF, 2 FR, or None if unknown).
+    """
+    pattern = re.compile(r'^(ACE|STEREO-A|STEREO-B) (\d+) (\d{4}-\d{2}-\d{2} \d{2}-\d{2}-\d{2})\.png$')
+    cases = []
+    for name in sorted(os.listdir(folder)):
+        match = pattern.match(name)
+        if match is None:
+            continue
+        date = datetime.strptime(match.group(3), '%Y-%m-%d %H-%M-%S')
+        cases.append({'path': os.path.join(folder, name),
+                      'spacecraft': SPACECRAFT_NAMES[match.group(1)],
+                      'horizon': match.group(2) + 'm',
+                      'date': date,
+                      'label': CASE_LABELS.get(date)})
+    return cases
+
+def _timed(function, *args, **kwargs):
+    t0 = time.perf_counter()
+    output = function(*args, **kwargs)
+    return output, time.perf_counter() - t0
+
+def raster_fidelity(cases=None, store=None, dpi=512, with_models=True):
+    """
+    Compare Raster.rasterize_window with the matplotlib renderer
+    (Render.render_window) on the case studies windows.
+
+    Parameters
+    ----------
+    cases : list, optional
+        Cases as returned by case_studies. The default is every case study.
+    store : DataStore.SeriesStore, optional
+        Store the series are read from. If None, they are downloaded.
+        The default is None.
+    dpi : int, optional
+        Resolution of the NumPy rasterizer. The default is 512.
+    with_models : bool, optional
+        Also compare the outputs of the IPSRNet instances. The default is True.
+
+    Returns
+    -------
+    results : list
+        One dict per case with render times, pixel statistics at the model
+        input size (mean and max absolute difference, correlation, ink
+        fraction of both images) and, if with_models, both model outputs.
+    """
+    import cv2
+    from IPSRNet import MODELS, TIME_WINDOWS
+    from DataStore import load_series
+    from Render import render_window, window_bounds
+    from Raster import rasterize_window
+
+    if cases is None:
+        cases = case_studies()
+
+    results = []
+    for case in cases:
+        horizon = case['horizon']
+        s, e = window_bounds(case['date'], TIME_WINDOWS[horizon])
+        df_b, df_p = load_series(case['spacecraft'], s, e, store=store)
+
+        reference, t_reference = _timed(render_window, df_b, df_p, s, e)
+        fast, t_fast = _timed(rasterize_window, df_b, df_p, s, e, dpi=dpi)
+
+        result = {'path': case['path'], 'horizon': horizon,
+                  'matplotlib_seconds': t_reference, 'raster_seconds': t_fast}
+        if with_models:
+            from Registry import get_model
+            model = get_model(horizon)
+        else:
+            model = MODELS[horizon]
+        size = model.target_size
+        a = cv2.resize(reference, size, interpolation=cv2.INTER_AREA).astype(np.float64)
+        b = cv2.resize(fast, size, interpolation=cv2.INTER_AREA).astype(np.float64)
+        result['mean_abs_diff'] = float(np.abs(a - b).mean())
+        result['max_abs_diff'] = float(np.abs(a - b).max())
+        result['correlation'] = float(np.corrcoef(a.ravel(), b.ravel())[0, 1])
+        result['ink_matplotlib'] = float((a < 128).mean())
+        result['ink_raster'] = float((b < 128).mean())
+
+        if with_models:
+            outputs = model.predict_batch([reference, fast], batch_size=2)
+            result['output_matplotlib'] = outputs[0].tolist()
+            result['output_raster'] = outputs[1].tolist()
+            result['output_max_abs_diff'] = float(np.abs(outputs[0] - outputs[1]).max())
+            result['same_class'] = bool(np.argmax(outputs[0]) == np.argmax(outputs[1]))
+        results.append(result)
+    return results
+
+def _percentiles(seconds):
+    seconds = np.asarray(seconds)
+    return {'p50': float(np.percentile(seconds, 50)), 'p90': float(np.percentile(seconds, 90)),
+            'p99': float(np.percentile(seconds, 99)), 'mean': float(seconds.mean())}
+
+def _latency(function, repeats=20, warmup=2):
+    for _ in range(warmup):
+        function()
+    seconds = []
+    for _ in range(repeats):
+        seconds.append(_timed(function)[1])
+    return _percentiles(seconds)
+
+def scores(outputs, labels):
+    """
+    Parameters
+    ----------
+    outputs : array
+        Array of shape (N, 3) with the outputs of a model.
+    labels : array
+        True class of each sample (0 Neg, 1 FF, 2 FR).
+
+    Returns
+    -------
+    scores : dict
+        'recall' of each class present, 'missing' (classes without
+        samples) and 'TSS' and 'macroRecall' from Utils, computed on the
+        whole set. TSS and macroRecall are None unless every class has
+        samples, since the recall of a missing class reads as 0 (e.g. the
+        case studies have no negatives).
+    """
+    from Utils import TSS, macroRecall
+    labels = np.asarray(labels)
+    y_true = np.eye(3, dtype=np.float32)[labels]
+    y_pred = np.asarray(outputs, dtype=np.float32)
+    predicted = y_pred.argmax(axis=1)
+    names = ['Neg', 'FF', 'FR']
+    result = {'recall': {names[c]: float((predicted[labels == c] == c).mean()) for c in range(3) if (labels == c).any()},
+              'missing': [names[c] for c in range(3) if not (labels == c).any()],
+              'TSS': None, 'macroRecall': None}
+    if not result['missing']:
+        result['TSS'] = float(TSS(y_true, y_pred))
+        result['macroRecall'] = float(macroRecall(y_true, y_pred))
+    return result
+
+def catalogue_images(horizon, catalogue, store=None):
+    """
+    Render the windows of a labelled catalogue, e.g. with negatives to
+    complete the case studies.
+
+    Parameters
+    ----------
+    horizon : string
+        Either "20m", "30m", "60m" or "120m".
+    catalogue : string or pd.DataFrame
+        Catalogue file or the DataFrame returned by Evaluate.read_catalogue.
+    store : DataStore.SeriesStore, optional
+        Store the series are read from. The default is None.
+
+    Returns
+    -------
+    labelled : list
+        (image, label) pairs, to be passed as 'labelled'.
+    """
+    from Evaluate import read_catalogue
+    from IPSRNet import TIME_WINDOWS
+    from DataStore import load_series
+    from Render import render_window, window_bounds
+    if isinstance(catalogue, str):
+        catalogue = read_catalogue(catalogue)
+    labelled = []
+    for _, row in catalogue.iterrows():
+        s, e = window_bounds(row['time'].to_pydatetime(), TIME_WINDOWS[horizon])
+        df_b, df_p = load_series(row['spacecraft'], s, e, store=store)
+        labelled.append((render_window(df_b.loc[s:e], df_p.loc[s:e], s, e), int(row['label'])))
+    return labelled
+
+def labelled_images(horizon, cases=None, labelled=None):
+    """
+    Parameters
+    ----------
+    horizon : string
+        Either "20m", "30m", "60m" or "120m".
+    cases : list, optional
+        Cases as returned by case_studies. The default is every case study.
+    labelled : list, optional
+        Extra (image path or array, label) pairs. The default is None.
+
+    Returns
+    -------
+    images : list
+        Images of the horizon with a known label.
+    labels : list
+        Their labels (0 Neg, 1 FF, 2 FR).
+    """
+    if cases is None:
+        cases = case_studies()
+    pairs = [(c['path'], c['label']) for c in cases if c['horizon'] == horizon and c['label'] is not None]
+    pairs += list(labelled or [])
+    return [p[0] for p in pairs], [p[1] for p in pairs]
+
+def compare_models(reference, candidates, images, labels, repeats=20, batch_size=32):
+    """
+    Compare models that share the IPSRNet predict interface.
+
+    Parameters
+    ----------
+    reference : IPSRNet instance
+        Baseline, e.g. the Keras path.
+    candidates : dict
+        Name and instance of each model compared with the reference.
+    images : list
+        Labelled images (paths or arrays).
+    labels : list
+        Their labels (0 Neg, 1 FF, 2 FR).
+    repeats : int, optional
+        Number of timed batch-1 predictions. The default is 20.
+    batch_size : int, optional
+        Batch size of the throughput measurement. The default is 32.
+
+    Returns
+    -------
+    results : dict
+        For the reference and each candidate: latency percentiles at batch
+        size 1, throughput (images/s), TSS and macroRecall, and for the
+        candidates the deltas and the largest output difference with the
+        reference.
+    """
+    batch = reference.load_images(images)
+    results = {}
+    baseline = None
+    for name, model in [('reference', reference)] + list(candidates.items()):
+        outputs = model.predict_batch(batch, batch_size=batch_size)
+        result = {'latency_batch1': _latency(lambda: model.predict_batch(batch[:1], batch_size=1), repeats=repeats)}
+        seconds = _latency(lambda: model.predict_batch(batch, batch_size=batch_size), repeats=max(1, repeats // 10))
+        result['throughput'] = len(batch) / seconds['p50']
+        result.update(scores(outputs, labels))
+        if baseline is None:
+            baseline = (outputs, result)
+        else:
+            for score in ['TSS', 'macroRecall']:
+                result[score + '_delta'] = None if result[score] is None else result[score] - baseline[1][score]
+            result['output_max_abs_diff'] = float(np.abs(outputs - baseline[0]).max())
+            result['same_class'] = float((outputs.argmax(axis=1) == baseline[0].argmax(axis=1)).mean())
+        results[name] = result
+    return results
+
+def export_report(horizon, artifacts, cases=None, labelled=None, repeats=20, num_threads=None):
+    """
+    Accuracy and latency of exported models against the Keras path.
+
+    int8 models calibrated on any of the evaluated windows (as recorded
+    by Export.py, see Export.calibration_keys) are rejected, so the
+    calibration and evaluation sets are disjoint.
+
+    Parameters
+    ----------
+    horizon : string
+        Either "20m", "30m", "60m" or "120m".
+    artifacts : list
+        Files written by Export.py for the horizon.
+    cases : list, optional
+        Cases as returned by case_studies. The default is every case study.
+    labelled : list, optional
+        Extra (image path or array, label) pairs. The default is None.
+    repeats : int, optional
+        Number of timed batch-1 predictions. The default is 20.
+    num_threads : int, optional
+        Number of CPU threads of the runtimes. The default is None.
+
+    Returns
+    -------
+    results : dict
+        See compare_models, with one candidate per artifact.
+    """
+    from IPSRNet import MODELS
+    from Export import calibration_keys
+    from FeatureCache import image_key
+    images, labels = labelled_images(horizon, cases, labelled)
+    reference = MODELS[horizon]()
+    # an int8 model scored on its own calibration windows looks better than it is
+    keys = {image_key(reference.load_images([image])[0].astype(np.uint8)) for image in images}
+    for path in artifacts:
+        overlap = len(keys & calibration_keys(path))
+        if overlap:
+            raise Exception(os.path.basename(path) + " was calibrated on " + str(overlap) +
+                            " of the evaluation windows; calibrate it on a disjoint set.")
+    candidates = {os.path.basename(path): MODELS[horizon].from_artifact(path, num_threads=num_threads) for path in artifacts}
+    return compare_models(reference, candidates, images, labels, repeats=repeats)
+
+def _rss_mb():
+    # current resident set size, from /proc where available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return _peak_rss_mb()
+
+# memory of one configuration, measured in a fresh interpreter, since the peak
+# RSS never decreases and earlier instances would hide the increase
+_MEMORY_SCRIPT = """
+import json
+import tensorflow
+from Benchmark import _rss_mb, _peak_rss_mb
+from IPSRNet import MODELS
+from Registry import model_nbytes
+before, peak = _rss_mb(), _peak_rss_mb()
+model = MODELS['{horizon}'](precision='{precision}')
+print(json.dumps({{'weights_mb': model_nbytes(model) / 1024**2, 'rss_increase_mb': _rss_mb() - before,
+                  'peak_rss_increase_mb': _peak_rss_mb() - peak}}))
+"""
+
+def precision_report(horizon, precisions=('bfloat16', 'float16'), cases=None, labelled=None, repeats=20):
+    """
+    Accuracy, latency and memory of reduced precision feature extractors
+    against float32.
+
+    Parameters
+    ----------
+    horizon : string
+        Either "20m", "30m", "60m" or "120m".
+    precisions : tuple, optional
+        Precisions compared with float32. The default is ('bfloat16', 'float16').
+    cases : list, optional
+        Cases as returned by case_studies. The default is every case study.
+    labelled : list, optional
+        Extra (image path or array, label) pairs. The default is None.
+    repeats : int, optional
+        Number of timed batch-1 predictions. The default is 20.
+
+    Returns
+    -------
+    results : dict
+        See compare_models, with one candidate per precision, plus the size
+        of the weights ('weights_mb') and the increase of the resident and
+        peak resident memory when building the instance ('rss_increase_mb',
+        'peak_rss_increase_mb'), each measured in a fresh interpreter after
+        importing TensorFlow.
+    """
+    from IPSRNet import MODELS
+    images, labels = labelled_images(horizon, cases, labelled)
+    memory = {}
+    models = {}
+    for name, precision in [('reference', 'float32')] + [(p, p) for p in precisions]:
+        memory[name] = _fresh(_MEMORY_SCRIPT.format(horizon=horizon, precision=precision), '.')
+        models[name] = MODELS[horizon](precision=precision)
+    reference = models.pop('reference')
+    results = compare_models(reference, models, images, labels, repeats=repeats)
+    for name, result in results.items():
+        result.update(memory[name])
+    return results
+
+def synthetic_series(start, end, cadence='64s', shock=None, seed=0):
+    """
+    Generate BTOTAL/Np/Vp/Tp series for offline benchmarks.
+
+    Parameters
+    ----------
+    start : datetime
+        Start time of the series.
+    end : datetime
+        End time of the series.
+    cadence : string, optional
+        Sampling period, '64s' (ACE) or 'min' (STEREO). The default is '64s'.
+    shock : datetime, optional
+        Time of a fast forward shock-like jump. The default is None.
+    seed : int, optional
+        Seed of the random noise. The default is 0.
+
+    Returns
+    -------
+    IMF_df : pd.DataFrame
+        DataFrame with column "BTOTAL".
+    plasma_df : pd.DataFrame
+        DataFrame with columns "Np", "Vp" and "Tp".
+    """
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, end, freq=cadence)
+    jump = np.zeros(len(index)) if shock is None else (index >= shock).astype(float)
+    noise = lambda scale: rng.normal(0, scale, len(index))
+    IMF_df = pd.DataFrame({'BTOTAL': 5 + 5*jump + noise(0.3)}, index=index)
+    plasma_df = pd.DataFrame({'Np': 5 + 8*jump + noise(0.4),
+                              'Vp': 400 + 80*jump + noise(5),
+                              'Tp': 6e4 + 1e5*jump + noise(5e3)}, index=index)
+    return IMF_df, plasma_df
+
+def _peak_rss_mb():
+    import sys
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def _stage(results, stage, function, repeats, items=1, **labels):
+    before = _peak_rss_mb()
+    latency = _latency(function, repeats=repeats, warmup=1)
+    after = _peak_rss_mb()
+    result = {'stage': stage}
+    result.update(labels)
+    result.update({'items': items, 'latency': latency, 'throughput': items / latency['p50'],
+                   'peak_rss_mb': after, 'peak_rss_increase_mb': after - before})
+    results.append(result)
+    print('%-22s %-5s batch %-3s  p50 %9.2f ms  p99 %9.2f ms  %8.1f items/s  peak RSS %7.0f MB' % (
+        stage, labels.get('horizon', ''), labels.get('batch_size', ''), 1000 * latency['p50'],
+        1000 * latency['p99'], result['throughput'], after))
+
+def _environment():
+    import platform
+    import subprocess
+    from importlib import metadata
+    versions = {}
+    for package in ['numpy', 'pandas', 'matplotlib', 'opencv-python', 'tensorflow', 'keras', 'sunpy']:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'time': datetime.now().isoformat(), 'python': platform.python_version(),
+            'platform': platform.platform(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count(), 'commit': commit, 'versions': versions}
+
+def stage_suite(horizons=('20m', '30m', '60m', '120m'), batch_sizes=(1, 8, 32), repeats=10,
+                cdf_files=None, online=False, folder=CASE_STUDIES):
+    """
+    Time each stage of the fetch, render and infer pipeline.
+
+    Runs offline on synthetic series and the case studies images. The
+    TimeSeries to DataFrame stage needs cached CDF files, and the
+    Fido.search/fetch stage only runs when online is True.
+
+    Parameters
+    ----------
+    horizons : tuple, optional
+        Horizons whose rendering and models are timed. The default is all.
+    batch_sizes : tuple, optional
+        Batch sizes of the model stages. The default is (1, 8, 32).
+    repeats : int, optional
+        Timed repetitions of each stage. The default is 10.
+    cdf_files : list, optional
+        Downloaded CDF files (e.g. from the sunpy data folder). The default is None.
+    online : bool, optional
+        Also time Fido.search and Fido.fetch of one ACE day. The default is False.
+    folder : string, optional
+        Case studies folder. The default is 'Case studies'.
+
+    Returns
+    -------
+    report : dict
+        'environment' (versions, platform, commit) and 'stages' (one dict
+        per stage, horizon and batch size with latency percentiles in
+        seconds, throughput in items/s and peak RSS in MB).
+    """
+    import tempfile
+    import cv2
+    from datetime import timedelta
+    from matplotlib.figure import Figure
+    from IPSRNet import MODELS, TIME_WINDOWS
+    from Render import draw_panels, render_window, window_bounds
+    from Raster import rasterize_window
+    from Utils import load_image
+
+    results = []
+    centre = datetime(2015, 3, 17, 4, 5)
+
+    if online:
+        from sunpy.net import Fido
+        from sunpy.net import attrs as a
+        trange = a.Time(centre - timedelta(minutes=30), centre + timedelta(minutes=30))
+        query = Fido.search(trange, a.cdaweb.Dataset.ac_h0_swe)
+        _stage(results, 'fido_search', lambda: Fido.search(trange, a.cdaweb.Dataset.ac_h0_swe), max(1, repeats // 5))
+        _stage(results, 'fido_fetch', lambda: Fido.fetch(query, progress=False), max(1, repeats // 5))
+    if cdf_files:
+        from sunpy.timeseries import TimeSeries
+        _stage(results, 'timeseries_dataframe', lambda: TimeSeries(cdf_files, concatenate=True).to_dataframe(), repeats)
+
+    day_b, _ = synthetic_series(centre.replace(hour=0, minute=0), centre.replace(hour=23, minute=59))
+    jittered = day_b.copy()
+    jittered.index = jittered.index + timedelta(seconds=1)
+    jittered = jittered.iloc[np.sort(np.random.default_rng(0).choice(len(jittered), len(jittered) - 50, replace=False))]
+    _stage(results, 'asfreq', lambda: jittered.asfreq(freq='64s'), repeats)
+
+    cases = case_studies(folder)
+    tmp = tempfile.mkdtemp()
+    for horizon in horizons:
+        s, e = window_bounds(centre, TIME_WINDOWS[horizon])
+        df_b, df_p = synthetic_series(s, e, shock=centre)
+        path = os.path.join(tmp, horizon + '.png')
+
+        def savefig():
+            fig = Figure(figsize=(4,4))
+            draw_panels(fig, df_b, df_p, s, e)
+            fig.savefig(path, format='png', bbox_inches='tight', dpi=512)
+
+        def rewrite():
+            image = cv2.imread(path)
+            image = cv2.resize(image, (2048, 2048), interpolation=cv2.INTER_CUBIC)
+            cv2.imwrite(path, image)
+
+        _stage(results, 'render_matplotlib', lambda: render_window(df_b, df_p, s, e), repeats, horizon=horizon)
+        _stage(results, 'render_raster', lambda: rasterize_window(df_b, df_p, s, e), repeats, horizon=horizon)
+        _stage(results, 'savefig', savefig, repeats, horizon=horizon)
+        _stage(results, 'resize_2048_rewrite', rewrite, repeats, horizon=horizon)
+
+        images = [c['path'] for c in cases if c['horizon'] == horizon] or [path]
+        size = MODELS[horizon].target_size
+        _stage(results, 'load_image', lambda: load_image(images[0], target_size=size), repeats, horizon=horizon)
+
+        try:
+            model = MODELS[horizon]()
+        except Exception as error:
+            print('Skipping the model stages of', horizon, '-', error)
+            continue
+        loaded = model.load_images(images)
+        for batch_size in batch_sizes:
+            batch = np.resize(loaded, (batch_size,) + loaded.shape[1:])
+            processed = model.preprocess(batch)
+            features = np.asarray(model.deepmodel.predict_on_batch(processed))
+            _stage(results, 'preprocess', lambda: model.preprocess(batch), repeats, batch_size, horizon=horizon, batch_size=batch_size)
+            _stage(results, 'backbone', lambda: model.deepmodel.predict_on_batch(processed), repeats, batch_size, horizon=horizon, batch_size=batch_size)
+            _stage(results, 'head', lambda: model.finalmodel.predict_on_batch(features), repeats, batch_size, horizon=horizon, batch_size=batch_size)
+            _stage(results, 'predict_batch', lambda: model.predict_batch(batch, batch_size=batch_size), repeats, batch_size, horizon=horizon, batch_size=batch_size)
+        del model
+
+    return {'environment': _environment(), 'stages': results}
+
+# run in a fresh interpreter, so that nothing is imported or built beforehand
+_PEAK_RSS = """
+def peak_rss_mb():
+    import sys, resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+"""
+
+_IMPORT_SCRIPT = _PEAK_RSS + """
+import sys, time, json
+t0 = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - t0, 'peak_rss_mb': peak_rss_mb(),
+                  'tensorflow': 'tensorflow' in sys.modules, 'sunpy': 'sunpy' in sys.modules,
+                  'matplotlib': 'matplotlib' in sys.modules, 'cv2': 'cv2' in sys.modules}}))
+"""
+
+_START_SCRIPT = _PEAK_RSS + """
+import time, json, inspect
+import numpy as np
+t0 = time.perf_counter()
+from IPSRNet import MODELS
+t1 = time.perf_counter()
+import_rss = peak_rss_mb()
+cls = MODELS['{horizon}']
+kwargs = {{}}
+if 'snapshot' in inspect.signature(cls.__init__).parameters and not {snapshot}:
+    kwargs['snapshot'] = None
+model = cls(**kwargs)
+t2 = time.perf_counter()
+init_rss = peak_rss_mb()
+image = np.zeros((cls.target_size[1], cls.target_size[0], 3), dtype=np.uint8)
+model.predict(image)
+t3 = time.perf_counter()
+model.predict(image)
+t4 = time.perf_counter()
+print(json.dumps({{'import_seconds': t1 - t0, 'init_seconds': t2 - t1, 'first_predict_seconds': t3 - t2,
+                  'second_predict_seconds': t4 - t3, 'first_prediction_seconds': t3 - t0,
+                  'import_peak_rss_mb': import_rss, 'init_peak_rss_mb': init_rss,
+                  'peak_rss_mb': peak_rss_mb()}}))
+"""
+
+def _fresh(script, tree):
+    import sys
+    import subprocess
+    process = subprocess.run([sys.executable, '-c', script], cwd=tree, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise Exception(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'exit code ' + str(process.returncode))
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def cold_start(horizons=('20m', '30m', '60m', '120m'), modules=('Render', 'ACE', 'STEREO', 'IPSRNet', 'Scan'),
+               repeats=3, tree='.'):
+    """
+    Measure the import time of the modules and the time from a cold start
+    to the first prediction of each horizon, with the networks built from
+    their pretrained weights and loaded from the snapshot
+    (IPSRNet.build_snapshot).
+
+    Every measurement runs in a new interpreter, with tree as working
+    directory. Running it on a checkout of an earlier revision (e.g. a
+    git worktree) gives the 'before' figures; there, the models are always
+    built and the snapshot case is skipped.
+
+    Parameters
+    ----------
+    horizons : tuple, optional
+        Horizons started. The default is all.
+    modules : tuple, optional
+        Modules whose import is timed. The default is
+        ('Render', 'ACE', 'STEREO', 'IPSRNet', 'Scan').
+    repeats : int, optional
+        Runs of each measurement, the median is kept. The default is 3.
+    tree : string, optional
+        Folder of the source tree measured. The default is '.'.
+
+    Returns
+    -------
+    report : dict
+        'environment', 'imports' (per module, median seconds and peak RSS,
+        and whether TensorFlow, sunpy, matplotlib and cv2 were loaded by the
+        import) and 'starts' (per horizon and mode, 'build' or 'snapshot',
+        median import, initialisation, first and second prediction seconds,
+        and peak RSS of the interpreter after the import, after the
+        initialisation and at the end, in MB). Peak RSS never decreases
+        within a process, which is why each run starts a new interpreter.
+    """
+    import statistics
+    import subprocess
+    report = {'environment': _environment(), 'tree': os.path.abspath(tree), 'imports': {}, 'starts': {}}
+    try:
+        report['tree_commit'] = subprocess.run(['git', '-C', tree, 'rev-parse', 'HEAD'], capture_output=True,
+                                               text=True).stdout.strip() or None
+    except OSError:
+        report['tree_commit'] = None
+
+    def median(runs):
+        # flags of the loaded packages are the same in every run
+        return {key: value if isinstance(value, bool) else statistics.median(r[key] for r in runs)
+                for key, value in runs[0].items()}
+
+    for module in modules:
+        try:
+            report['imports'][module] = median([_fresh(_IMPORT_SCRIPT.format(module=module), tree) for _ in range(repeats)])
+        except Exception as error:
+            report['imports'][module] = {'error': str(error)}
+
+    snapshots = os.path.isdir(os.path.join(tree, 'Networks', 'snapshot'))
+    for horizon in horizons:
+        report['starts'][horizon] = {}
+        for mode in ['build', 'snapshot']:
+            if mode == 'snapshot' and not snapshots:
+                continue
+            script = _START_SCRIPT.format(horizon=horizon, snapshot=mode == 'snapshot')
+            try:
+                report['starts'][horizon][mode] = median([_fresh(script, tree) for _ in range(repeats)])
+            except Exception as error:
+                report['starts'][horizon][mode] = {'error': str(error)}
+    return report
+
+def _scores_text(result):
+    if result['TSS'] is None:
+        return 'recall ' + ' '.join('%s %.3f' % item for item in result['recall'].items()) + \
+            '  (no ' + ', '.join(result['missing']) + ' samples)'
+    return 'TSS %.3f  macroRecall %.3f' % (result['TSS'], result['macroRecall'])
+
+def _save(results, output):
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='IPSRNet benchmarks.')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    fidelity = subparsers.add_parser('raster', help='NumPy rasterizer against matplotlib on the case studies.')
+    fidelity.add_argument('--data', default=None, help='SeriesStore folder (downloads when missing).')
+    fidelity.add_argument('--dpi', type=int, default=512)
+    fidelity.add_argument('--no-models', action='store_true', help='Only compare pixels.')
+    fidelity.add_argument('--output', default='raster_fidelity.json')
+
+    export = subparsers.add_parser('export', help='Exported TFLite/ONNX models against the Keras path.')
+    export.add_argument('horizon')
+    export.add_argument('artifacts', nargs='+')
+    export.add_argument('--threads', type=int, default=None)
+    export.add_argument('--catalogue', default=None,
+                        help='Evaluate catalogue (time, spacecraft, label) rendered and added to the case studies.')
+    export.add_argument('--store', default=None, help='SeriesStore folder of the catalogue windows.')
+    export.add_argument('--output', default='export_report.json')
+
+    precision = subparsers.add_parser('precision', help='bfloat16/float16 feature extractors against float32.')
+    precision.add_argument('--horizons', nargs='+', default=['20m', '30m', '60m', '120m'])
+    precision.add_argument('--precisions', nargs='+', default=['bfloat16', 'float16'])
+    precision.add_argument('--repeats', type=int, default=20)
+    precision.add_argument('--labelled', default=None,
+                           help='CSV of rendered windows of one horizon (path, label), added to the case studies.')
+    precision.add_argument('--catalogue', default=None,
+                           help='Evaluate catalogue (time, spacecraft, label) rendered and added to the case studies.')
+    precision.add_argument('--store', default=None, help='SeriesStore folder of the catalogue windows.')
+    precision.add_argument('--output', default='precision_report.json')
+
+    stages = subparsers.add_parser('stages', help='Latency, throughput and peak RSS of each pipeline stage.')
+    stages.add_argument('--horizons', nargs='+', default=['20m', '30m', '60m', '120m'])
+    stages.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8, 32])
+    stages.add_argument('--repeats', type=int, default=10)
+    stages.add_argument('--cdf', nargs='*', default=None, help='Cached CDF files for the TimeSeries stage.')
+    stages.add_argument('--online', action='store_true', help='Also time Fido.search and Fido.fetch.')
+    stages.add_argument('--output', default='stage_benchmark.json')
+
+    cold = subparsers.add_parser('cold-start', help='Import time and first-prediction latency, built or from the snapshot.')
+    cold.add_argument('--horizons', nargs='+', default=['20m', '30m', '60m', '120m'])
+    cold.add_argument('--modules', nargs='+', default=['Render', 'ACE', 'STEREO', 'IPSRNet', 'Scan'])
+    cold.add_argument('--repeats', type=int, default=3)
+    cold.add_argument('--tree', default='.', help='Source tree measured, e.g. a worktree of an earlier commit.')
+    cold.add_argument('--output', default='cold_start.json')
+
+    args = parser.parse_args()
+    if args.benchmark == 'raster':
+        from DataStore import SeriesStore
+        store = SeriesStore(args.data) if args.data else None
+        results = raster_fidelity(store=store, dpi=args.dpi, with_models=not args.no_models)
+        for r in results:
+            line = '%-45s  %.3fs -> %.3fs  mean |diff| %.2f  corr %.3f' % (
+                os.path.basename(r['path']), r['matplotlib_seconds'], r['raster_seconds'], r['mean_abs_diff'], r['correlation'])
+            if 'output_max_abs_diff' in r:
+                line += '  max |dP| %.3f  same class %s' % (r['output_max_abs_diff'], r['same_class'])
+            print(line)
+        _save(results, args.output)
+    elif args.benchmark == 'export':
+        from DataStore import SeriesStore
+        store = SeriesStore(args.store) if args.store else None
+        labelled = None if args.catalogue is None else catalogue_images(args.horizon, args.catalogue, store=store)
+        results = export_report(args.horizon, args.artifacts, labelled=labelled, num_threads=args.threads)
+        for name, r in results.items():
+            print('%-30s  p50 %.1f ms  %.1f img/s  %s' % (
+                name, 1000 * r['latency_batch1']['p50'], r['throughput'], _scores_text(r)))
+        _save(results, args.output)
+    elif args.benchmark == 'precision':
+        labelled = None
+        if args.labelled is not None:
+            import pandas as pd
+            table = pd.read_csv(args.labelled)
+            labelled = [(path, ['Neg', 'FF', 'FR'].index(l) if isinstance(l, str) else int(l))
+                        for path, l in zip(table['path'], table['label'])]
+        from DataStore import SeriesStore
+        store = SeriesStore(args.store) if args.store else None
+        report = {}
+        for horizon in args.horizons:
+            extra = list(labelled or [])
+            if args.catalogue is not None:
+                extra += catalogue_images(horizon, args.catalogue, store=store)
+            report[horizon] = precision_report(horizon, precisions=tuple(args.precisions), labelled=extra,
+                                               repeats=args.repeats)
+            for name, r in report[horizon].items():
+                print('%-5s %-10s  p50 %.1f ms  %.1f img/s  weights %.0f MB  RSS +%.0f MB  %s' % (
+                    horizon, name, 1000 * r['latency_batch1']['p50'], r['throughput'], r['weights_mb'],
+                    r['rss_increase_mb'], _scores_text(r)))
+        _save(report, args.output)
+    elif args.benchmark == 'stages':
+        report = stage_suite(horizons=args.horizons, batch_sizes=args.batch_sizes, repeats=args.repeats,
+                             cdf_files=args.cdf, online=args.online)
+        _save(report, args.output)
+    elif args.benchmark == 'cold-start':
+        report = cold_start(horizons=tuple(args.horizons), modules=tuple(args.modules), repeats=args.repeats, tree=args.tree)
+        for module, r in report['imports'].items():
+            if 'error' in r:
+                print('import %-8s' % module, r['error'])
+                continue
+            print('import %-8s %.2fs  tensorflow %s  sunpy %s  matplotlib %s  cv2 %s' % (
+                module, r['seconds'], r['tensorflow'], r['sunpy'], r['matplotlib'], r['cv2']))
+        for horizon, modes in report['starts'].items():
+            for mode, r in modes.items():
+                if 'error' in r:
+                    print('%-5s %-8s' % (horizon, mode), r['error'])
+                    continue
+                print('%-5s %-8s import %.2fs  init %.2fs  first predict %.2fs  total %.2fs' % (
+                    horizon, mode, r['import_seconds'], r['init_seconds'], r['first_predict_seconds'],
+                    r['first_prediction_seconds']))
+        _save(report, args.output)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:52:38 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from DataStore import check_spacecraft, download
+from Acquire import DATASETS, LocalCDF
+
+# CDF variables read from each dataset, and their column name
+VARIABLES = {'ac_h0_mfi': {'Magnitude': 'BTOTAL'},
+             'ac_h0_swe': {'Np': 'Np', 'Vp': 'Vp', 'Tpr': 'Tp'},
+             'sta_l2_magplasma_1m': {'BTOTAL': 'BTOTAL', 'Np': 'Np', 'Vp': 'Vp', 'Tp': 'Tp'},
+             'stb_l2_magplasma_1m': {'BTOTAL': 'BTOTAL', 'Np': 'Np', 'Vp': 'Vp', 'Tp': 'Tp'}}
+ARCHIVE_COLUMNS = ('time_b', 'BTOTAL', 'time_p', 'Np', 'Vp', 'Tp')
+
+class DataSource(ABC):
+    """
+    Interface of the sources of BTOTAL/Np/Vp/Tp series.
+
+    A source is called as source(spacecraft, start, end) and returns
+    (IMF_df, plasma_df) resampled as Get_ACE_data (64 s) or
+    Get_STEREO_data (1 min), so it can be the fetch of a
+    DataStore.SeriesStore. 'get' is an alias, so a source can also be
+    passed wherever a store is expected. Subclasses implement __call__.
+    """
+    @abstractmethod
+    def __call__(self, spacecraft, start, end):
+        """
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+
+    def get(self, spacecraft, start, end):
+        return self(spacecraft, start, end)
+
+class CDAWebSource(DataSource):
+    """
+    Downloads from CDAWeb with Fido, as Get_ACE_data and Get_STEREO_data.
+    """
+    def __call__(self, spacecraft, start, end):
+        return download(spacecraft, start, end)
+
+def read_cdf(paths, variables, start, end):
+    """
+    Read some variables of CDF files over a time range.
+
+    Only the epoch and the requested variables are decoded, and only the
+    records between start and end, instead of the whole files.
+
+    Parameters
+    ----------
+    paths : list
+        CDF files, in time order.
+    variables : list
+        Variables to read, sharing the same epoch variable.
+    start : datetime
+        Start time of observed period.
+    end : datetime
+        End time of observed period.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        One column per variable, with fill values replaced by NaN.
+    first : np.datetime64
+        First epoch of the files, or None if they are empty.
+    """
+    import cdflib
+    times = []
+    columns = {v: [] for v in variables}
+    first = None
+    lo, hi = np.datetime64(start, 'ns'), np.datetime64(end, 'ns')
+    for path in paths:
+        cdf = cdflib.CDF(path)
+        depend = cdf.varattsget(variables[0]).get('DEPEND_0', 'Epoch')
+        epoch = np.asarray(cdflib.cdfepoch.to_datetime(cdf.varget(depend)), dtype='datetime64[ns]')
+        if first is None and len(epoch):
+            first = epoch[0]
+        i = np.searchsorted(epoch, lo, side='left')
+        j = np.searchsorted(epoch, hi, side='right')
+        if j <= i:
+            continue
+        times.append(epoch[i:j])
+        for v in variables:
+            values = np.asarray(cdf.varget(v, startrec=int(i), endrec=int(j) - 1), dtype=np.float64).reshape(j - i)
+            fill = cdf.varattsget(v).get('FILLVAL')
+            if fill is not None:
+                values[values == np.asarray(fill, dtype=np.float64).ravel()[0]] = np.nan
+            columns[v].append(values)
+
+    if not times:
+        return pd.DataFrame({v: np.zeros(0) for v in variables}, index=pd.DatetimeIndex([])), first
+    index = pd.DatetimeIndex(np.concatenate(times))
+    df = pd.DataFrame({v: np.concatenate(columns[v]) for v in variables}, index=index)
+    return df[~df.index.duplicated()], first
+
+class LocalCDFSource(DataSource):
+    def __init__(self, folder):
+        """
+        Initializes a source reading CDAWeb CDF files from disk, e.g. a
+        mirror of CDAWeb or the cache filled by Fido.fetch.
+
+        Unlike Get_ACE_data and Get_STEREO_data, which load every variable
+        of the files into a TimeSeries, only Magnitude (ac_h0_mfi),
+        Np/Vp/Tpr (ac_h0_swe) or BTOTAL/Np/Vp/Tp (STEREO) are read, and only
+        over the requested time range. The output is resampled as theirs.
+
+        Parameters
+        ----------
+        folder : string
+            Folder with the CDF files, searched recursively by CDAWeb
+            name (e.g. "ac_h0_mfi_20150317_v06.cdf").
+        """
+        self.folder = folder
+        self.files = LocalCDF(folder)
+
+    def _read(self, dataset, start, end):
+        variables = VARIABLES[dataset]
+        df, first = read_cdf(self.files(dataset, start, end), list(variables), start, end)
+        return df.rename(columns=variables), first
+
+    def __call__(self, spacecraft, start, end):
+        """
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        sc = check_spacecraft(spacecraft)
+        if sc == 'ACE':
+            frames = []
+            for dataset in DATASETS['ACE']:
+                df, first = self._read(dataset, start, end)
+                # same 64 s grid as asfreq on the whole files, anchored at their first record
+                if first is None or df.empty:
+                    frames.append(df)
+                    continue
+                step = pd.Timedelta(seconds=64)
+                k = max(0, int(np.ceil((pd.Timestamp(start) - pd.Timestamp(first)) / step)))
+                grid = pd.date_range(pd.Timestamp(first) + k * step, df.index[-1], freq=step)
+                frames.append(df.reindex(grid))
+            return frames[0][['BTOTAL']], frames[1][['Np', 'Vp', 'Tp']]
+
+        df, _ = self._read(DATASETS[sc][0], start, end)
+        df = df.asfreq('min')
+        df[df < 0] = np.nan
+        return df[['BTOTAL']], df[['Np', 'Vp', 'Tp']]
+
+class ArchiveSource(DataSource):
+    def __init__(self, folder):
+        """
+        Initializes a source reading a columnar archive written by
+        write_archive: one uncompressed .npy file per column, spacecraft
+        and year, in folder/SC/YYYY/. Columns are memory-mapped and only
+        the rows of the requested range are copied, so multi-year archives
+        are never loaded whole.
+
+        Parameters
+        ----------
+        folder : string
+            Folder of the archive.
+        """
+        self.folder = folder
+
+    def _year(self, sc, year, start, end):
+        path = os.path.join(self.folder, sc, str(year))
+        if not os.path.exists(os.path.join(path, 'time_b.npy')):
+            raise Exception("Year " + str(year) + " of " + sc + " is not in the archive " + self.folder + ".")
+        lo, hi = np.datetime64(start, 'ns').astype(np.int64), np.datetime64(end, 'ns').astype(np.int64)
+        frames = []
+        for time_column, columns in [('time_b', ['BTOTAL']), ('time_p', ['Np', 'Vp', 'Tp'])]:
+            times = np.load(os.path.join(path, time_column + '.npy'), mmap_mode='r')
+            i = np.searchsorted(times, lo, side='left')
+            j = np.searchsorted(times, hi, side='right')
+            data = {c: np.array(np.load(os.path.join(path, c + '.npy'), mmap_mode='r')[i:j]) for c in columns}
+            frames.append(pd.DataFrame(data, index=pd.to_datetime(np.array(times[i:j]))))
+        return frames
+
+    def __call__(self, spacecraft, start, end):
+        """
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        sc = check_spacecraft(spacecraft)
+        parts = [self._year(sc, year, start, end) for year in range(start.year, end.year + 1)]
+        return pd.concat([p[0] for p in parts]), pd.concat([p[1] for p in parts])
+
+def write_archive(source, spacecraft, year, folder):
+    """
+    Write a year of series from any source to an archive read by
+    ArchiveSource, fetching one month at a time.
+
+    Parameters
+    ----------
+    source : callable
+        Source called as source(spacecraft, start, end), e.g. a
+        LocalCDFSource or a DataStore.SeriesStore 'get'.
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+    year : int
+        Year to archive.
+    folder : string
+        Folder of the archive.
+
+    Returns
+    -------
+    path : string
+        Folder of the archived year.
+    """
+    sc = check_spacecraft(spacecraft)
+    columns = {c: [] for c in ARCHIVE_COLUMNS}
+    for month in range(1, 13):
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1) - timedelta(microseconds=1)
+        IMF_df, plasma_df = source(sc, start, end)
+        columns['time_b'].append(IMF_df.index.values.astype('datetime64[ns]').astype(np.int64))
+        columns['BTOTAL'].append(IMF_df['BTOTAL'].to_numpy(dtype=np.float64))
+        columns['time_p'].append(plasma_df.index.values.astype('datetime64[ns]').astype(np.int64))
+        for c in ['Np', 'Vp', 'Tp']:
+            columns[c].append(plasma_df[c].to_numpy(dtype=np.float64))
+
+    path = os.path.join(folder, sc, str(year))
+    os.makedirs(path, exist_ok=True)
+    for c, chunks in columns.items():
+        target = os.path.join(path, c + '.npy')
+        with open(target + '.tmp', 'wb') as f:
+            np.save(f, np.concatenate(chunks))
+        os.replace(target + '.tmp', target)
+    return path
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 12:41:27 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from Metrics import metrics
+
+SPACECRAFTS = ('ACE', 'STA', 'STB')
+
+def check_spacecraft(spacecraft):
+    """
+    Parameters
+    ----------
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+
+    Returns
+    -------
+    sc : string
+        Spacecraft name in upper case.
+    """
+    sc = spacecraft.upper()
+    if sc not in SPACECRAFTS:
+        raise Exception("Only 'ACE', 'STA' or 'STB' are valid values for 'spacecraft' parameter.")
+    return sc
+
+def parse_date(date, name='shock_date'):
+    """
+    Parameters
+    ----------
+    date : string or datetime
+        If a string, in the format "%Y-%m-%d %H:%M:%S".
+    name : string, optional
+        Name of the parameter, for the error message. The default is 'shock_date'.
+
+    Returns
+    -------
+    date : datetime
+    """
+    if type(date) == str:
+        return datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
+    elif type(date) == datetime:
+        return date
+    raise Exception("Only String or datetime values are valid for '" + name + "' parameter")
+
+def download(spacecraft, start, end):
+    """
+    Download the resampled series of a spacecraft from CDAWeb, with
+    Get_ACE_data or Get_STEREO_data.
+
+    Parameters
+    ----------
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+    start : datetime
+        Start time of observed period.
+    end : datetime
+        End time of observed period.
+
+    Returns
+    -------
+    IMF_df : pd.DataFrame
+        DataFrame of shape (n, 1) with column "BTOTAL".
+    plasma_df : pd.DataFrame
+        DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+    """
+    sc = check_spacecraft(spacecraft)
+    if sc == 'ACE':
+        from ACE import Get_ACE_data
+        return Get_ACE_data(start, end)
+    from STEREO import Get_STEREO_data
+    return Get_STEREO_data(start, end, spacecraft=sc)
+
+class SeriesStore():
+    def __init__(self, folder, fetch=download, offline=False):
+        """
+        Initializes a local store of BTOTAL/Np/Vp/Tp series, partitioned by
+        spacecraft and day.
+
+        Each partition is a compressed .npz file with one array per column,
+        holding the whole day already resampled by Get_ACE_data (64 s) or
+        Get_STEREO_data (1 min). Requests are served by slicing the stored
+        days, and only missing days are fetched.
+
+        Parameters
+        ----------
+        folder : string
+            Folder where the partitions are stored.
+        fetch : callable, optional
+            Function fetch(spacecraft, start, end) returning (IMF_df, plasma_df)
+            for a day, called for missing partitions. A stand-in can be given
+            for tests. The default is 'download' (CDAWeb).
+        offline : bool, optional
+            If True, missing partitions raise an Exception instead of being
+            fetched. The default is False.
+        """
+        self.folder = folder
+        self.fetch = fetch
+        self.offline = offline
+
+    def partition_path(self, spacecraft, day):
+        """
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB".
+        day : datetime
+            Day of the partition.
+
+        Returns
+        -------
+        path : string
+            Path of the partition file.
+        """
+        sc = check_spacecraft(spacecraft)
+        return os.path.join(self.folder, sc, day.strftime('%Y'), sc + '_' + day.strftime('%Y%m%d') + '.npz')
+
+    def _fetch_day(self, sc, day, path):
+        if self.offline:
+            raise Exception("Partition " + path + " is not in the store and the store is offline.")
+        IMF_df, plasma_df = self.fetch(sc, day, day + timedelta(days=1) - timedelta(microseconds=1))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        columns = {'time_b': IMF_df.index.values.astype('datetime64[ns]').astype(np.int64),
+                   'time_p': plasma_df.index.values.astype('datetime64[ns]').astype(np.int64)}
+        columns['BTOTAL'] = IMF_df['BTOTAL'].to_numpy(dtype=np.float64)
+        for column in ['Np', 'Vp', 'Tp']:
+            columns[column] = plasma_df[column].to_numpy(dtype=np.float64)
+        # write to a temporary file first so an interrupted fetch leaves no partial partition
+        with open(path + '.tmp', 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(path + '.tmp', path)
+
+    def _read_day(self, sc, day):
+        path = self.partition_path(sc, day)
+        if not os.path.exists(path):
+            metrics.count('store_partition_misses_total', spacecraft=sc)
+            self._fetch_day(sc, day, path)
+        else:
+            metrics.count('store_partition_hits_total', spacecraft=sc)
+        with np.load(path) as data:
+            IMF_df = pd.DataFrame({'BTOTAL': data['BTOTAL']}, index=pd.to_datetime(data['time_b']))
+            plasma_df = pd.DataFrame({c: data[c] for c in ['Np', 'Vp', 'Tp']}, index=pd.to_datetime(data['time_p']))
+        return IMF_df, plasma_df
+
+    def days(self, start, end):
+        """
+        Parameters
+        ----------
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        days : list
+            Days (datetime at midnight) covering the period.
+        """
+        day = datetime(start.year, start.month, start.day)
+        days = []
+        while day <= end:
+            days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def prefetch(self, spacecraft, start, end):
+        """
+        Fetch every missing partition of the period.
+
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of the period.
+        end : datetime
+            End time of the period.
+
+        Returns
+        -------
+        None
+        """
+        sc = check_spacecraft(spacecraft)
+        for day in self.days(start, end):
+            path = self.partition_path(sc, day)
+            if not os.path.exists(path):
+                self._fetch_day(sc, day, path)
+
+    def get(self, spacecraft, start, end):
+        """
+        Get the series of a period, fetching only the missing days.
+
+        Parameters
+        ----------
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL".
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+        """
+        sc = check_spacecraft(spacecraft)
+        parts = [self._read_day(sc, day) for day in self.days(start, end)]
+        IMF_df = pd.concat([p[0] for p in parts]).loc[start:end]
+        plasma_df = pd.concat([p[1] for p in parts]).loc[start:end]
+        return IMF_df, plasma_df
+
+def load_series(spacecraft, start, end, store=None):
+    """
+    Get the series of a period from a store, or download it if no store
+    is given.
+
+    Parameters
+    ----------
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+    start : datetime
+        Start time of observed period.
+    end : datetime
+        End time of observed period.
+    store : SeriesStore, optional
+        Local store to serve the period from. The default is None.
+
+    Returns
+    -------
+    IMF_df : pd.DataFrame
+        DataFrame of shape (n, 1) with column "BTOTAL".
+    plasma_df : pd.DataFrame
+        DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp".
+    """
+    if store is not None:
+        return store.get(spacecraft, start, end)
+    return download(spacecraft, start, end)
@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 17:26:41 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from DataStore import SPACECRAFTS, check_spacecraft, load_series, parse_date
+from Render import render_window, window_bounds
+
+def normalize(vectors):
+    """
+    Parameters
+    ----------
+    vectors : array
+        Array of shape (N, dim).
+
+    Returns
+    -------
+    vectors : array
+        float32 copy with rows of unit L2 norm, so that the dot product of
+        two rows is their cosine similarity.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _save(path, array):
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    os.replace(path + '.tmp', path)
+
+def _top(scores, ids, k):
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[keep], ids[keep]
+    order = np.argsort(-scores, kind='stable')
+    return scores[order], ids[order]
+
+class _HorizonIndex():
+    """
+    Vectors of a single horizon, appended as parts of memory-mapped .npy
+    files (vectors, times, spacecraft), and an optional IVF index over the
+    rows present when it was built: k-means centroids and a copy of the
+    vectors sorted by list, so each probed list is a contiguous slice.
+    Each build writes its files to a new subfolder, which index.json
+    points to only once they are all written.
+    """
+    def __init__(self, folder, dtype):
+        self.folder = folder
+        self._pending = []
+        self._parts = {}
+        self._ivf = None
+        self._keys = None
+        self._recent = set()
+
+        path = os.path.join(folder, 'index.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                index = json.load(f)
+            self.dim = index['dim']
+            self.dtype = np.dtype(index['dtype'])
+            self.parts = index['parts']
+            self.indexed = index['indexed']
+            self.ivf = index.get('ivf')
+        else:
+            os.makedirs(folder, exist_ok=True)
+            self.dim = None
+            self.dtype = np.dtype(dtype)
+            self.parts = []
+            self.indexed = 0
+            self.ivf = None
+
+    @property
+    def size(self):
+        return sum(self.parts)
+
+    @property
+    def pending(self):
+        return sum(len(v) for v, _, _ in self._pending)
+
+    def _load_keys(self):
+        # sorted centres of the stored rows, by spacecraft code
+        if self._keys is None:
+            times = [np.asarray(self._part(n)[1]) for n in range(len(self.parts))]
+            codes = [np.asarray(self._part(n)[2]) for n in range(len(self.parts))]
+            times = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+            codes = np.concatenate(codes) if codes else np.zeros(0, dtype=np.int8)
+            self._keys = {code: np.sort(times[codes == code]) for code in range(len(SPACECRAFTS))}
+        return self._keys
+
+    def new_rows(self, times, codes):
+        # mask of the (time, spacecraft) pairs that are neither stored, pending
+        # nor repeated earlier in the same call
+        keys = self._load_keys()
+        new = np.ones(len(times), dtype=bool)
+        for i, (t, c) in enumerate(zip(times.tolist(), codes.tolist())):
+            stored = keys[c]
+            j = np.searchsorted(stored, t)
+            if (j < len(stored) and stored[j] == t) or (t, c) in self._recent:
+                new[i] = False
+            else:
+                self._recent.add((t, c))
+        return new
+
+    def add(self, vectors, times, codes):
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise Exception("The vectors have " + str(vectors.shape[1]) + " dimensions instead of " + str(self.dim) + ".")
+        self._pending.append((normalize(vectors).astype(self.dtype), times, codes))
+
+    def _save_index(self):
+        index = {'dim': self.dim, 'dtype': self.dtype.str, 'parts': self.parts, 'indexed': self.indexed, 'ivf': self.ivf}
+        path = os.path.join(self.folder, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(path + '.tmp', path)
+
+    def flush(self):
+        if not self._pending:
+            return
+        n = len(self.parts)
+        _save(os.path.join(self.folder, 'vectors_%05d.npy' % n), np.concatenate([v for v, _, _ in self._pending]))
+        _save(os.path.join(self.folder, 'times_%05d.npy' % n), np.concatenate([t for _, t, _ in self._pending]))
+        _save(os.path.join(self.folder, 'spacecraft_%05d.npy' % n), np.concatenate([c for _, _, c in self._pending]))
+        self.parts.append(self.pending)
+        self._pending = []
+        self._save_index()
+        if self._keys is not None and self._recent:
+            recent = np.array(sorted(self._recent), dtype=np.int64)
+            for code in self._keys:
+                self._keys[code] = np.union1d(self._keys[code], recent[recent[:, 1] == code, 0])
+            self._recent = set()
+
+    def _part(self, n):
+        if n not in self._parts:
+            self._parts[n] = tuple(np.load(os.path.join(self.folder, name % n), mmap_mode='r')
+                                   for name in ('vectors_%05d.npy', 'times_%05d.npy', 'spacecraft_%05d.npy'))
+        return self._parts[n]
+
+    def _starts(self):
+        return np.concatenate([[0], np.cumsum(self.parts)]).astype(np.int64)
+
+    def _gather(self, ids, column):
+        # rows of a column (0 vectors, 1 times, 2 spacecraft) by global id
+        starts = self._starts()
+        parts = np.searchsorted(starts, ids, side='right') - 1
+        out = None
+        for n in np.unique(parts):
+            selected = parts == n
+            values = self._part(n)[column][ids[selected] - starts[n]]
+            if out is None:
+                out = np.empty((len(ids),) + values.shape[1:], dtype=values.dtype)
+            out[selected] = values
+        return out
+
+    def _load_ivf(self):
+        if self._ivf is None and self.ivf is not None:
+            self._ivf = tuple(np.load(os.path.join(self.folder, self.ivf, name), mmap_mode='r')
+                              for name in ('ivf_centroids.npy', 'ivf_offsets.npy', 'ivf_ids.npy', 'ivf_vectors.npy'))
+        return self._ivf
+
+    def build(self, n_lists, iterations, sample, seed):
+        self.flush()
+        total = self.size
+        rng = np.random.default_rng(seed)
+        ids = np.sort(rng.choice(total, size=min(sample, total), replace=False))
+        points = np.asarray(self._gather(ids, 0), dtype=np.float32)
+        n_lists = min(n_lists, len(points))
+
+        # spherical k-means on the sample
+        centroids = points[rng.choice(len(points), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assigned = np.argmax(points @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assigned, points)
+            empty = np.bincount(assigned, minlength=n_lists) == 0
+            sums[empty] = points[rng.choice(len(points), size=int(empty.sum()))]
+            centroids = normalize(sums)
+
+        # every row goes to its nearest centroid, part by part
+        assigned = np.concatenate([np.argmax(np.asarray(self._part(n)[0], dtype=np.float32) @ centroids.T, axis=1)
+                                   for n in range(len(self.parts))])
+        order = np.argsort(assigned, kind='stable').astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assigned, minlength=n_lists))]).astype(np.int64)
+
+        # the previous index stays in use until index.json points to the new one
+        old = self.ivf
+        version = 0 if old is None else int(old.split('_')[1]) + 1
+        ivf = 'ivf_%05d' % version
+        folder = os.path.join(self.folder, ivf)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        vectors = open_memmap(os.path.join(folder, 'ivf_vectors.npy'), mode='w+', dtype=self.dtype, shape=(total, self.dim))
+        for first in range(0, total, 65536):
+            vectors[first:first + 65536] = self._gather(order[first:first + 65536], 0)
+        vectors.flush()
+        del vectors
+        _save(os.path.join(folder, 'ivf_centroids.npy'), centroids)
+        _save(os.path.join(folder, 'ivf_offsets.npy'), offsets)
+        _save(os.path.join(folder, 'ivf_ids.npy'), order)
+        self._ivf = None
+        self.ivf = ivf
+        self.indexed = total
+        self._save_index()
+        if old is not None:
+            shutil.rmtree(os.path.join(self.folder, old), ignore_errors=True)
+
+    def search(self, query, k, n_probe):
+        scores, ids = [], []
+        ivf = self._load_ivf()
+        if ivf is not None:
+            centroids, offsets, ivf_ids, ivf_vectors = ivf
+            for l in np.argsort(-(centroids @ query))[:n_probe]:
+                lo, hi = offsets[l], offsets[l + 1]
+                if hi > lo:
+                    scores.append(np.asarray(ivf_vectors[lo:hi], dtype=np.float32) @ query)
+                    ids.append(np.array(ivf_ids[lo:hi]))
+        # rows added after the index was built are compared exhaustively
+        starts = self._starts()
+        for n in range(len(self.parts)):
+            if starts[n] >= self.indexed:
+                scores.append(np.asarray(self._part(n)[0], dtype=np.float32) @ query)
+                ids.append(np.arange(starts[n], starts[n + 1]))
+        if not scores:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return _top(np.concatenate(scores), np.concatenate(ids), k)
+
+class EmbeddingStore():
+    def __init__(self, folder, dtype='float32', flush_every=4096):
+        """
+        Initializes a persistent store of the feature vectors produced by the
+        backbones (deepmodel) of the IPSRNet instances, with their window
+        centre and spacecraft, for similar-event retrieval.
+
+        Vectors are L2-normalised and compared by cosine similarity. They are
+        kept in one subfolder per horizon, as parts of .npy files that are
+        memory-mapped when read, so multi-year archives are never loaded
+        whole. 'build' adds an IVF index (k-means lists) that restricts a
+        query to the rows of the n_probe closest lists; rows added after the
+        last build are still found, by exhaustive comparison.
+
+        Parameters
+        ----------
+        folder : string
+            Folder where the store is kept.
+        dtype : string, optional
+            Storage type of the vectors. 'float16' halves the disk usage.
+            Only used for horizons that are not yet in the store.
+            The default is 'float32'.
+        flush_every : int, optional
+            Number of pending vectors of a horizon after which they are
+            written as a new part. The default is 4096.
+        """
+        self.folder = folder
+        self.dtype = dtype
+        self.flush_every = flush_every
+        self._indexes = {}
+
+    def _index(self, horizon):
+        if horizon not in self._indexes:
+            self._indexes[horizon] = _HorizonIndex(os.path.join(self.folder, horizon), self.dtype)
+        return self._indexes[horizon]
+
+    def count(self, horizon):
+        """
+        Returns
+        -------
+        count : int
+            Number of vectors of the horizon, including unflushed ones.
+        """
+        index = self._index(horizon)
+        return index.size + index.pending
+
+    def add(self, horizon, features, times, spacecraft):
+        """
+        Parameters
+        ----------
+        horizon : string
+            Horizon of the model that produced the features.
+        features : array
+            Array of shape (N, dim) returned by 'extract_features'.
+        times : list
+            Centre (datetime) of each window.
+        spacecraft : string or list
+            Spacecraft ("ACE", "STA" or "STB") of all the windows, or of each.
+            Windows whose centre and spacecraft are already in the store
+            are skipped, so a resumed or repeated run adds no duplicates.
+
+        Returns
+        -------
+        None
+        """
+        features = np.asarray(features)
+        if isinstance(spacecraft, str):
+            spacecraft = [spacecraft] * len(features)
+        if not len(features) == len(times) == len(spacecraft):
+            raise Exception("'features', 'times' and 'spacecraft' must have the same length.")
+        if not len(features):
+            return
+        codes = np.array([SPACECRAFTS.index(check_spacecraft(sc)) for sc in spacecraft], dtype=np.int8)
+        times = np.array(pd.to_datetime(list(times)).values, dtype='datetime64[ns]').astype(np.int64)
+        index = self._index(horizon)
+        new = index.new_rows(times, codes)
+        if not new.any():
+            return
+        index.add(features[new], times[new], codes[new])
+        if index.pending >= self.flush_every:
+            index.flush()
+
+    def flush(self):
+        """
+        Write the pending vectors of every horizon to disk.
+
+        Returns
+        -------
+        None
+        """
+        for index in self._indexes.values():
+            index.flush()
+
+    def build(self, horizon, n_lists=None, iterations=10, sample=65536, seed=0):
+        """
+        Build (or rebuild) the IVF index of a horizon over all its vectors.
+
+        Parameters
+        ----------
+        horizon : string
+            Horizon to index.
+        n_lists : int, optional
+            Number of k-means lists. If None, about 4 * sqrt(N).
+            The default is None.
+        iterations : int, optional
+            Number of k-means iterations. The default is 10.
+        sample : int, optional
+            Number of vectors the centroids are trained on. The default is 65536.
+        seed : int, optional
+            Seed of the sampling and initialisation. The default is 0.
+
+        Returns
+        -------
+        None
+        """
+        index = self._index(horizon)
+        total = index.size + index.pending
+        if total == 0:
+            raise Exception("The store has no vectors for horizon '" + horizon + "'.")
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(total)))
+        index.build(n_lists, iterations, sample, seed)
+
+    def search(self, horizon, features, k=10, n_probe=8):
+        """
+        Parameters
+        ----------
+        horizon : string
+            Horizon of the model that produced the features.
+        features : array
+            Array of shape (dim,) or (Q, dim) with the query vectors.
+        k : int, optional
+            Number of neighbours per query. The default is 10.
+        n_probe : int, optional
+            Number of IVF lists searched, if the index is built. Higher is
+            slower but more exact. The default is 8.
+
+        Returns
+        -------
+        neighbours : pd.DataFrame
+            Columns 'query' (row of features), 'time', 'spacecraft' and
+            'score' (cosine similarity), best first within each query.
+            Unflushed vectors are flushed before searching.
+        """
+        index = self._index(horizon)
+        index.flush()
+        queries = normalize(np.atleast_2d(features))
+        rows = []
+        for q, query in enumerate(queries):
+            scores, ids = index.search(query, k, n_probe)
+            if len(ids):
+                rows.append(pd.DataFrame({'query': q,
+                                          'time': pd.to_datetime(index._gather(ids, 1)),
+                                          'spacecraft': [SPACECRAFTS[c] for c in index._gather(ids, 2)],
+                                          'score': scores}))
+        if not rows:
+            return pd.DataFrame({'query': [], 'time': pd.to_datetime([]), 'spacecraft': [], 'score': []})
+        return pd.concat(rows, ignore_index=True)
+
+    def similar(self, event, horizon='30m', spacecraft='ACE', k=10, n_probe=8, model=None, store=None,
+                renderer=render_window):
+        """
+        Find the stored windows most similar to an event or an image.
+
+        Parameters
+        ----------
+        event : string, datetime or array
+            Window centre, in the format "%Y-%m-%d %H:%M:%S" if a string,
+            whose window is loaded and rendered; or an image path or array
+            (see IPSRNet 'load_images').
+        horizon : string, optional
+            Either "20m", "30m", "60m" or "120m". The default is '30m'.
+        spacecraft : string, optional
+            Either "ACE", "STA" or "STB", used when event is a time.
+            The default is 'ACE'.
+        k : int, optional
+            Number of neighbours. The default is 10.
+        n_probe : int, optional
+            Number of IVF lists searched. The default is 8.
+        model : IPSRNet instance, optional
+            Model for the horizon. If None, the shared instance of
+            Registry.get_model is used. The default is None.
+        store : DataStore.SeriesStore, optional
+            Local store from which the data is served. The default is None.
+        renderer : callable, optional
+            Function renderer(df_b, df_p, s, e) returning the image.
+            The default is Render.render_window.
+
+        Returns
+        -------
+        neighbours : pd.DataFrame
+            See 'search'. A stored copy of the event itself scores 1.
+        """
+        if model is None:
+            from Registry import get_model
+            model = get_model(horizon)
+        if isinstance(event, np.ndarray) or (isinstance(event, str) and os.path.exists(event)):
+            image = event
+        else:
+            from IPSRNet import TIME_WINDOWS
+            s, e = window_bounds(parse_date(event, 'event'), TIME_WINDOWS[horizon])
+            df_b, df_p = load_series(spacecraft, s, e, store=store)
+            image = renderer(df_b.loc[s:e], df_p.loc[s:e], s, e)
+        features = model.extract_features(model.load_images([image]))
+        return self.search(horizon, features, k=k, n_probe=n_probe)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
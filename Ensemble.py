@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:18:05 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import numpy as np
+from IPSRNet import TIME_WINDOWS
+from DataStore import check_spacecraft, load_series, parse_date
+from Render import render_window, save_window, window_bounds
+
+HORIZONS = ('20m', '30m', '60m', '120m')
+FILE_PREFIXES = {'ACE': 'ACE', 'STA': 'STEREO-A', 'STB': 'STEREO-B'}
+
+def fuse_outputs(outputs, fusion='mean', weights=None):
+    """
+    Combine the outputs of several horizons into one.
+
+    Parameters
+    ----------
+    outputs : dict
+        Output [Prob Neg, Prob FF, Prob FR] of each horizon.
+    fusion : string, optional
+        'mean' (weighted arithmetic mean), 'geometric' (normalised weighted
+        geometric mean) or 'max' (the horizon with the highest shock
+        probability, Prob FF + Prob FR). The default is 'mean'.
+    weights : dict, optional
+        Weight of each horizon, 0 for the missing ones; their sum must be
+        positive. The default is equal weights.
+
+    Returns
+    -------
+    output : array
+        Fused output, in the format [Prob Neg, Prob FF, Prob FR].
+    """
+    horizons = list(outputs)
+    if not horizons:
+        raise Exception("'outputs' must contain the output of at least one horizon.")
+    probs = np.array([outputs[h] for h in horizons], dtype=np.float64)
+    w = np.array([1.0 if weights is None else weights.get(h, 0.0) for h in horizons])
+    if w.sum() <= 0:
+        raise Exception("'weights' must give a positive total weight to the horizons " + ', '.join(horizons) + ".")
+    w = w / w.sum()
+    if fusion == 'mean':
+        return (w[:, None] * probs).sum(axis=0)
+    if fusion == 'geometric':
+        fused = np.exp((w[:, None] * np.log(np.clip(probs, 1e-12, 1))).sum(axis=0))
+        return fused / fused.sum()
+    if fusion == 'max':
+        return probs[np.argmax(probs[:, 1] + probs[:, 2])]
+    raise Exception("Only 'mean', 'geometric' or 'max' are valid values for 'fusion' parameter.")
+
+def run_event(shock_date, spacecraft='ACE', horizons=HORIZONS, store=None, registry=None,
+              fusion=None, weights=None, renderer=render_window, folder_to_save=None):
+    """
+    Classify an event with several horizons from a single fetch.
+
+    The widest window of the selected horizons is fetched once, and the
+    window of each horizon is sliced from it, rendered and classified by
+    its IPSRNet instance.
+
+    Parameters
+    ----------
+    shock_date : string or datetime
+        Date to analyze the occurrence of an interplanetary shock wave.
+        If shock_date is a string must be in the format "%Y-%m-%d %H:%M:%S".
+    spacecraft : string, optional
+        Either "ACE", "STA" or "STB" (case-insensitive). The default is 'ACE'.
+    horizons : tuple, optional
+        Horizons to run, among "20m", "30m", "60m" and "120m".
+        The default is all of them.
+    store : DataStore.SeriesStore, optional
+        Local store from which the data is served. The default is None.
+    registry : Registry.ModelRegistry, optional
+        Registry providing the models. The default is Registry.registry.
+    fusion : string, optional
+        Fusion of the outputs, see fuse_outputs. None disables it.
+        The default is None.
+    weights : dict, optional
+        Weight of each horizon for the fusion. The default is None.
+    renderer : callable, optional
+        Function renderer(df_b, df_p, s, e) returning the image.
+        The default is Render.render_window.
+    folder_to_save : string, optional
+        If given, each window is also saved in this folder, named as in
+        Example.py (e.g. "ACE 30 2015-03-17 04-05-00.png"). The default is None.
+
+    Returns
+    -------
+    result : dict
+        Keys 'time', 'spacecraft', 'outputs' (output of each horizon,
+        [Prob Neg, Prob FF, Prob FR]) and 'fused' (fused output, or None).
+    """
+    date = parse_date(shock_date)
+    sc = check_spacecraft(spacecraft)
+    if not horizons:
+        raise Exception("'horizons' must contain at least one horizon.")
+    for horizon in horizons:
+        if horizon not in TIME_WINDOWS:
+            raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizons' parameter.")
+    if registry is None:
+        from Registry import registry
+
+    date_start, date_end = window_bounds(date, max(TIME_WINDOWS[h] for h in horizons))
+    df_b, df_p = load_series(sc, date_start, date_end, store=store)
+
+    outputs = {}
+    for horizon in horizons:
+        s, e = window_bounds(date, TIME_WINDOWS[horizon])
+        image = renderer(df_b.loc[s:e], df_p.loc[s:e], s, e)
+        if folder_to_save is not None:
+            name = FILE_PREFIXES[sc] + ' ' + horizon[:-1] + ' ' + date.strftime('%Y-%m-%d %H-%M-%S') + '.png'
+            save_window(image, os.path.join(folder_to_save, name))
+        with registry.use(horizon) as model:
+            outputs[horizon] = model.predict(image)
+
+    fused = None if fusion is None else fuse_outputs(outputs, fusion=fusion, weights=weights)
+    return {'time': date, 'spacecraft': sc, 'outputs': outputs, 'fused': fused}
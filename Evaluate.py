@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:48:03 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import check_spacecraft, load_series
+from Render import render_window, window_bounds
+
+HORIZONS = ('20m', '30m', '60m', '120m')
+
+def read_catalogue(path):
+    """
+    Parameters
+    ----------
+    path : string
+        CSV or Parquet file with columns 'time' (shock or negative window
+        centre), 'spacecraft' ("ACE", "STA" or "STB") and 'label' ('Neg',
+        'FF' or 'FR', or 0, 1, 2).
+
+    Returns
+    -------
+    catalogue : pd.DataFrame
+        Columns 'time' (datetime), 'spacecraft' (upper case) and 'label'
+        (0 Neg, 1 FF, 2 FR), in the order of the file.
+    """
+    catalogue = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    missing = {'time', 'spacecraft', 'label'} - set(catalogue.columns)
+    if missing:
+        raise Exception("The catalogue has no " + ', '.join(sorted(missing)) + " column.")
+    catalogue = catalogue[['time', 'spacecraft', 'label']].copy()
+    catalogue['time'] = pd.to_datetime(catalogue['time'])
+    catalogue['spacecraft'] = [check_spacecraft(sc) for sc in catalogue['spacecraft']]
+    catalogue['label'] = [LABELS.index(l) if isinstance(l, str) else int(l) for l in catalogue['label']]
+    return catalogue.reset_index(drop=True)
+
+def catalogue_hash(catalogue):
+    """
+    Parameters
+    ----------
+    catalogue : pd.DataFrame
+        DataFrame returned by read_catalogue.
+
+    Returns
+    -------
+    digest : string
+        Hash of the content of the catalogue, stored in the checkpoint.
+    """
+    return hashlib.sha1(pd.util.hash_pandas_object(catalogue, index=True).values.tobytes()).hexdigest()
+
+def confusion_scores(matrix):
+    """
+    Parameters
+    ----------
+    matrix : array
+        Confusion matrix of shape (3, 3), true classes in rows and
+        predicted classes in columns.
+
+    Returns
+    -------
+    scores : dict
+        'TSS', 'macroRecall' and 'recall' of each class, computed as
+        Utils.TSS and Utils.macroRecall on one-hot (argmax) predictions.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    recall = np.diag(matrix) / (matrix.sum(axis=1) + 1e-07)
+    return {'TSS': float((recall[1] + recall[2]) / 2 + recall[0] - 1),
+            'macroRecall': float(recall.mean()),
+            'recall': {label: float(r) for label, r in zip(LABELS, recall)}}
+
+class Evaluation():
+    def __init__(self, horizons=HORIZONS, checkpoint=None, catalogue=None):
+        """
+        Initializes the confusion matrices of an evaluation, accumulated
+        batch by batch so that predictions are never kept.
+
+        Parameters
+        ----------
+        horizons : tuple, optional
+            Horizons evaluated. The default is all of them.
+        checkpoint : string, optional
+            JSON file where the state is saved by 'save'. If it exists, the
+            evaluation resumes from it. The default is None.
+        catalogue : string, optional
+            catalogue_hash of the catalogue evaluated. A checkpoint written
+            for another catalogue is not resumed. The default is None.
+        """
+        self.horizons = tuple(horizons)
+        self.checkpoint = checkpoint
+        self.catalogue = catalogue
+        self.matrices = {h: np.zeros((3, 3), dtype=np.int64) for h in self.horizons}
+        self.done = 0
+        self.failed = []
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                state = json.load(f)
+            if tuple(state['horizons']) != self.horizons:
+                raise Exception("The checkpoint " + checkpoint + " was written for other horizons.")
+            if state['done'] and state.get('catalogue') != catalogue:
+                raise Exception("The checkpoint " + checkpoint + " was written for another catalogue.")
+            self.matrices = {h: np.array(state['matrices'][h], dtype=np.int64) for h in self.horizons}
+            self.done = state['done']
+            self.failed = state['failed']
+
+    def update(self, horizon, labels, outputs):
+        """
+        Parameters
+        ----------
+        horizon : string
+            Horizon of the outputs.
+        labels : array
+            True class of each sample (0 Neg, 1 FF, 2 FR).
+        outputs : array
+            Array of shape (N, 3) with the outputs of the model.
+
+        Returns
+        -------
+        None
+        """
+        np.add.at(self.matrices[horizon], (np.asarray(labels), np.argmax(outputs, axis=1)), 1)
+
+    def save(self):
+        """
+        Write the state to the checkpoint file, if any.
+
+        Returns
+        -------
+        None
+        """
+        if self.checkpoint is None:
+            return
+        state = {'horizons': list(self.horizons), 'catalogue': self.catalogue, 'done': self.done, 'failed': self.failed,
+                 'matrices': {h: m.tolist() for h, m in self.matrices.items()}}
+        with open(self.checkpoint + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.checkpoint + '.tmp', self.checkpoint)
+
+    def report(self):
+        """
+        Returns
+        -------
+        report : dict
+            For each horizon, its confusion matrix, number of events and
+            scores (see confusion_scores); plus the number of events done
+            and the failed ones.
+        """
+        report = {'done': self.done, 'failed': self.failed, 'horizons': {}}
+        for horizon, matrix in self.matrices.items():
+            report['horizons'][horizon] = dict(confusion_scores(matrix), events=int(matrix.sum()),
+                                               confusion=matrix.tolist())
+        return report
+
+def _flush_outputs(horizons, registry, embeddings):
+    # written before each checkpoint, so a resumed run is in step with them
+    if embeddings is not None:
+        embeddings.flush()
+    for horizon in horizons:
+        with registry.use(horizon) as model:
+            if model.feature_cache is not None:
+                model.feature_cache.flush()
+
+def evaluate(catalogue, horizons=HORIZONS, store=None, registry=None, batch_size=32, renderer=render_window,
+             checkpoint=None, checkpoint_every=256, verbose=False, embeddings=None):
+    """
+    Evaluate the models of several horizons on a catalogue of labelled events.
+
+    Events are processed in batches of batch_size. The widest window of each
+    event is fetched once (from the store if given), the window of every
+    horizon is sliced from it and rendered, and each horizon classifies the
+    whole batch at once. Only the confusion matrices are kept. The
+    state is checkpointed every checkpoint_every events, and a new call with
+    the same checkpoint and catalogue resumes after the last saved event.
+
+    Parameters
+    ----------
+    catalogue : string or pd.DataFrame
+        Catalogue file or the DataFrame returned by read_catalogue.
+    horizons : tuple, optional
+        Horizons to evaluate. The default is all of them.
+    store : DataStore.SeriesStore, optional
+        Local store from which the data is served. The default is None.
+    registry : Registry.ModelRegistry, optional
+        Registry providing the models, whose feature_cache is used if set.
+        The default is Registry.registry.
+    batch_size : int, optional
+        Number of events classified at a time. The default is 32.
+    renderer : callable, optional
+        Function renderer(df_b, df_p, s, e) returning the image.
+        The default is Render.render_window.
+    checkpoint : string, optional
+        JSON file of the checkpoint. The default is None.
+    checkpoint_every : int, optional
+        Number of events between checkpoints. The default is 256.
+    verbose : bool, optional
+        If True, print the progress at each checkpoint. The default is False.
+    embeddings : Embeddings.EmbeddingStore, optional
+        Store where the features of every event are recorded, per horizon,
+        with its time and spacecraft. The default is None.
+
+    Returns
+    -------
+    report : dict
+        See Evaluation.report.
+    """
+    if isinstance(catalogue, str):
+        catalogue = read_catalogue(catalogue)
+    for horizon in horizons:
+        if horizon not in TIME_WINDOWS:
+            raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizons' parameter.")
+    if registry is None:
+        from Registry import registry
+
+    evaluation = Evaluation(horizons, checkpoint=checkpoint, catalogue=catalogue_hash(catalogue))
+    widest = max(TIME_WINDOWS[h] for h in horizons)
+    saved = evaluation.done
+    for first in range(evaluation.done, len(catalogue), batch_size):
+        rows = catalogue.iloc[first:first + batch_size]
+        images = {h: [] for h in horizons}
+        labels = []
+        events = []
+        for index, row in rows.iterrows():
+            date = row['time'].to_pydatetime()
+            try:
+                df_b, df_p = load_series(row['spacecraft'], *window_bounds(date, widest), store=store)
+                windows = {}
+                for horizon in horizons:
+                    s, e = window_bounds(date, TIME_WINDOWS[horizon])
+                    windows[horizon] = renderer(df_b.loc[s:e], df_p.loc[s:e], s, e)
+            except Exception as error:
+                evaluation.failed.append({'index': int(index), 'error': str(error)})
+                continue
+            for horizon in horizons:
+                images[horizon].append(windows[horizon])
+            labels.append(row['label'])
+            events.append((date, row['spacecraft']))
+
+        if labels:
+            for horizon in horizons:
+                with registry.use(horizon) as model:
+                    if embeddings is None:
+                        outputs = model.predict_batch(images[horizon], batch_size=batch_size)
+                    else:
+                        outputs, features = model.predict_batch(images[horizon], batch_size=batch_size, return_features=True)
+                        embeddings.add(horizon, features, [t for t, _ in events], [sc for _, sc in events])
+                    evaluation.update(horizon, labels, outputs)
+        evaluation.done = first + len(rows)
+        if evaluation.done - saved >= checkpoint_every:
+            _flush_outputs(horizons, registry, embeddings)
+            evaluation.save()
+            saved = evaluation.done
+            if verbose:
+                print(evaluation.done, '/', len(catalogue), 'events')
+    _flush_outputs(horizons, registry, embeddings)
+    evaluation.save()
+    return evaluation.report()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate IPSRNet models on a catalogue of labelled events.')
+    parser.add_argument('catalogue', help='CSV or Parquet file with time, spacecraft and label columns.')
+    parser.add_argument('--horizons', nargs='+', default=list(HORIZONS))
+    parser.add_argument('--store', default=None, help='Folder of a DataStore.SeriesStore.')
+    parser.add_argument('--feature-cache', default=None, help='Folder of a FeatureCache.FeatureCache.')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--checkpoint', default=None, help='JSON checkpoint, resumed if it exists.')
+    parser.add_argument('--checkpoint-every', type=int, default=256)
+    parser.add_argument('--embeddings', default=None, help='Folder of an Embeddings.EmbeddingStore recording the features.')
+    parser.add_argument('--output', default='evaluation.json')
+    args = parser.parse_args()
+
+    from DataStore import SeriesStore
+    from Registry import registry
+    store = None if args.store is None else SeriesStore(args.store)
+    if args.feature_cache is not None:
+        from FeatureCache import FeatureCache
+        cache = FeatureCache(args.feature_cache)
+        for horizon in args.horizons:
+            registry.get(horizon).feature_cache = cache
+    embeddings = None
+    if args.embeddings is not None:
+        from Embeddings import EmbeddingStore
+        embeddings = EmbeddingStore(args.embeddings)
+    report = evaluate(args.catalogue, horizons=tuple(args.horizons), store=store, registry=registry,
+                      batch_size=args.batch_size, checkpoint=args.checkpoint,
+                      checkpoint_every=args.checkpoint_every, verbose=True, embeddings=embeddings)
+    if embeddings is not None:
+        embeddings.flush()
+    if args.feature_cache is not None:
+        cache.flush()
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for horizon, scores in report['horizons'].items():
+        print(horizon, 'TSS %.4f macroRecall %.4f' % (scores['TSS'], scores['macroRecall']), scores['recall'])
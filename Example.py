@@ -7,37 +7,41 @@ Created on Fri Nov 29 12:38:39 2024
 
 from ACE import ACE
 from STEREO import STEREO
-import IPSRNet
+from Registry import get_model
+from DataStore import SeriesStore
 
 import warnings
 warnings.filterwarnings('ignore')
 
-modelo20 = IPSRNet.IPSR20N()
-modelo30 = IPSRNet.IPSR30N()
-modelo60 = IPSRNet.IPSR60N()
-#modelo120 = IPSRNet.IPSR120N()
+# models are loaded on first use and shared between calls
+# each day of data is downloaded once and then served from the local store
+store = SeriesStore('Data')
+
+# the rendered windows are classified in memory; set to False to skip
+# also writing them to the case studies folder
+save_images = True
 
 s = '2015-03-17 04:05:00'
 
 name = 'Case studies/ACE 20 ' + s.replace(':', '-') + '.png'
-ACE(s, name, time_window=10)
-saida = modelo20.predict(name)
+image = ACE(s, name if save_images else None, time_window=10, store=store)
+saida = get_model('20m').predict(image)
 print('FF shock at 2015-03-17 04:05')
 print('20 minutes Net -->', saida)
 
 name = 'Case studies/ACE 30 ' + s.replace(':', '-') + '.png'
-ACE(s, name, time_window=15)
-saida = modelo30.predict(name)
+image = ACE(s, name if save_images else None, time_window=15, store=store)
+saida = get_model('30m').predict(image)
 print('30 minutes Net -->', saida)
 
 name = 'Case studies/ACE 60 ' + s.replace(':', '-') + '.png'
-ACE(s, name, time_window=30)
-saida = modelo60.predict(name)
+image = ACE(s, name if save_images else None, time_window=30, store=store)
+saida = get_model('60m').predict(image)
 print('60 minutes Net -->', saida)
 
 #name = 'Case studies/ACE 120 ' + s.replace(':', '-') + '.png'
-#ACE(s, name, time_window=60)
-#saida = modelo120.predict(name)
+#image = ACE(s, name if save_images else None, time_window=60, store=store)
+#saida = get_model('120m').predict(image)
 #print('120 minutes Net -->', saida)
 
 print('\n\n')
@@ -45,22 +49,22 @@ print('\n\n')
 s = '2016-07-22 23:12:00'
 
 name = 'Case studies/STEREO-A 20 ' + s.replace(':', '-') + '.png'
-STEREO(s, name, time_window=10, spacecraft='STA')
-saida = modelo20.predict(name)
+image = STEREO(s, name if save_images else None, time_window=10, spacecraft='STA', store=store)
+saida = get_model('20m').predict(image)
 print('FR shock at 2016-07-22 23:12')
 print('20 minutes Net -->', saida)
 
 name = 'Case studies/STEREO-A 30 ' + s.replace(':', '-') + '.png'
-STEREO(s, name, time_window=15, spacecraft='STA')
-saida = modelo30.predict(name)
+image = STEREO(s, name if save_images else None, time_window=15, spacecraft='STA', store=store)
+saida = get_model('30m').predict(image)
 print('30 minutes Net -->', saida)
 
 name = 'Case studies/STEREO-A 60 ' + s.replace(':', '-') + '.png'
-STEREO(s, name, time_window=30, spacecraft='STA')
-saida = modelo60.predict(name)
+image = STEREO(s, name if save_images else None, time_window=30, spacecraft='STA', store=store)
+saida = get_model('60m').predict(image)
 print('60 minutes Net -->', saida)
 
 #name = 'Case studies/STEREO-A 120 ' + s.replace(':', '-') + '.png'
-#STEREO(s, name, time_window=60, spacecraft='STA')
-#saida = modelo120.predict(name)
+#image = STEREO(s, name if save_images else None, time_window=60, spacecraft='STA', store=store)
+#saida = get_model('120m').predict(image)
 #print('120 minutes Net -->', saida)
\ No newline at end of file
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:26:48 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import glob
+import json
+import argparse
+import numpy as np
+from FeatureCache import image_key
+
+QUANTIZATIONS = (None, 'float16', 'int8')
+
+def _calibration_batches(model, images, limit=200):
+    # one uint8 image per batch, resized to the model input
+    for image in images[:limit]:
+        yield model.load_images([image]).astype(np.uint8)
+
+def _save_calibration(path, model, images, limit=200):
+    # keys of the calibration windows, so evaluations can exclude them
+    keys = [image_key(batch[0]) for batch in _calibration_batches(model, images, limit)]
+    with open(path + '.calibration.json', 'w') as f:
+        json.dump(keys, f)
+
+def calibration_keys(path):
+    """
+    Parameters
+    ----------
+    path : string
+        File written by export_tflite or export_onnx.
+
+    Returns
+    -------
+    keys : set
+        FeatureCache.image_key of each resized window the int8 model was
+        calibrated on, or an empty set if it was not calibrated.
+    """
+    if not os.path.exists(path + '.calibration.json'):
+        return set()
+    with open(path + '.calibration.json') as f:
+        return set(json.load(f))
+
+def export_tflite(model, path, quantization=None, calibration_images=None):
+    """
+    Export the fused model of an IPSRNet instance (preprocessing, backbone
+    and head) to TensorFlow Lite.
+
+    Parameters
+    ----------
+    model : IPSRNet instance
+        Instance to export.
+    path : string
+        Output .tflite file.
+    quantization : string, optional
+        None (float32), 'float16' (float16 weights) or 'int8' (post-training
+        integer quantization calibrated on calibration_images, with float
+        fallback for unsupported ops). The default is None.
+    calibration_images : list, optional
+        Rendered windows (paths or arrays) used to calibrate 'int8'. They
+        are recorded next to the output (see calibration_keys), and must
+        not be used to evaluate it. The default is None.
+
+    Returns
+    -------
+    path : string
+        Output file.
+    """
+    import tensorflow as tf
+    if quantization not in QUANTIZATIONS:
+        raise Exception("Only None, 'float16' or 'int8' are valid values for 'quantization' parameter.")
+
+    fused = model.fuse()
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([fused.get_concrete_function()], fused)
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if not calibration_images:
+            raise Exception("'calibration_images' is required for int8 quantization.")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([batch] for batch in _calibration_batches(model, calibration_images))
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+    if quantization == 'int8':
+        _save_calibration(path, model, calibration_images)
+    return path
+
+class _CalibrationReader():
+    def __init__(self, name, batches):
+        self.name = name
+        self.batches = iter(batches)
+
+    def get_next(self):
+        batch = next(self.batches, None)
+        return None if batch is None else {self.name: batch}
+
+def export_onnx(model, path, quantization=None, calibration_images=None, opset=17):
+    """
+    Export the fused model of an IPSRNet instance to ONNX, with tf2onnx.
+
+    Parameters
+    ----------
+    model : IPSRNet instance
+        Instance to export.
+    path : string
+        Output .onnx file.
+    quantization : string, optional
+        None (float32), 'float16' (with onnxconverter-common) or 'int8'
+        (static quantization with onnxruntime, calibrated on
+        calibration_images). The default is None.
+    calibration_images : list, optional
+        Rendered windows (paths or arrays) used to calibrate 'int8'. They
+        are recorded next to the output (see calibration_keys), and must
+        not be used to evaluate it. The default is None.
+    opset : int, optional
+        ONNX opset. The default is 17.
+
+    Returns
+    -------
+    path : string
+        Output file.
+    """
+    try:
+        import tf2onnx
+    except ImportError:
+        raise Exception("Exporting to ONNX requires the 'tf2onnx' package.")
+    if quantization not in QUANTIZATIONS:
+        raise Exception("Only None, 'float16' or 'int8' are valid values for 'quantization' parameter.")
+
+    fused = model.fuse()
+    output = path if quantization is None else path + '.float32.onnx'
+    onnx_model, _ = tf2onnx.convert.from_function(fused, input_signature=fused.input_signature, opset=opset, output_path=output)
+
+    if quantization == 'float16':
+        from onnxconverter_common import float16
+        import onnx
+        onnx.save(float16.convert_float_to_float16(onnx_model, keep_io_types=True), path)
+    elif quantization == 'int8':
+        if not calibration_images:
+            raise Exception("'calibration_images' is required for int8 quantization.")
+        from onnxruntime.quantization import quantize_static, QuantType
+        reader = _CalibrationReader(onnx_model.graph.input[0].name, _calibration_batches(model, calibration_images))
+        quantize_static(output, path, reader, weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8)
+        _save_calibration(path, model, calibration_images)
+    if output != path:
+        os.remove(output)
+    return path
+
+class TFLiteRunner():
+    def __init__(self, path, num_threads=None):
+        """
+        Runs an exported .tflite model. Not thread-safe.
+
+        Parameters
+        ----------
+        path : string
+            File written by export_tflite.
+        num_threads : int, optional
+            Number of CPU threads of the interpreter. The default is None.
+        """
+        import tensorflow as tf
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.input = self.interpreter.get_input_details()[0]['index']
+        self.output = self.interpreter.get_output_details()[0]['index']
+        self._batch_size = None
+
+    def __call__(self, images):
+        if images.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(self.input, images.shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = images.shape[0]
+        self.interpreter.set_tensor(self.input, images)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output).copy()
+
+class ONNXRunner():
+    def __init__(self, path, num_threads=None):
+        """
+        Runs an exported .onnx model with onnxruntime on CPU.
+
+        Parameters
+        ----------
+        path : string
+            File written by export_onnx.
+        num_threads : int, optional
+            Number of intra-op threads. The default is None.
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            raise Exception("Running ONNX models requires the 'onnxruntime' package.")
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input = self.session.get_inputs()[0].name
+
+    def __call__(self, images):
+        return self.session.run(None, {self.input: images})[0]
+
+def load_artifact(path, num_threads=None):
+    """
+    Parameters
+    ----------
+    path : string
+        Exported .tflite or .onnx file.
+    num_threads : int, optional
+        Number of CPU threads. The default is None.
+
+    Returns
+    -------
+    runner : TFLiteRunner or ONNXRunner
+        Callable mapping a uint8 batch (N, H, W, 3) to the probabilities
+        of each class.
+    """
+    if path.endswith('.tflite'):
+        return TFLiteRunner(path, num_threads=num_threads)
+    if path.endswith('.onnx'):
+        return ONNXRunner(path, num_threads=num_threads)
+    raise Exception("Only .tflite or .onnx files are valid values for 'path' parameter.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export IPSRNet models to TFLite/ONNX.')
+    parser.add_argument('--horizons', nargs='+', default=['20m', '30m', '60m', '120m'])
+    parser.add_argument('--format', choices=['tflite', 'onnx'], default='tflite')
+    parser.add_argument('--quantization', choices=['float16', 'int8'], default=None)
+    parser.add_argument('--calibration', default=None,
+                        help='Held-out folder of rendered windows (.png) for int8 calibration.')
+    parser.add_argument('--calibration-catalogue', default=None,
+                        help='Catalogue (time, spacecraft, label) whose windows are rendered for int8 calibration.')
+    parser.add_argument('--store', default=None, help='SeriesStore folder of the calibration catalogue windows.')
+    parser.add_argument('--output', default='Networks/export')
+    args = parser.parse_args()
+    if args.quantization == 'int8' and args.calibration is None and args.calibration_catalogue is None:
+        parser.error("int8 quantization requires --calibration or --calibration-catalogue, "
+                     "disjoint from the windows the export is evaluated on.")
+
+    from IPSRNet import MODELS
+    from DataStore import SeriesStore
+    os.makedirs(args.output, exist_ok=True)
+    calibration = [] if args.calibration is None else sorted(glob.glob(os.path.join(args.calibration, '*.png')))
+    for horizon in args.horizons:
+        images = list(calibration)
+        if args.quantization == 'int8' and args.calibration_catalogue is not None:
+            from Benchmark import catalogue_images
+            store = SeriesStore(args.store) if args.store else None
+            images += [image for image, _ in catalogue_images(horizon, args.calibration_catalogue, store=store)]
+        model = MODELS[horizon]()
+        suffix = '' if args.quantization is None else '_' + args.quantization
+        path = os.path.join(args.output, horizon + suffix + '.' + args.format)
+        export = export_tflite if args.format == 'tflite' else export_onnx
+        export(model, path, quantization=args.quantization, calibration_images=images)
+        print(horizon, '->', path)
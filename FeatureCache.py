@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 11:20:03 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import json
+import atexit
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from numpy.lib.format import open_memmap
+
+def image_key(image):
+    """
+    Parameters
+    ----------
+    image : array
+        Image as fed to the feature extractor, before normalisation.
+
+    Returns
+    -------
+    key : string
+        Hash of the image content and shape.
+    """
+    image = np.ascontiguousarray(image)
+    digest = hashlib.sha1(image.data)
+    digest.update(str((image.shape, image.dtype.str)).encode())
+    return digest.hexdigest()
+
+class _BackboneStore():
+    """
+    Feature maps of a single backbone, stored in fixed-size chunks of
+    memory-mapped .npy files and indexed by a JSON file kept in LRU order.
+
+    The slot of an evicted entry is only reused once an index without its
+    old key has been written, so that the index on disk never points to a
+    slot holding the features of another image, even if the process is
+    killed before its next flush.
+    """
+    def __init__(self, folder, dtype, chunk_size, max_entries):
+        self.folder = folder
+        self.max_entries = max_entries
+        self._chunks = {}
+        self._unflushed = 0
+        # evicted slots, still referenced by the index on disk
+        self._evicted = []
+
+        path = os.path.join(folder, 'index.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                index = json.load(f)
+            self.dim = index['dim']
+            self.dtype = np.dtype(index['dtype'])
+            self.chunk_size = index['chunk_size']
+            self.next_slot = index['next_slot']
+            self.entries = OrderedDict(index['entries'])
+            self.free = index.get('free', [])
+        else:
+            os.makedirs(folder, exist_ok=True)
+            self.dim = None
+            self.dtype = np.dtype(dtype)
+            self.chunk_size = chunk_size
+            self.next_slot = 0
+            self.entries = OrderedDict()
+            self.free = []
+
+    def _chunk(self, n, create=False):
+        if n not in self._chunks:
+            path = os.path.join(self.folder, 'chunk_%05d.npy' % n)
+            if create and not os.path.exists(path):
+                self._chunks[n] = open_memmap(path, mode='w+', dtype=self.dtype, shape=(self.chunk_size, self.dim))
+            else:
+                self._chunks[n] = np.load(path, mmap_mode='r+')
+        return self._chunks[n]
+
+    def get(self, key):
+        slot = self.entries.get(key)
+        if slot is None:
+            return None
+        self.entries.move_to_end(key)
+        return np.array(self._chunk(slot // self.chunk_size)[slot % self.chunk_size], dtype=np.float32)
+
+    def put(self, key, feature):
+        if self.dim is None:
+            self.dim = int(feature.shape[-1])
+        if key in self.entries:
+            slot = self.entries.pop(key)
+        else:
+            if self.max_entries is not None and len(self.entries) >= self.max_entries:
+                self._evicted.append(self.entries.popitem(last=False)[1])
+            if self.free:
+                slot = self.free.pop()
+            else:
+                slot = self.next_slot
+                self.next_slot += 1
+        self._chunk(slot // self.chunk_size, create=True)[slot % self.chunk_size] = feature
+        self.entries[key] = slot
+        self._unflushed += 1
+
+    def flush(self):
+        for chunk in self._chunks.values():
+            chunk.flush()
+        index = {'dim': self.dim, 'dtype': self.dtype.str, 'chunk_size': self.chunk_size,
+                 'next_slot': self.next_slot, 'entries': list(self.entries.items()),
+                 'free': self.free + self._evicted}
+        path = os.path.join(self.folder, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(path + '.tmp', path)
+        self.free += self._evicted
+        self._evicted = []
+        self._unflushed = 0
+
+class FeatureCache():
+    def __init__(self, folder, dtype='float32', max_entries=None, chunk_size=1024, flush_every=1024):
+        """
+        Initializes a persistent cache of feature maps produced by the
+        backbones (deepmodel) of the IPSRNet instances.
+
+        Features are keyed by the hash of the resized image and by the
+        backbone identity, so a cache hit skips the backbone and only the
+        MLP head has to run.
+
+        The folder must not be shared by several processes at once: there
+        is no locking, and each process would overwrite the index and the
+        slots of the others.
+
+        Parameters
+        ----------
+        folder : string
+            Folder where the cache is stored. One subfolder per backbone.
+        dtype : string, optional
+            Storage type of the features. 'float16' halves the disk usage.
+            Only used for backbones that are not yet in the cache.
+            The default is 'float32'.
+        max_entries : int, optional
+            Maximum number of feature maps kept per backbone; the least
+            recently used ones are replaced first. None means no limit.
+            Slots of replaced entries are reused after the next flush, so
+            the chunks can hold up to flush_every more feature maps.
+            The default is None.
+        chunk_size : int, optional
+            Number of feature maps per memory-mapped chunk file.
+            The default is 1024.
+        flush_every : int, optional
+            Number of insertions after which the index is written to disk.
+            Pending insertions are also written when the process exits.
+            The default is 1024.
+        """
+        self.folder = folder
+        self.dtype = dtype
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self.flush_every = flush_every
+        self._stores = {}
+        self.hits = 0
+        self.misses = 0
+        # the instances writing to the cache (IPSRNet, Scan, Server) never
+        # flush it, so pending entries are indexed when the process exits
+        atexit.register(self.flush)
+
+    def _store(self, backbone):
+        if backbone not in self._stores:
+            self._stores[backbone] = _BackboneStore(os.path.join(self.folder, backbone), self.dtype, self.chunk_size, self.max_entries)
+        return self._stores[backbone]
+
+    key = staticmethod(image_key)
+
+    def get_many(self, backbone, keys):
+        """
+        Parameters
+        ----------
+        backbone : string
+            Identity of the feature extractor, e.g. 'vgg19'.
+        keys : list
+            Keys returned by 'key' for each image.
+
+        Returns
+        -------
+        features : list
+            Feature map (float32 array) for each key, or None if missing.
+        """
+        store = self._store(backbone)
+        features = [store.get(key) for key in keys]
+        hits = sum(f is not None for f in features)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return features
+
+    def put_many(self, backbone, keys, features):
+        """
+        Parameters
+        ----------
+        backbone : string
+            Identity of the feature extractor, e.g. 'vgg19'.
+        keys : list
+            Keys returned by 'key' for each image.
+        features : array
+            Array of shape (len(keys), dim) with the feature maps.
+
+        Returns
+        -------
+        None
+        """
+        store = self._store(backbone)
+        for key, feature in zip(keys, features):
+            store.put(key, feature)
+        if store._unflushed >= self.flush_every:
+            store.flush()
+
+    def flush(self):
+        """
+        Write the pending index changes of every backbone to disk.
+
+        Returns
+        -------
+        None
+        """
+        for store in self._stores.values():
+            store.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -5,157 +5,706 @@ Created on Sat Nov 23 20:36:42 2024
 @author: Luís Eduardo Sales do Nascimento
 """
 
-from tensorflow.keras.applications import InceptionV3, VGG19, VGG16
-from tensorflow.keras.applications.inception_v3 import preprocess_input as inceptionV3_preprocess
-from tensorflow.keras.applications.vgg19 import preprocess_input as vgg19_preprocess
-from tensorflow.keras import Model 
-from tensorflow.keras.models import load_model
+# TensorFlow, Keras and cv2 are imported on first use, so that importing
+# this module (e.g. for TIME_WINDOWS or LABELS) stays fast
+import os
+from itertools import islice
 import numpy as np
 from Utils import load_image, TSS, macroRecall
+from Metrics import metrics
 
-class IPSR20N():
-    def __init__(self):
+# classes of the output, in order
+LABELS = ('Neg', 'FF', 'FR')
+
+# precisions of the feature extractor, see _IPSRNet.set_precision
+PRECISIONS = ('float32', 'bfloat16', 'float16')
+
+# mean of the ImageNet BGR channels removed by the 'caffe' preprocessing of VGG
+VGG_MEAN = [103.939, 116.779, 123.68]
+
+# folder of the truncated backbones and heads saved by build_snapshot
+SNAPSHOT_FOLDER = 'Networks/snapshot'
+
+_preprocess_layer = None
+
+def _define_preprocess():
+    global _preprocess_layer
+    if _preprocess_layer is not None:
+        return _preprocess_layer
+    import tensorflow as tf
+    from tensorflow.keras.layers import Layer
+    from tensorflow.keras.utils import register_keras_serializable
+
+    @register_keras_serializable(package='IPSRNet')
+    class Preprocess(Layer):
+        def __init__(self, mode, mean=None, std=None, **kwargs):
+            """
+            Graph layer mapping uint8 images to the input of a feature extractor.
+
+            Parameters
+            ----------
+            mode : string
+                'inception' (scale to [-1, 1]), 'caffe' (channel flip and VGG_MEAN
+                subtraction, as vgg19.preprocess_input), 'scale' (divide by 255)
+                or 'standardize' ((x - mean)/std).
+            mean : array, optional
+                Mean image of shape (H, W, 3), for 'standardize'. The default is None.
+            std : array, optional
+                Standard deviation image of shape (H, W, 3), for 'standardize'.
+                The default is None.
+            """
+            super().__init__(**kwargs)
+            self.mode = mode
+            self.mean = None if mean is None else np.asarray(mean, dtype=np.float32)
+            self.std = None if std is None else np.asarray(std, dtype=np.float32)
+
+        def call(self, images):
+            x = tf.cast(images, tf.float32)
+            if self.mode == 'inception':
+                return x / 127.5 - 1.0
+            if self.mode == 'caffe':
+                return x[..., ::-1] - tf.constant(VGG_MEAN, dtype=tf.float32)
+            if self.mode == 'scale':
+                return x / 255.0
+            return (x - tf.constant(self.mean)) / tf.constant(self.std)
+
+        def get_config(self):
+            config = super().get_config()
+            config.update({'mode': self.mode,
+                           'mean': None if self.mean is None else self.mean.tolist(),
+                           'std': None if self.std is None else self.std.tolist()})
+            return config
+
+    _preprocess_layer = Preprocess
+    return Preprocess
+
+def __getattr__(name):
+    # the Preprocess layer is defined, and registered in Keras, on first access
+    if name == 'Preprocess':
+        return _define_preprocess()
+    raise AttributeError("module 'IPSRNet' has no attribute '" + name + "'")
+
+def _load_model(path, compile=True):
+    from tensorflow.keras.models import load_model
+    return load_model(path, custom_objects={"TSS":TSS, "macroRecall":macroRecall}, compile=compile)
+
+def _truncate(deepmodel):
+    # feature extractor ending at the penultimate layer
+    from tensorflow.keras import Model
+    return Model(inputs=deepmodel.input, outputs=deepmodel.layers[-2].output)
+
+class _IPSRNet():
+    """
+    Common prediction logic shared by the IPSRNet instances.
+
+    Subclasses define 'build_backbone' (feature extractor), 'head' (file
+    of the MLP head), 'target_size', 'backbone' and 'preprocess', and call
+    'load_networks' to set 'self.deepmodel' and 'self.finalmodel'. When a
+    snapshot written by 'save_snapshot' is present, both networks are
+    loaded from it instead of rebuilding the ImageNet backbone.
+
+    Setting 'feature_cache' to a FeatureCache.FeatureCache makes the
+    instance reuse the feature maps of images it has already seen, running
+    only the MLP head for them.
+
+    Calling 'fuse' replaces the NumPy preprocessing and the two networks by
+    a single compiled graph, used whenever no feature cache is set. The
+    same path runs models exported to TFLite/ONNX ('load_artifact').
+
+    'set_precision' runs the feature extractor in bfloat16 or float16,
+    the MLP head staying in float32.
+    """
+    horizon = None
+    precision = 'float32'
+    target_size = (224, 224)
+    backbone = None
+    head = None
+    preprocessing = None
+    feature_cache = None
+    fused = None
+
+    def build_backbone(self):
         """
-        Initializes a IPSRNet instance, for 20 minutes of observed data.
-        
-        This instance consists of 2 neural networks, the first one is the 
-        Inception-V3 used to extract features from the images of solar wind 
-        and interplanetary magnetic field parameters and the second one is an 
-        MLP trained to classify whether there is an interplanetary shock wave 
-        FF, FR or none.
+        Returns
+        -------
+        deepmodel : keras Model
+            Feature extractor, built from its pretrained weights.
         """
-        self.deepmodel = InceptionV3(include_top=True, weights='imagenet', input_shape=(299, 299, 3))
-        self.deepmodel = Model(inputs=self.deepmodel.input, outputs=self.deepmodel.layers[-2].output)
-        
-        self.finalmodel = load_model('Networks/20m.keras', custom_objects={"TSS":TSS, "macroRecall":macroRecall})
-        
-    def predict(self, image_path):
+        raise NotImplementedError
+
+    def snapshot_paths(self, folder=SNAPSHOT_FOLDER):
+        """
+        Returns
+        -------
+        backbone_path : string
+            Snapshot of the feature extractor, '<folder>/<horizon>_backbone.keras'.
+        head_path : string
+            Snapshot of the MLP head, '<folder>/<horizon>_head.keras'.
         """
+        return (os.path.join(folder, self.horizon + '_backbone.keras'),
+                os.path.join(folder, self.horizon + '_head.keras'))
+
+    def load_networks(self, snapshot=SNAPSHOT_FOLDER):
+        """
+        Set 'deepmodel' and 'finalmodel', from the snapshot if it exists and
+        is not older than the head file, otherwise by building them.
+
         Parameters
         ----------
-        image_path : string
-            Path to the saved image file. 
+        snapshot : string, optional
+            Folder of the snapshot, or None to always build the networks.
+            The default is SNAPSHOT_FOLDER.
 
         Returns
         -------
-        output : array
-            Output array with probability of each class for the sample. 
-            The array follows the format [Prob Neg, Prob FF, Prob FR]
+        from_snapshot : bool
+            Whether the snapshot was loaded.
         """
-        image = np.array([load_image(image_path, target_size=(299,299))])
-        processedimage = inceptionV3_preprocess(image)
-        featureMap = np.array(self.deepmodel.predict(processedimage, verbose=0))
-        output = self.finalmodel.predict(featureMap, verbose=0)[0]
-        return output
+        if snapshot is not None:
+            backbone_path, head_path = self.snapshot_paths(snapshot)
+            if (os.path.exists(backbone_path) and os.path.exists(head_path)
+                    and os.path.getmtime(head_path) >= os.path.getmtime(self.head)):
+                with metrics.timer('snapshot_load_seconds', horizon=self.horizon):
+                    self.deepmodel = _load_model(backbone_path, compile=False)
+                    self.finalmodel = _load_model(head_path, compile=False)
+                return True
+        self.deepmodel = self.build_backbone()
+        self.finalmodel = _load_model(self.head)
+        return False
 
-class IPSR30N():
-    def __init__(self):
+    def save_snapshot(self, folder=SNAPSHOT_FOLDER):
         """
-        Initializes a IPSRNet instance, for 30 minutes of observed data.
-        
-        This instance consists of 2 neural networks, the first one is the 
-        VGG19 used to extract features from the images of solar wind 
-        and interplanetary magnetic field parameters and the second one is an 
-        MLP trained to classify whether there is an interplanetary shock wave 
-        FF, FR or none.
+        Save the float32 feature extractor and the MLP head, so that later
+        instances load them with 'load_networks'.
+
+        Parameters
+        ----------
+        folder : string, optional
+            Folder of the snapshot. The default is SNAPSHOT_FOLDER.
+
+        Returns
+        -------
+        paths : tuple
+            Paths of the backbone and head snapshots.
         """
-        self.deepmodel = VGG19(include_top=True, weights='imagenet', pooling=None, input_shape=(224, 224, 3))
-        self.deepmodel = Model(inputs=self.deepmodel.input, outputs=self.deepmodel.layers[-2].output)
-        
-        self.finalmodel = load_model('Networks/30m.keras', custom_objects={"TSS":TSS, "macroRecall":macroRecall})
-        
-    def predict(self, image_path):
+        if self.precision != 'float32':
+            raise Exception("Only float32 instances can be saved as a snapshot.")
+        os.makedirs(folder, exist_ok=True)
+        paths = self.snapshot_paths(folder)
+        for network, path in zip([self.deepmodel, self.finalmodel], paths):
+            # Keras requires the .keras suffix, so the temporary file keeps it
+            tmp = path[:-len('.keras')] + '.tmp.keras'
+            network.save(tmp)
+            os.replace(tmp, path)
+        return paths
+
+    def preprocess(self, images):
         """
         Parameters
         ----------
-        image_path : string
-            Path to the saved image file. 
+        images : array
+            Array of shape (N, H, W, 3) with the resized images.
 
         Returns
         -------
-        output : array
-            Output array with probability of each class for the sample. 
-            The array follows the format [Prob Neg, Prob FF, Prob FR]
+        processedimages : array
+            Images normalised as expected by the feature extractor.
         """
-        image = np.array([load_image(image_path, target_size=(224,224))])
-        processedimage = vgg19_preprocess(image)
-        featureMap = np.array(self.deepmodel.predict(processedimage, verbose=0))
-        output = self.finalmodel.predict(featureMap, verbose=0)[0]
-        return output
-    
-class IPSR60N():
-    def __init__(self):
+        raise NotImplementedError
+
+    def load_images(self, images):
         """
-        Initializes a IPSRNet instance, for 60 minutes of observed data.
-        
-        This instance consists of 2 neural networks, the first one is the 
-        VGG16 used to extract features from the images of solar wind 
-        and interplanetary magnetic field parameters and the second one is an 
-        MLP trained to classify whether there is an interplanetary shock wave 
-        FF, FR or none.
+        Parameters
+        ----------
+        images : list or array
+            List of paths to saved image files and/or image arrays, or an
+            array of shape (N, H, W, 3). Arrays must follow the channel order
+            of 'Utils.load_image' (BGR) and are resized to 'target_size' if
+            needed.
+
+        Returns
+        -------
+        batch : array
+            Array of shape (N, target_size[1], target_size[0], 3).
         """
-        self.deepmodel = VGG16(include_top=True, weights='imagenet', pooling=None, input_shape=(224, 224, 3))
-        self.deepmodel = Model(inputs=self.deepmodel.input, outputs=self.deepmodel.layers[-2].output)
-        
-        self.finalmodel = load_model('Networks/1h.keras', custom_objects={"TSS":TSS, "macroRecall":macroRecall})
-        
-    def predict(self, image_path):
+        if isinstance(images, np.ndarray) and images.ndim == 4:
+            if images.shape[2:0:-1] == self.target_size:
+                return images
+
+        batch = []
+        for image in images:
+            if isinstance(image, (str, os.PathLike)):
+                image = load_image(os.fspath(image), target_size=self.target_size)
+            elif image.shape[1::-1] != self.target_size:
+                import cv2
+                image = cv2.resize(image, self.target_size, interpolation=cv2.INTER_AREA)
+            batch.append(image)
+        return np.array(batch)
+
+    def extract_features(self, batch):
+        """
+        Parameters
+        ----------
+        batch : array
+            Array of shape (N, H, W, 3) returned by 'load_images'.
+
+        Returns
+        -------
+        featureMap : array
+            Array of shape (N, dim) with the penultimate-layer features of
+            the feature extractor.
+        """
+        self._check_networks("'extract_features'")
+        if self.feature_cache is None:
+            return self._backbone(batch)
+
+        keys = [self.feature_cache.key(image) for image in batch]
+        # features of a reduced precision backbone are cached apart
+        space = self.backbone if self.precision == 'float32' else self.backbone + '_' + self.precision
+        features = self.feature_cache.get_many(space, keys)
+        missing = [i for i, feature in enumerate(features) if feature is None]
+        metrics.count('feature_cache_hits_total', len(keys) - len(missing), backbone=self.backbone)
+        metrics.count('feature_cache_misses_total', len(missing), backbone=self.backbone)
+        if missing:
+            computed = self._backbone(batch[missing])
+            self.feature_cache.put_many(space, [keys[i] for i in missing], computed)
+            for i, feature in zip(missing, computed):
+                features[i] = feature
+        return np.array(features, dtype=np.float32)
+
+    def _check_networks(self, use):
+        if self.deepmodel is None:
+            raise Exception(use + " needs the Keras networks, which are not loaded on instances built with 'from_artifact'.")
+
+    def _backbone(self, batch):
+        with metrics.timer('preprocess_seconds', horizon=self.horizon):
+            processedimages = self.preprocess(batch)
+        with metrics.timer('backbone_seconds', horizon=self.horizon):
+            return np.asarray(self.deepmodel.predict_on_batch(processedimages))
+
+    def set_precision(self, precision):
+        """
+        Run the feature extractor in reduced precision.
+
+        The feature extractor is cloned with every layer in the given dtype
+        policy, so that its weights are stored, and its activations computed,
+        with 16 bits, halving the memory traffic of the large convolutional
+        and fully connected layers. Its output is cast back to float32 for
+        the MLP head, which is unchanged. bfloat16 keeps the range of
+        float32 and is fast on CPUs with AVX512-BF16/AMX; float16 is mostly
+        useful on GPUs.
+
+        Parameters
+        ----------
+        precision : string
+            Either 'float32', 'bfloat16' or 'float16'. It can only be changed
+            once from 'float32', since the float32 weights are released.
+
+        Returns
+        -------
+        deepmodel : keras Model
+            The new feature extractor.
+        """
+        if precision not in PRECISIONS:
+            raise Exception("Only 'float32', 'bfloat16' or 'float16' are valid values for 'precision' parameter.")
+        if precision == self.precision:
+            return self.deepmodel
+        if self.precision != 'float32':
+            raise Exception("The precision of an instance can only be set once; build a new instance instead.")
+        from tensorflow.keras import Model
+        from tensorflow.keras.layers import Activation, InputLayer
+        from tensorflow.keras.models import clone_model
+
+        def clone(layer):
+            if isinstance(layer, InputLayer):
+                return layer.__class__.from_config(layer.get_config())
+            if isinstance(layer, Model):
+                return clone_model(layer, clone_function=clone)
+            config = layer.get_config()
+            config['dtype'] = precision
+            return layer.__class__.from_config(config)
+
+        reduced = clone_model(self.deepmodel, clone_function=clone)
+        reduced.set_weights(self.deepmodel.get_weights())
+        outputs = Activation('linear', dtype='float32')(reduced.output)
+        self.deepmodel = Model(inputs=reduced.input, outputs=outputs)
+        self.precision = precision
+        self.fused = None
+        return self.deepmodel
+
+    def fused_model(self):
+        """
+        Returns
+        -------
+        model : keras Model
+            Model mapping uint8 images of shape (N, H, W, 3) to the
+            probabilities of each class, with the preprocessing as a
+            Preprocess layer followed by deepmodel and finalmodel.
+        """
+        from tensorflow.keras import Model, Input
+        Preprocess = _define_preprocess()
+        inputs = Input(shape=(self.target_size[1], self.target_size[0], 3), dtype='uint8')
+        x = Preprocess(self.preprocessing, getattr(self, 'mean', None), getattr(self, 'std', None))(inputs)
+        x = self.deepmodel(x)
+        outputs = self.finalmodel(x)
+        return Model(inputs=inputs, outputs=outputs)
+
+    def fuse(self, jit_compile=False):
+        """
+        Build the fused model and compile it into a single tf.function, used
+        by the predict methods from then on.
+
+        Parameters
+        ----------
+        jit_compile : bool, optional
+            Compile the graph with XLA. The default is False.
+
+        Returns
+        -------
+        fused : tf.function
+            Function mapping a uint8 batch of shape (N, H, W, 3) to the
+            probabilities of each class.
+        """
+        import tensorflow as tf
+        model = self.fused_model()
+        signature = [tf.TensorSpec([None, self.target_size[1], self.target_size[0], 3], tf.uint8)]
+
+        @tf.function(input_signature=signature, jit_compile=jit_compile)
+        def fused(images):
+            return model(images, training=False)
+
+        self.fused = fused
+        return fused
+
+    def load_artifact(self, path, num_threads=None):
+        """
+        Run the predict methods on a model exported by Export.py (.tflite or
+        .onnx) instead of the Keras networks.
+
+        Parameters
+        ----------
+        path : string
+            Exported file.
+        num_threads : int, optional
+            Number of CPU threads of the runtime. The default is None.
+
+        Returns
+        -------
+        runner : callable
+            Runtime mapping a uint8 batch to the probabilities of each class.
         """
+        from Export import load_artifact
+        self.fused = load_artifact(path, num_threads=num_threads)
+        return self.fused
+
+    @classmethod
+    def from_artifact(cls, path, num_threads=None):
+        """
+        Build an instance running only on an exported model, without
+        loading the Keras networks ('extract_features', 'return_features'
+        and a feature cache raise an exception).
+
         Parameters
         ----------
-        image_path : string
-            Path to the saved image file. 
+        path : string
+            File written by Export.export_tflite or Export.export_onnx.
+        num_threads : int, optional
+            Number of CPU threads of the runtime. The default is None.
 
         Returns
         -------
+        model : IPSRNet instance
+        """
+        model = cls.__new__(cls)
+        model.deepmodel = None
+        model.finalmodel = None
+        model.load_artifact(path, num_threads=num_threads)
+        return model
+
+    def iter_predict_batch(self, images, batch_size=32, return_features=False):
+        """
+        Parameters
+        ----------
+        images : iterable or array
+            Iterable of image paths and/or arrays, or an array of shape
+            (N, H, W, 3). See 'load_images'. Images are only read as each
+            chunk is reached, so a generator can be streamed through.
+        batch_size : int, optional
+            Number of images run through both networks at a time.
+            The default is 32.
+        return_features : bool, optional
+            If True, also yield the features of the chunk (see
+            'extract_features'), e.g. to record them in an
+            Embeddings.EmbeddingStore. The fused graph is not used then.
+            The default is False.
+
+        Yields
+        ------
         output : array
-            Output array with probability of each class for the sample. 
-            The array follows the format [Prob Neg, Prob FF, Prob FR]
+            Array of shape (n, 3) with the probabilities of each class for
+            the next chunk of at most batch_size samples, in input order.
+            Each row follows the format [Prob Neg, Prob FF, Prob FR]
+        featureMap : array
+            Array of shape (n, dim) with the features of the chunk, only
+            if return_features is True.
         """
-        image = np.array([load_image(image_path, target_size=(224,224))])
-        processedimage = image/255
-        featureMap = np.array(self.deepmodel.predict(processedimage, verbose=0))
-        output = self.finalmodel.predict(featureMap, verbose=0)[0]
-        return output
+        if return_features:
+            self._check_networks("'return_features'")
+        if isinstance(images, np.ndarray):
+            chunks = (images[i:i+batch_size] for i in range(0, len(images), batch_size))
+        else:
+            iterator = iter(images)
+            chunks = iter(lambda: list(islice(iterator, batch_size)), [])
+
+        for chunk in chunks:
+            with metrics.timer('load_seconds', horizon=self.horizon):
+                batch = self.load_images(chunk)
+            if self.fused is not None and self.feature_cache is None and not return_features:
+                with metrics.timer('fused_seconds', horizon=self.horizon):
+                    output = np.asarray(self.fused(np.asarray(batch, dtype=np.uint8)))
+            else:
+                featureMap = self.extract_features(batch)
+                with metrics.timer('head_seconds', horizon=self.horizon):
+                    output = np.asarray(self.finalmodel.predict_on_batch(featureMap))
+            if metrics.enabled:
+                counts = np.bincount(np.argmax(output, axis=1), minlength=3)
+                for label, n in zip(LABELS, counts):
+                    metrics.count('predictions_total', int(n), horizon=self.horizon, label=label)
+            yield (output, featureMap) if return_features else output
 
-class IPSR120N():
-    def __init__(self):
+    def predict_batch(self, images, batch_size=32, return_features=False):
         """
-        Initializes a IPSRNet instance, for 30 minutes of observed data.
-        
-        This instance consists of 2 neural networks, the first one is the 
-        Painters used to extract features from the images of solar wind 
-        and interplanetary magnetic field parameters and the second one is an 
-        MLP trained to classify whether there is an interplanetary shock wave 
-        FF, FR or none.
+        Parameters
+        ----------
+        images : iterable or array
+            Iterable of image paths and/or arrays, or an array of shape
+            (N, H, W, 3). See 'load_images'.
+        batch_size : int, optional
+            Number of images run through both networks at a time.
+            The default is 32.
+        return_features : bool, optional
+            If True, also return the features of every sample.
+            The default is False.
+
+        Returns
+        -------
+        output : array
+            Array of shape (N, 3) with the probabilities of each class for
+            every sample. Each row follows the format [Prob Neg, Prob FF, Prob FR]
+        featureMap : array
+            Array of shape (N, dim) with the features of every sample, only
+            if return_features is True.
         """
-        self.deepmodel = load_model('Networks/painters.keras')
-        
-        self.finalmodel = load_model('Networks/2h.keras', custom_objects={"TSS":TSS, "macroRecall":macroRecall})
-        
+        if return_features:
+            chunks = list(self.iter_predict_batch(images, batch_size=batch_size, return_features=True))
+            if not chunks:
+                return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 0), dtype=np.float32)
+            return np.concatenate([o for o, _ in chunks]), np.concatenate([f for _, f in chunks])
+        outputs = list(self.iter_predict_batch(images, batch_size=batch_size))
+        if not outputs:
+            return np.zeros((0, 3), dtype=np.float32)
+        return np.concatenate(outputs)
+
     def predict(self, image_path):
         """
         Parameters
         ----------
-        image_path : string
-            Path to the saved image file. 
+        image_path : string or array
+            Path to the saved image file, or an image already rendered in
+            memory (e.g. the array returned by ACE or STEREO).
 
         Returns
         -------
         output : array
-            Output array with probability of each class for the sample. 
+            Output array with probability of each class for the sample.
             The array follows the format [Prob Neg, Prob FF, Prob FR]
         """
-        image = np.array([load_image(image_path, target_size=(256,256))])
-        
-        processedimage = np.zeros_like(image, dtype=np.float32)
-        with np.load('painters_preprocessing_stats.npz') as stats:
-            mean = np.transpose(stats['mean'], (1, 2, 0))
-            std = np.transpose(stats['std'], (1, 2, 0))
-            for i in range(image.shape[0]):
-                aux = (image[i] - mean)/std
-                processedimage[i] = aux
-        
-        featureMap = np.array(self.deepmodel.predict(processedimage, verbose=0))
-        output = self.finalmodel.predict(featureMap, verbose=0)[0]
-        return output
\ No newline at end of file
+        return self.predict_batch([image_path], batch_size=1)[0]
+
+class IPSR20N(_IPSRNet):
+    horizon = '20m'
+    backbone = 'inception_v3'
+    target_size = (299, 299)
+    preprocessing = 'inception'
+    head = 'Networks/20m.keras'
+
+    def __init__(self, precision='float32', snapshot=SNAPSHOT_FOLDER):
+        """
+        Initializes a IPSRNet instance, for 20 minutes of observed data.
+
+        This instance consists of 2 neural networks, the first one is the
+        Inception-V3 used to extract features from the images of solar wind
+        and interplanetary magnetic field parameters and the second one is an
+        MLP trained to classify whether there is an interplanetary shock wave
+        FF, FR or none.
+
+        Parameters
+        ----------
+        precision : string, optional
+            Precision of the feature extractor, either 'float32', 'bfloat16'
+            or 'float16'. See 'set_precision'. The default is 'float32'.
+        snapshot : string, optional
+            Folder of the snapshot loaded instead of building the networks,
+            if present; None always builds them. See 'load_networks'.
+            The default is SNAPSHOT_FOLDER.
+        """
+        self.load_networks(snapshot)
+        self.set_precision(precision)
+
+    def build_backbone(self):
+        from tensorflow.keras.applications import InceptionV3
+        return _truncate(InceptionV3(include_top=True, weights='imagenet', input_shape=(299, 299, 3)))
+
+    def preprocess(self, images):
+        # inception_v3.preprocess_input
+        return images.astype(np.float32) / 127.5 - 1.0
+
+class IPSR30N(_IPSRNet):
+    horizon = '30m'
+    backbone = 'vgg19'
+    target_size = (224, 224)
+    preprocessing = 'caffe'
+    head = 'Networks/30m.keras'
+
+    def __init__(self, precision='float32', snapshot=SNAPSHOT_FOLDER):
+        """
+        Initializes a IPSRNet instance, for 30 minutes of observed data.
+
+        This instance consists of 2 neural networks, the first one is the
+        VGG19 used to extract features from the images of solar wind
+        and interplanetary magnetic field parameters and the second one is an
+        MLP trained to classify whether there is an interplanetary shock wave
+        FF, FR or none.
+
+        Parameters
+        ----------
+        precision : string, optional
+            Precision of the feature extractor, either 'float32', 'bfloat16'
+            or 'float16'. See 'set_precision'. The default is 'float32'.
+        snapshot : string, optional
+            Folder of the snapshot loaded instead of building the networks,
+            if present; None always builds them. See 'load_networks'.
+            The default is SNAPSHOT_FOLDER.
+        """
+        self.load_networks(snapshot)
+        self.set_precision(precision)
+
+    def build_backbone(self):
+        from tensorflow.keras.applications import VGG19
+        return _truncate(VGG19(include_top=True, weights='imagenet', pooling=None, input_shape=(224, 224, 3)))
+
+    def preprocess(self, images):
+        # vgg19.preprocess_input: RGB to BGR flip and VGG_MEAN subtraction
+        return images[..., ::-1].astype(np.float32) - np.array(VGG_MEAN, dtype=np.float32)
+
+class IPSR60N(_IPSRNet):
+    horizon = '60m'
+    backbone = 'vgg16'
+    target_size = (224, 224)
+    preprocessing = 'scale'
+    head = 'Networks/1h.keras'
+
+    def __init__(self, precision='float32', snapshot=SNAPSHOT_FOLDER):
+        """
+        Initializes a IPSRNet instance, for 60 minutes of observed data.
+
+        This instance consists of 2 neural networks, the first one is the
+        VGG16 used to extract features from the images of solar wind
+        and interplanetary magnetic field parameters and the second one is an
+        MLP trained to classify whether there is an interplanetary shock wave
+        FF, FR or none.
+
+        Parameters
+        ----------
+        precision : string, optional
+            Precision of the feature extractor, either 'float32', 'bfloat16'
+            or 'float16'. See 'set_precision'. The default is 'float32'.
+        snapshot : string, optional
+            Folder of the snapshot loaded instead of building the networks,
+            if present; None always builds them. See 'load_networks'.
+            The default is SNAPSHOT_FOLDER.
+        """
+        self.load_networks(snapshot)
+        self.set_precision(precision)
+
+    def build_backbone(self):
+        from tensorflow.keras.applications import VGG16
+        return _truncate(VGG16(include_top=True, weights='imagenet', pooling=None, input_shape=(224, 224, 3)))
+
+    def preprocess(self, images):
+        return images/255
+
+class IPSR120N(_IPSRNet):
+    horizon = '120m'
+    backbone = 'painters'
+    target_size = (256, 256)
+    preprocessing = 'standardize'
+    head = 'Networks/2h.keras'
+
+    def __init__(self, precision='float32', snapshot=SNAPSHOT_FOLDER):
+        """
+        Initializes a IPSRNet instance, for 30 minutes of observed data.
+
+        This instance consists of 2 neural networks, the first one is the
+        Painters used to extract features from the images of solar wind
+        and interplanetary magnetic field parameters and the second one is an
+        MLP trained to classify whether there is an interplanetary shock wave
+        FF, FR or none.
+
+        Parameters
+        ----------
+        precision : string, optional
+            Precision of the feature extractor, either 'float32', 'bfloat16'
+            or 'float16'. See 'set_precision'. The default is 'float32'.
+        snapshot : string, optional
+            Folder of the snapshot loaded instead of building the networks,
+            if present; None always builds them. See 'load_networks'.
+            The default is SNAPSHOT_FOLDER.
+        """
+        self.load_networks(snapshot)
+
+        with np.load('Networks/painters_preprocessing_stats.npz') as stats:
+            self.mean = np.transpose(stats['mean'], (1, 2, 0)).astype(np.float32)
+            self.std = np.transpose(stats['std'], (1, 2, 0)).astype(np.float32)
+        self.set_precision(precision)
+
+    def build_backbone(self):
+        return _load_model('Networks/painters.keras')
+
+    def preprocess(self, images):
+        return (images - self.mean)/self.std
+
+# IPSRNet instance and time_window (ACE/STEREO) for each observation horizon
+MODELS = {'20m': IPSR20N, '30m': IPSR30N, '60m': IPSR60N, '120m': IPSR120N}
+TIME_WINDOWS = {'20m': 10, '30m': 15, '60m': 30, '120m': 60}
+
+def build_snapshot(horizon, folder=SNAPSHOT_FOLDER):
+    """
+    Build the networks of a horizon once and save them as a snapshot, so
+    that new instances load the truncated backbone and the head directly
+    instead of rebuilding the ImageNet model.
+
+    Parameters
+    ----------
+    horizon : string
+        Either "20m", "30m", "60m" or "120m".
+    folder : string, optional
+        Folder of the snapshot. The default is SNAPSHOT_FOLDER.
+
+    Returns
+    -------
+    paths : tuple
+        Paths of the backbone and head snapshots.
+    """
+    if horizon not in MODELS:
+        raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizon' parameter.")
+    return MODELS[horizon](snapshot=None).save_snapshot(folder)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Build the snapshots of the IPSRNet networks.')
+    parser.add_argument('--horizons', nargs='+', default=list(MODELS))
+    parser.add_argument('--output', default=SNAPSHOT_FOLDER)
+    args = parser.parse_args()
+    for horizon in args.horizons:
+        print(horizon, '->', ', '.join(build_snapshot(horizon, args.output)))
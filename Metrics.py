@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:07:33 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import json
+import time
+import threading
+
+class _NullTimer():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer():
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _prometheus_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in items) + '}'
+
+class MetricsRegistry():
+    def __init__(self, prefix='ipsrnet'):
+        """
+        Initializes a registry of timers and counters.
+
+        The registry starts disabled: timers then return a shared no-op
+        context manager and counters return immediately, so the
+        instrumentation costs almost nothing until 'enable' is called.
+
+        Parameters
+        ----------
+        prefix : string, optional
+            Prefix of the metric names in the Prometheus export.
+            The default is 'ipsrnet'.
+        """
+        self.prefix = prefix
+        self.enabled = False
+        self._counters = {}
+        self._timings = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """
+        Clear every recorded value.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    def add_listener(self, listener):
+        """
+        Parameters
+        ----------
+        listener : callable
+            Called as listener(kind, name, value, labels) for every recorded
+            value, with kind either 'counter' or 'timer' (value in seconds).
+
+        Returns
+        -------
+        None
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def timer(self, name, **labels):
+        """
+        Parameters
+        ----------
+        name : string
+            Name of the timing, e.g. 'backbone_seconds'.
+        **labels
+            Labels of the timing, e.g. horizon='30m'.
+
+        Returns
+        -------
+        timer : context manager
+            Records the duration of the block when the registry is enabled.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record a duration, in seconds.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            timing = self._timings.setdefault(key, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+        for listener in self._listeners:
+            listener('timer', name, seconds, labels)
+
+    def count(self, name, value=1, **labels):
+        """
+        Increase a counter.
+
+        Parameters
+        ----------
+        name : string
+            Name of the counter, e.g. 'feature_cache_hits_total'.
+        value : int, optional
+            Increment. The default is 1.
+        **labels
+            Labels of the counter.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for listener in self._listeners:
+            listener('counter', name, value, labels)
+
+    def snapshot(self):
+        """
+        Returns
+        -------
+        snapshot : dict
+            'counters' and 'timers', lists of dicts with the name, labels
+            and values (count, sum, max and mean in seconds for timers).
+        """
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            timers = [{'name': name, 'labels': dict(labels), 'count': t[0], 'sum': t[1], 'max': t[2], 'mean': t[1] / t[0]}
+                      for (name, labels), t in sorted(self._timings.items())]
+        return {'counters': counters, 'timers': timers}
+
+    def to_json(self):
+        """
+        Returns
+        -------
+        text : string
+            The snapshot as JSON.
+        """
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self):
+        """
+        Returns
+        -------
+        text : string
+            Counters and timers (as summaries, plus a _max gauge) in the
+            Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        # each family is written as one block: its TYPE header, then all its samples
+        families = {}
+        def family(name, kind):
+            if name not in families:
+                families[name] = ['# TYPE %s %s' % (name, kind)]
+            return families[name]
+        for c in snapshot['counters']:
+            name = self.prefix + '_' + c['name']
+            family(name, 'counter').append('%s%s %s' % (name, _prometheus_labels(c['labels'].items()), c['value']))
+        for t in snapshot['timers']:
+            name = self.prefix + '_' + t['name']
+            labels = _prometheus_labels(t['labels'].items())
+            family(name, 'summary').extend(['%s_count%s %d' % (name, labels, t['count']),
+                                            '%s_sum%s %.9f' % (name, labels, t['sum'])])
+            family(name + '_max', 'gauge').append('%s_max%s %.9f' % (name, labels, t['max']))
+        lines = [line for block in families.values() for line in block]
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        """
+        Expose the metrics over HTTP in a daemon thread: Prometheus text at
+        /metrics and JSON at /metrics.json.
+
+        Parameters
+        ----------
+        port : int, optional
+            Port to listen on. The default is 9100.
+        host : string, optional
+            Address to bind. The default is '127.0.0.1'.
+
+        Returns
+        -------
+        server : http.server.ThreadingHTTPServer
+            Running server; call shutdown() to stop it.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+# process-wide registry used by the instrumented modules
+metrics = MetricsRegistry()
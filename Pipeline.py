@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 10:16:09 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: the children share the resource tracker of the parent,
+        # where the block is already registered, so they must not unregister it
+        return shared_memory.SharedMemory(name=name)
+
+def _pin(cpus):
+    if cpus is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+class ImageRing():
+    def __init__(self, slots, shape, name=None):
+        """
+        Initializes a ring of fixed-shape uint8 image slots in shared memory.
+
+        Parameters
+        ----------
+        slots : int
+            Number of images held.
+        shape : tuple
+            Shape (H, W, 3) of an image.
+        name : string, optional
+            Name of an existing block to attach to. If None, a new block
+            is created. The default is None.
+        """
+        self.slots = slots
+        self.shape = tuple(shape)
+        size = slots * int(np.prod(self.shape))
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(create=True, size=size) if self.owner else _attach(name)
+        self.name = self.shm.name
+        self.images = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def close(self):
+        """
+        Detach from the block, and remove it if this instance created it.
+
+        Returns
+        -------
+        None
+        """
+        del self.images
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _render_worker(ring_name, slots, shape, renderer, tasks, free, ready, cpus):
+    import cv2
+    import RenderPool
+    _pin(cpus)
+    RenderPool._init_worker(renderer)
+    ring = ImageRing(slots, shape, name=ring_name)
+    size = (shape[1], shape[0])
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            key, window = task
+            try:
+                image = RenderPool._renderer(*window)
+                if image.shape[1::-1] != size:
+                    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            except Exception as error:
+                ready.put((key, -1, str(error)))
+                continue
+            slot = free.get()
+            ring.images[slot] = image
+            ready.put((key, slot, None))
+    finally:
+        ring.close()
+
+def _inference_worker(ring_name, slots, shape, horizon, ready, free, results, batch_size, max_wait, threads, cpus):
+    _pin(cpus)
+    import tensorflow as tf
+    if threads is not None:
+        tf.config.threading.set_intra_op_parallelism_threads(threads[0])
+        tf.config.threading.set_inter_op_parallelism_threads(threads[1])
+    ring = ImageRing(slots, shape, name=ring_name)
+    try:
+        model, failure = None, None
+        try:
+            from IPSRNet import MODELS
+            model = MODELS[horizon]()
+        except Exception as error:
+            # every window is then answered with the error, so the parent never waits
+            failure = 'building the model failed: ' + str(error)
+        done = False
+        while not done:
+            items = [ready.get()]
+            while len(items) < batch_size and items[-1] is not None:
+                try:
+                    items.append(ready.get(timeout=max_wait))
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                items.pop()
+                done = True
+            failed = [(key, None, error) for key, slot, error in items if slot < 0]
+            batch = [(key, slot) for key, slot, _ in items if slot >= 0]
+            outputs = []
+            if batch:
+                # copy the images out of the ring so their slots are reused while inferring
+                images = ring.images[[slot for _, slot in batch]]
+                for _, slot in batch:
+                    free.put(slot)
+                try:
+                    if failure is not None:
+                        raise Exception(failure)
+                    outputs = [(key, output, None) for (key, _), output in zip(batch, model.predict_batch(images, batch_size=len(batch)))]
+                except Exception as error:
+                    outputs = [(key, None, str(error)) for key, _ in batch]
+            if failed or outputs:
+                results.put(failed + outputs)
+    finally:
+        ring.close()
+
+class Pipeline():
+    def __init__(self, horizon='30m', renderers=2, inference_workers=1, slots=64, batch_size=16, max_wait=0.01,
+                 renderer='matplotlib', threads=None, renderer_cpus=None, inference_cpus=None, start_method='spawn'):
+        """
+        Initializes a producer/consumer pipeline of rendering and inference
+        processes for one horizon.
+
+        Renderer processes write each window, resized to the input size of
+        the model, into a free slot of a shared memory ring of uint8 images
+        (ImageRing). Only slot indices go through the queues to the inference
+        processes, which gather up to batch_size ready slots, free them and
+        classify the batch, each with its own model, thread counts and CPU
+        affinity. Image arrays are never pickled.
+
+        Parameters
+        ----------
+        horizon : string, optional
+            Either "20m", "30m", "60m" or "120m". The default is '30m'.
+        renderers : int, optional
+            Number of renderer processes. The default is 2.
+        inference_workers : int, optional
+            Number of inference processes. The default is 1.
+        slots : int, optional
+            Number of images in the ring. The default is 64.
+        batch_size : int, optional
+            Largest batch of an inference process. The default is 16.
+        max_wait : float, optional
+            Longest time, in seconds, an inference process waits for a
+            batch to fill. The default is 0.01.
+        renderer : string or callable, optional
+            'matplotlib', 'raster' or a picklable function, see
+            RenderPool.RenderPool. The default is 'matplotlib'.
+        threads : tuple or list, optional
+            (intra_op, inter_op) TensorFlow threads of every inference
+            process, or a list with one tuple per process. The default is
+            None (TensorFlow defaults).
+        renderer_cpus : list, optional
+            Set of CPUs of each renderer process. The default is None.
+        inference_cpus : list, optional
+            Set of CPUs of each inference process. The default is None.
+        start_method : string, optional
+            multiprocessing start method. The default is 'spawn'.
+        """
+        # TensorFlow is only imported by the inference processes and the caller
+        from IPSRNet import MODELS
+        if horizon not in MODELS:
+            raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizon' parameter.")
+        if isinstance(threads, tuple) or threads is None:
+            threads = [threads] * inference_workers
+        width, height = MODELS[horizon].target_size
+        shape = (height, width, 3)
+        context = multiprocessing.get_context(start_method)
+        self.ring = ImageRing(slots, shape)
+        self.renderers = renderers
+        self.inference_workers = inference_workers
+        self._tasks = context.Queue()
+        self._free = context.Queue()
+        self._ready = context.Queue()
+        self._results = context.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._render_processes = [
+            context.Process(target=_render_worker, daemon=True,
+                            args=(self.ring.name, slots, shape, renderer, self._tasks, self._free, self._ready,
+                                  None if renderer_cpus is None else renderer_cpus[i]))
+            for i in range(renderers)]
+        self._inference_processes = [
+            context.Process(target=_inference_worker, daemon=True,
+                            args=(self.ring.name, slots, shape, horizon, self._ready, self._free, self._results,
+                                  batch_size, max_wait, threads[i], None if inference_cpus is None else inference_cpus[i]))
+            for i in range(inference_workers)]
+        for process in self._render_processes + self._inference_processes:
+            process.start()
+        self._in_flight = 2 * slots
+        # keys are unique across calls, so results left over by an
+        # interrupted imap are recognised and dropped
+        self._next_key = 0
+
+    def imap(self, windows):
+        """
+        Parameters
+        ----------
+        windows : iterable
+            (df_b, df_p, s, e) tuples, as taken by Render.render_window.
+            Consumed lazily.
+
+        Yields
+        ------
+        output : array
+            Output of each window, in the format [Prob Neg, Prob FF,
+            Prob FR], in the order of windows.
+        """
+        windows = iter(windows)
+        received = {}
+        first = sent = following = self._next_key
+        exhausted = False
+        while True:
+            while not exhausted and sent - following < self._in_flight:
+                window = next(windows, None)
+                if window is None:
+                    exhausted = True
+                    break
+                self._tasks.put((sent, window))
+                sent += 1
+                self._next_key = sent
+            if following == sent and exhausted:
+                return
+            for key, output, error in self._get_results():
+                if key < first:
+                    continue
+                if error is not None:
+                    raise Exception("Window " + str(key - first) + " failed: " + error)
+                received[key] = output
+            while following in received:
+                yield received.pop(following)
+                following += 1
+
+    def _get_results(self, timeout=1.0):
+        while True:
+            try:
+                return self._results.get(timeout=timeout)
+            except queue.Empty:
+                for process in self._render_processes + self._inference_processes:
+                    if not process.is_alive():
+                        raise Exception("A pipeline process stopped (exit code " + str(process.exitcode) + ").")
+
+    def map(self, windows):
+        """
+        Returns
+        -------
+        outputs : array
+            Array of shape (N, 3) with the output of each window.
+        """
+        outputs = list(self.imap(windows))
+        return np.array(outputs) if outputs else np.zeros((0, 3), dtype=np.float32)
+
+    def close(self):
+        """
+        Stop the processes and release the ring.
+
+        Returns
+        -------
+        None
+        """
+        for _ in self._render_processes:
+            self._tasks.put(None)
+        for process in self._render_processes:
+            process.join()
+        for _ in self._inference_processes:
+            self._ready.put(None)
+        for process in self._inference_processes:
+            process.join()
+        self.ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
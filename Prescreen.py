@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:21:16 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import numpy as np
+import pandas as pd
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import load_series, parse_date
+from Render import window_bounds
+from Metrics import metrics
+
+# loose jump criteria: ratios for BTOTAL, Np and Tp (either direction), km/s for Vp
+THRESHOLDS = {'BTOTAL': 1.1, 'Np': 1.1, 'Vp': 10.0, 'Tp': 1.1}
+
+def _side_means(times, values, lo, hi):
+    # mean of values over [lo, hi) for every row, from cumulative sums
+    valid = np.isfinite(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    i = np.searchsorted(times, lo, side='left')
+    j = np.searchsorted(times, hi, side='left')
+    n = counts[j] - counts[i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 0, (sums[j] - sums[i]) / n, np.nan)
+
+def jumps(df_b, df_p, centres, time_window, gap=1):
+    """
+    Compute the upstream/downstream jumps of every parameter for all
+    candidate centres at once.
+
+    The upstream side of a window is [start, centre - gap) and the downstream
+    side [centre + gap, end], with the bounds of Render.window_bounds.
+
+    Parameters
+    ----------
+    df_b : pd.DataFrame
+        DataFrame with column "BTOTAL", covering every window.
+    df_p : pd.DataFrame
+        DataFrame with columns "Np", "Vp" and "Tp", covering every window.
+    centres : list
+        Centres (datetime) of the windows.
+    time_window : int
+        Half duration of the windows, in minutes.
+    gap : int, optional
+        Minutes excluded on each side of the centre, to tolerate an
+        imprecise shock time. The default is 1.
+
+    Returns
+    -------
+    jumps : pd.DataFrame
+        One row per centre. BTOTAL, Np and Tp hold max(ratio, 1/ratio) of the
+        downstream and upstream means, so that both fast forward and fast
+        reverse shocks give values above 1, and Vp holds the absolute speed
+        jump in km/s.
+    """
+    c = pd.to_datetime(pd.Index(centres)).values.astype('datetime64[ns]').astype(np.int64)
+    minute = np.int64(60 * 10**9)
+    start = c - time_window * minute
+    end = c + (time_window - 1) * minute + 1
+    columns = {}
+    for name, df in [('BTOTAL', df_b), ('Np', df_p), ('Vp', df_p), ('Tp', df_p)]:
+        times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        values = df[name].to_numpy(dtype=np.float64)
+        up = _side_means(times, values, start, c - gap * minute)
+        down = _side_means(times, values, c + gap * minute, end)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if name == 'Vp':
+                columns[name] = np.abs(down - up)
+            else:
+                ratio = down / up
+                columns[name] = np.maximum(ratio, 1 / ratio)
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(centres))
+
+class Prescreen():
+    def __init__(self, thresholds=None, min_criteria=2, gap=1):
+        """
+        Initializes a physics-based filter run on the series before rendering,
+        so that quiet windows skip the CNN.
+
+        A window passes when at least min_criteria parameters jump by their
+        threshold. Windows with missing data on one side always pass, so
+        that gaps are left to the CNN.
+
+        Parameters
+        ----------
+        thresholds : dict, optional
+            Threshold of each parameter, see THRESHOLDS. The default is THRESHOLDS.
+        min_criteria : int, optional
+            Number of parameters that must jump. The default is 2.
+        gap : int, optional
+            Minutes excluded on each side of the centre. The default is 1.
+        """
+        self.thresholds = dict(THRESHOLDS) if thresholds is None else thresholds
+        self.min_criteria = min_criteria
+        self.gap = gap
+        self.windows = 0
+        self.skipped = 0
+
+    def mask(self, df_b, df_p, centres, time_window):
+        """
+        Parameters
+        ----------
+        df_b : pd.DataFrame
+            DataFrame with column "BTOTAL", covering every window.
+        df_p : pd.DataFrame
+            DataFrame with columns "Np", "Vp" and "Tp", covering every window.
+        centres : list
+            Centres (datetime) of the windows.
+        time_window : int
+            Half duration of the windows, in minutes.
+
+        Returns
+        -------
+        mask : array
+            True for the windows to render and classify.
+        """
+        passed = self._passes(df_b, df_p, centres, time_window)
+        self.windows += len(passed)
+        self.skipped += int((~passed).sum())
+        metrics.count('prescreen_windows_total', len(passed))
+        metrics.count('prescreen_skipped_total', int((~passed).sum()))
+        return passed
+
+    def _passes(self, df_b, df_p, centres, time_window):
+        if len(centres) == 0:
+            return np.zeros(0, dtype=bool)
+        j = jumps(df_b, df_p, centres, time_window, gap=self.gap)
+        values = j[list(self.thresholds)].to_numpy()
+        passed = (values >= np.array(list(self.thresholds.values()))).sum(axis=1) >= self.min_criteria
+        return passed | np.isnan(values).any(axis=1)
+
+    @property
+    def skipped_fraction(self):
+        return self.skipped / self.windows if self.windows else 0.0
+
+    def recall_loss(self, events, horizon='30m', store=None):
+        """
+        Measure the shocks of a labelled set that the filter would skip.
+
+        Parameters
+        ----------
+        events : iterable
+            (time, spacecraft, label) tuples, with time a datetime or a
+            string in the format "%Y-%m-%d %H:%M:%S" and label either 'Neg',
+            'FF' or 'FR' (or 0, 1, 2).
+        horizon : string, optional
+            Either "20m", "30m", "60m" or "120m". The default is '30m'.
+        store : DataStore.SeriesStore, optional
+            Local store from which the data is served. The default is None.
+
+        Returns
+        -------
+        report : dict
+            'recall_loss' (fraction of FF and FR events skipped), the same
+            per class in 'per_class', and 'negatives_skipped' (fraction of
+            negative events skipped). The skip counters are not changed.
+        """
+        time_window = TIME_WINDOWS[horizon]
+        total = {label: 0 for label in LABELS}
+        skipped = {label: 0 for label in LABELS}
+        for date, spacecraft, label in events:
+            date = parse_date(date, 'time')
+            label = LABELS[label] if not isinstance(label, str) else label
+            s, e = window_bounds(date, time_window)
+            df_b, df_p = load_series(spacecraft, s, e, store=store)
+            total[label] += 1
+            skipped[label] += int(not self._passes(df_b, df_p, [date], time_window)[0])
+
+        shocks = total['FF'] + total['FR']
+        return {'events': total,
+                'recall_loss': (skipped['FF'] + skipped['FR']) / shocks if shocks else 0.0,
+                'per_class': {label: skipped[label] / total[label] if total[label] else 0.0 for label in ['FF', 'FR']},
+                'negatives_skipped': skipped['Neg'] / total['Neg'] if total['Neg'] else 0.0}
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:30:52 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import math
+from functools import lru_cache
+import numpy as np
+import cv2
+from Metrics import metrics
+
+# Geometry of the matplotlib figure drawn by Render.draw_panels: a (4, 4)
+# inches figure with the default subplot parameters and hspace=0.2
+FIGSIZE = 4
+LEFT, RIGHT, BOTTOM, TOP = 0.125, 0.9, 0.11, 0.88
+HSPACE = 0.2
+MARGIN = 0.05
+# sizes in points
+SPINE_WIDTH = 0.25
+LINE_WIDTH = 0.3
+MARKER_SIZE = 1
+MARKER_EDGE_WIDTH = 0.1
+TICK_LENGTH = 1
+TICK_WIDTH = 0.25
+TICK_PAD = 0.5
+LABEL_SIZE = 5
+# DejaVu Sans metrics, in em
+GLYPH_WIDTHS = {'.': 0.318, '-': 0.838}
+DIGIT_WIDTH = 0.636
+DIGIT_HEIGHT = 0.729
+LINE_HEIGHT = 1.164
+
+def _nonsingular(vmin, vmax, expander=0.05, tiny=1e-15):
+    if vmax - vmin <= max(abs(vmin), abs(vmax)) * tiny:
+        if vmax == 0 and vmin == 0:
+            return -expander, expander
+        return vmin - expander*abs(vmin), vmax + expander*abs(vmax)
+    return vmin, vmax
+
+def y_limits(values):
+    """
+    Parameters
+    ----------
+    values : array
+        Values of a panel, possibly with NaN.
+
+    Returns
+    -------
+    vmin, vmax : float
+        Limits of the y axis, as set by matplotlib autoscaling (data
+        limits with 5% margins).
+    """
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return 0.0, 1.0
+    vmin, vmax = _nonsingular(float(values.min()), float(values.max()))
+    delta = (vmax - vmin) * MARGIN
+    return vmin - delta, vmax + delta
+
+def _closeto(ms, edge, step, offset):
+    if offset > 0:
+        digits = math.log10(offset / step)
+        tol = max(1e-10, 10 ** (digits - 12))
+        tol = min(0.4999, tol)
+    else:
+        tol = 1e-10
+    return abs(ms - edge) < tol
+
+def max_n_ticks(vmin, vmax, nbins=5, steps=(1, 2, 2.5, 5, 10), min_n_ticks=2):
+    """
+    Tick locations chosen by matplotlib.ticker.MaxNLocator(nbins).
+
+    Parameters
+    ----------
+    vmin, vmax : float
+        Limits of the axis.
+    nbins : int, optional
+        Maximum number of intervals. The default is 5.
+
+    Returns
+    -------
+    ticks : array
+        Ticks inside [vmin, vmax].
+    """
+    vmin, vmax = _nonsingular(vmin, vmax, expander=1e-13, tiny=1e-14)
+    steps = np.array(steps, dtype=float)
+    steps = np.concatenate([0.1 * steps[:-1], steps, [10 * steps[1]]])
+
+    dv = abs(vmax - vmin)
+    meanv = (vmax + vmin) / 2
+    if abs(meanv) / dv < 100:
+        offset = 0
+    else:
+        offset = math.copysign(10 ** (math.log10(abs(meanv)) // 1), meanv)
+    scale = 10 ** (math.log10(dv / nbins) // 1)
+
+    _vmin, _vmax = vmin - offset, vmax - offset
+    steps = steps * scale
+    raw_step = (_vmax - _vmin) / nbins
+    istep = np.nonzero(steps >= raw_step)[0][0]
+    for step in steps[istep:]:
+        best_vmin = (_vmin // step) * step
+        d, m = divmod(_vmin - best_vmin, step)
+        low = d + 1 if _closeto(m / step, 1, step, abs(offset)) else d
+        d, m = divmod(_vmax - best_vmin, step)
+        high = d if _closeto(m / step, 0, step, abs(offset)) else d + 1
+        ticks = np.arange(low, high + 1) * step + best_vmin
+        nticks = ((ticks <= _vmax) & (ticks >= _vmin)).sum()
+        if nticks >= min_n_ticks:
+            break
+    ticks = ticks + offset
+    eps = (vmax - vmin) * 1e-10
+    return ticks[(ticks >= vmin - eps) & (ticks <= vmax + eps)]
+
+def tick_labels(ticks):
+    """
+    Parameters
+    ----------
+    ticks : array
+        Tick locations.
+
+    Returns
+    -------
+    labels : list
+        Labels with the number of decimals matplotlib's ScalarFormatter uses.
+    """
+    if len(ticks) == 0:
+        return []
+    loc_range = np.ptp(ticks) if len(ticks) > 1 else 0
+    if loc_range == 0:
+        loc_range = np.max(np.abs(ticks)) or 1
+    loc_range_oom = int(math.floor(math.log10(loc_range)))
+    sigfigs = max(0, 3 - loc_range_oom)
+    thresh = 1e-3 * 10 ** loc_range_oom
+    while sigfigs >= 0:
+        if np.abs(ticks - np.round(ticks, decimals=sigfigs)).max() < thresh:
+            sigfigs -= 1
+        else:
+            break
+    sigfigs += 1
+    # avoid '-0.0' for ticks that are zero up to rounding errors
+    ticks = np.where(np.abs(ticks) < thresh, 0.0, ticks)
+    return ['%1.*f' % (sigfigs, tick) for tick in ticks]
+
+def _text_width(text, em):
+    return sum(GLYPH_WIDTHS.get(c, DIGIT_WIDTH) for c in text) * em
+
+@lru_cache(maxsize=4096)
+def _glyphs(text, width, height):
+    # Hershey glyphs fitted to the DejaVu Sans box of the label
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    (tw, th), baseline = cv2.getTextSize(text, font, 2.0, 3)
+    patch = np.full((th + baseline + 8, tw + 8), 255, dtype=np.uint8)
+    cv2.putText(patch, text, (4, th + 4), font, 2.0, 0, 3, cv2.LINE_AA)
+    rows = np.flatnonzero((patch < 255).any(axis=1))
+    cols = np.flatnonzero((patch < 255).any(axis=0))
+    patch = patch[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
+    return cv2.resize(patch, (width, height), interpolation=cv2.INTER_AREA)
+
+def _paste(img, patch, x0, y0):
+    h, w = patch.shape
+    H, W = img.shape
+    cx0, cy0 = max(x0, 0), max(y0, 0)
+    cx1, cy1 = min(x0 + w, W), min(y0 + h, H)
+    if cx0 >= cx1 or cy0 >= cy1:
+        return
+    region = img[cy0:cy1, cx0:cx1]
+    np.minimum(region, patch[cy0-y0:cy1-y0, cx0-x0:cx1-x0], out=region)
+
+def _draw_series(panel, x, y, finite, pt, shift=4):
+    scale = 1 << shift
+    pts = np.round(np.stack([x, y], axis=1) * scale).astype(np.int32)
+
+    idx = np.flatnonzero(finite)
+    if idx.size == 0:
+        return
+    runs = np.split(idx, np.flatnonzero(np.diff(idx) > 1) + 1)
+    lines = [pts[run] for run in runs if run.size > 1]
+    thickness = max(1, int(round(LINE_WIDTH * pt)))
+    if lines:
+        cv2.polylines(panel, lines, False, 0, thickness, cv2.LINE_AA, shift)
+
+    # '+' markers, two strokes per sample
+    half = int(round(MARKER_SIZE * pt / 2 * scale))
+    centres = pts[idx]
+    strokes = np.empty((2 * idx.size, 2, 2), dtype=np.int32)
+    strokes[0::2, 0] = centres - [half, 0]
+    strokes[0::2, 1] = centres + [half, 0]
+    strokes[1::2, 0] = centres - [0, half]
+    strokes[1::2, 1] = centres + [0, half]
+    thickness = max(1, int(round(MARKER_EDGE_WIDTH * pt)))
+    cv2.polylines(panel, list(strokes), False, 0, thickness, cv2.LINE_AA, shift)
+
+def rasterize_window(df_b, df_p, s, e, dpi=512, pad_inches=0.1):
+    """
+    Draw the four stacked panels (BTOTAL, Np, Vp/1e2, Tp/1e5) straight into
+    a NumPy array, without matplotlib.
+
+    The layout, axis limits, MaxNLocator ticks and tight cropping follow
+    Render.render_window, so the output can replace it in the pipeline.
+    Glyphs of the tick labels differ slightly from matplotlib's.
+
+    Parameters
+    ----------
+    df_b : pd.DataFrame
+        DataFrame of shape (n, 1). Column name should be "BTOTAL".
+    df_p : pd.DataFrame
+        DataFrame of shape (n, 3). Column names should be "Np", "Vp" and "Tp".
+    s : datetime
+        Start time of observed period.
+    e : datetime
+        End time of observed period.
+    dpi : int, optional
+        Resolution of the rendering. Lower values are faster. The default is 512.
+    pad_inches : float, optional
+        Padding around the tight bounding box. The default is 0.1.
+
+    Returns
+    -------
+    image : array
+        uint8 array of shape (H, W, 3), in BGR channel order.
+    """
+    with metrics.timer('render_seconds', renderer='raster'):
+        return _rasterize_window(df_b, df_p, s, e, dpi, pad_inches)
+
+def _rasterize_window(df_b, df_p, s, e, dpi, pad_inches):
+    pt = dpi / 72
+    size = int(round(FIGSIZE * dpi))
+    img = np.full((size, size), 255, dtype=np.uint8)
+
+    series = [df_b['BTOTAL'], df_p['Np'], df_p['Vp']/(10**2), df_p['Tp']/(10**5)]
+    s_ns = np.datetime64(s, 'ns').astype(np.int64)
+    e_ns = np.datetime64(e, 'ns').astype(np.int64)
+
+    height = (TOP - BOTTOM) / (4 + HSPACE * 3)
+    x0 = LEFT * size
+    x1 = RIGHT * size
+    em = LABEL_SIZE * pt
+    spine = SPINE_WIDTH * pt / 2
+    label_right = x0 - (TICK_LENGTH + TICK_PAD) * pt
+
+    bbox = [x0 - TICK_LENGTH * pt, np.inf, x1 + spine, -np.inf]
+    for i, values in enumerate(series):
+        top = (1 - (TOP - i * height * (1 + HSPACE))) * size
+        bottom = top + height * size
+        bbox[1] = min(bbox[1], top - spine)
+        bbox[3] = max(bbox[3], bottom + spine)
+
+        t = values.index.values.astype('datetime64[ns]').astype(np.int64)
+        v = values.to_numpy(dtype=np.float64)
+        finite = np.isfinite(v)
+        vmin, vmax = y_limits(v)
+
+        # data, clipped to the axes
+        ix0, iy0 = int(round(x0)), int(round(top))
+        panel = np.full((int(round(bottom)) - iy0, int(round(x1)) - ix0), 255, dtype=np.uint8)
+        px = (t - s_ns) / (e_ns - s_ns) * (x1 - x0) + (x0 - ix0)
+        py = (vmax - np.where(finite, v, vmin)) / (vmax - vmin) * (bottom - top) + (top - iy0)
+        _draw_series(panel, px, py, finite, pt)
+        _paste(img, panel, ix0, iy0)
+
+        # spines
+        thickness = max(1, int(round(SPINE_WIDTH * pt)))
+        cv2.rectangle(img, (int(round(x0)), int(round(top))), (int(round(x1)), int(round(bottom))), 0, thickness, cv2.LINE_AA)
+
+        # y ticks and labels
+        ticks = max_n_ticks(vmin, vmax)
+        thickness = max(1, int(round(TICK_WIDTH * pt)))
+        for tick, label in zip(ticks, tick_labels(ticks)):
+            y = (vmax - tick) / (vmax - vmin) * (bottom - top) + top
+            cv2.line(img, (int(round(x0 - TICK_LENGTH * pt)), int(round(y))), (int(round(x0)), int(round(y))), 0, thickness, cv2.LINE_AA)
+
+            width = _text_width(label, em)
+            glyphs = _glyphs(label, max(1, int(round(width))), max(1, int(round(DIGIT_HEIGHT * em))))
+            _paste(img, glyphs, int(round(label_right - width)), int(round(y - DIGIT_HEIGHT * em / 2)))
+
+            bbox[0] = min(bbox[0], label_right - width)
+            bbox[1] = min(bbox[1], y - LINE_HEIGHT * em / 2)
+            bbox[3] = max(bbox[3], y + LINE_HEIGHT * em / 2)
+
+    pad = pad_inches * dpi
+    bx0, by0 = int(np.floor(bbox[0] - pad)), int(np.floor(bbox[1] - pad))
+    bx1, by1 = int(np.ceil(bbox[2] + pad)), int(np.ceil(bbox[3] + pad))
+    image = np.full((by1 - by0, bx1 - bx0), 255, dtype=np.uint8)
+    _paste(image, img[max(by0, 0):by1, max(bx0, 0):bx1], max(bx0, 0) - bx0, max(by0, 0) - by0)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 15:02:47 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+from datetime import timedelta
+import numpy as np
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import check_spacecraft, load_series, parse_date
+from Render import render_window, render_windows, window_bounds
+from Stream import CADENCES
+
+def sweep_centres(candidate, spacecraft, span=10):
+    """
+    Parameters
+    ----------
+    candidate : datetime
+        Candidate shock time.
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+    span : int, optional
+        Largest offset from the candidate, in minutes. The default is 10.
+
+    Returns
+    -------
+    centres : list
+        Window centres from candidate - span to candidate + span, one
+        cadence step (64 s for ACE, 1 min for STEREO) apart.
+    """
+    step = CADENCES[check_spacecraft(spacecraft)]
+    n = int(timedelta(minutes=span) / step)
+    return [candidate + k * step for k in range(-n, n + 1)]
+
+def refine(candidate, spacecraft='ACE', horizon='30m', span=10, model=None, store=None, renderer=render_window, pool=None):
+    """
+    Localise a shock around a candidate time by sweeping the window centre.
+
+    The series covering every shifted window is fetched once, all windows
+    are rendered from it and classified in a single batch, so the cost is
+    one fetch and one batched inference instead of one ACE()/STEREO() and
+    predict round trip per offset.
+
+    Parameters
+    ----------
+    candidate : string or datetime
+        Candidate shock time, e.g. from a catalogue or a scan. If a string,
+        in the format "%Y-%m-%d %H:%M:%S".
+    spacecraft : string, optional
+        Either "ACE", "STA" or "STB" (case-insensitive). The default is 'ACE'.
+    horizon : string, optional
+        Either "20m", "30m", "60m" or "120m". The default is '30m'.
+    span : int, optional
+        Largest offset from the candidate, in minutes. The default is 10.
+    model : IPSRNet instance, optional
+        Model for the horizon. If None, the shared instance of
+        Registry.get_model is used. The default is None.
+    store : DataStore.SeriesStore, optional
+        Local store from which the data is served. The default is None.
+    renderer : callable, optional
+        Function renderer(df_b, df_p, s, e) returning the image.
+        The default is Render.render_window.
+    pool : RenderPool.RenderPool, optional
+        Pool of worker processes rendering the windows in parallel.
+        The default is None.
+
+    Returns
+    -------
+    result : dict
+        'time' (best scoring centre, the one with the highest Prob FF +
+        Prob FR), 'label' ('FF' or 'FR' at that centre), 'output' (its
+        output), 'offset' (its offset from the candidate, in seconds),
+        and the profile of the sweep: 'centres', 'offsets' (seconds) and
+        'outputs' (array of shape (N, 3)).
+    """
+    date = parse_date(candidate, 'candidate')
+    sc = check_spacecraft(spacecraft)
+    if horizon not in TIME_WINDOWS:
+        raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizon' parameter.")
+    if model is None:
+        from Registry import get_model
+        model = get_model(horizon)
+    time_window = TIME_WINDOWS[horizon]
+
+    centres = sweep_centres(date, sc, span)
+    data_start, _ = window_bounds(centres[0], time_window)
+    _, data_end = window_bounds(centres[-1], time_window)
+    df_b, df_p = load_series(sc, data_start, data_end, store=store)
+    if pool is None:
+        images = list(render_windows(df_b, df_p, centres, time_window, renderer=renderer))
+    else:
+        bounds = [window_bounds(c, time_window) for c in centres]
+        images = pool.map([(df_b.loc[s:e], df_p.loc[s:e], s, e) for s, e in bounds])
+    outputs = model.predict_batch(images, batch_size=len(images))
+
+    best = int(np.argmax(outputs[:, 1] + outputs[:, 2]))
+    offsets = np.array([(c - date).total_seconds() for c in centres])
+    return {'time': centres[best],
+            'label': LABELS[1 + int(np.argmax(outputs[best, 1:]))],
+            'output': outputs[best],
+            'offset': float(offsets[best]),
+            'centres': centres,
+            'offsets': offsets,
+            'outputs': outputs}
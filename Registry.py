@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:02:15 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import gc
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from IPSRNet import MODELS
+
+def model_nbytes(model):
+    """
+    Get the memory held by the weights of an IPSRNet instance.
+
+    Parameters
+    ----------
+    model : IPSRNet instance
+        Instance with 'deepmodel' and 'finalmodel' attributes.
+
+    Returns
+    -------
+    nbytes : int
+        Size of the weights of both networks, in bytes.
+    """
+    if model.deepmodel is None:
+        raise Exception("'model_nbytes' needs the Keras networks, which are not loaded on instances built with 'from_artifact'.")
+    nbytes = 0
+    for network in (model.deepmodel, model.finalmodel):
+        for w in network.weights:
+            dtype = getattr(w.dtype, 'name', str(w.dtype))
+            itemsize = 2 if dtype == 'bfloat16' else np.dtype(dtype).itemsize
+            nbytes += int(np.prod(w.shape)) * itemsize
+    return nbytes
+
+class ModelRegistry():
+    def __init__(self, memory_budget=None, factories=None):
+        """
+        Initializes a registry of IPSRNet instances keyed by horizon.
+
+        Instances are only built on first use and are shared by every caller
+        of the registry. When the weights held exceed memory_budget, the
+        least recently used instances that are not in use are evicted. An
+        instance is in use inside a 'use' block, and from 'get' until
+        'release' is called for its horizon.
+
+        Parameters
+        ----------
+        memory_budget : int, optional
+            Maximum memory, in bytes, held by the loaded instances.
+            None means no limit. The default is None.
+        factories : dict, optional
+            Mapping from horizon to a callable building the instance.
+            The default is IPSRNet.MODELS ('20m', '30m', '60m', '120m').
+        """
+        self.memory_budget = memory_budget
+        self.factories = dict(MODELS if factories is None else factories)
+
+        self._models = OrderedDict()
+        self._nbytes = {}
+        self._users = {}
+        # horizons handed out by 'get' and not yet released
+        self._pinned = set()
+        self._lock = threading.RLock()
+        self._load_locks = {horizon: threading.Lock() for horizon in self.factories}
+
+    def _check_horizon(self, horizon):
+        if horizon not in self.factories:
+            raise Exception("Only " + ", ".join(repr(h) for h in self.factories) + " are valid values for 'horizon' parameter.")
+
+    def _evict(self, needed=0):
+        # must be called with self._lock held
+        if self.memory_budget is None:
+            return
+        for horizon in list(self._models):
+            if self.memory_usage() + needed <= self.memory_budget:
+                break
+            if self._users.get(horizon, 0) == 0 and horizon not in self._pinned:
+                del self._models[horizon]
+        gc.collect()
+
+    def _acquire(self, horizon):
+        self._check_horizon(horizon)
+        with self._lock:
+            if horizon in self._models:
+                self._models.move_to_end(horizon)
+                self._users[horizon] = self._users.get(horizon, 0) + 1
+                return self._models[horizon]
+
+        with self._load_locks[horizon]:
+            with self._lock:
+                if horizon in self._models:
+                    self._models.move_to_end(horizon)
+                    self._users[horizon] = self._users.get(horizon, 0) + 1
+                    return self._models[horizon]
+                # size is only known once the instance has been built before
+                self._evict(self._nbytes.get(horizon, 0))
+
+            model = self.factories[horizon]()
+
+            with self._lock:
+                self._nbytes[horizon] = model_nbytes(model)
+                self._models[horizon] = model
+                self._users[horizon] = self._users.get(horizon, 0) + 1
+                self._evict()
+            return model
+
+    def _release(self, horizon):
+        with self._lock:
+            self._users[horizon] -= 1
+            self._evict()
+
+    @contextmanager
+    def use(self, horizon):
+        """
+        Context manager giving the instance for a horizon, which cannot be
+        evicted while the block runs.
+
+        Parameters
+        ----------
+        horizon : string
+            Either "20m", "30m", "60m" or "120m".
+
+        Yields
+        ------
+        model : IPSRNet instance
+        """
+        model = self._acquire(horizon)
+        try:
+            yield model
+        finally:
+            self._release(horizon)
+
+    def get(self, horizon):
+        """
+        Parameters
+        ----------
+        horizon : string
+            Either "20m", "30m", "60m" or "120m".
+
+        Returns
+        -------
+        model : IPSRNet instance
+            Shared instance for the horizon, built on first call. It is
+            not evicted until 'release' or 'evict' is called for the
+            horizon; callers holding the instance briefly should prefer
+            'use'.
+        """
+        model = self._acquire(horizon)
+        with self._lock:
+            self._pinned.add(horizon)
+        self._release(horizon)
+        return model
+
+    def release(self, horizon):
+        """
+        Allow the instance returned by 'get' for a horizon to be evicted
+        again, once its callers no longer hold it.
+
+        Parameters
+        ----------
+        horizon : string
+            Either "20m", "30m", "60m" or "120m".
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._pinned.discard(horizon)
+            self._evict()
+
+    def loaded(self):
+        """
+        Returns
+        -------
+        horizons : list
+            Horizons currently loaded, from least to most recently used.
+        """
+        with self._lock:
+            return list(self._models)
+
+    def memory_usage(self):
+        """
+        Returns
+        -------
+        nbytes : int
+            Memory held by the weights of the loaded instances, in bytes.
+        """
+        with self._lock:
+            return sum(self._nbytes[horizon] for horizon in self._models)
+
+    def evict(self, horizon=None):
+        """
+        Drop an idle instance, or every idle instance if horizon is None
+        except those returned by 'get' and not released.
+
+        Parameters
+        ----------
+        horizon : string, optional
+            Horizon to evict. The default is None.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            for h in ([horizon] if horizon is not None else list(self._models)):
+                if h in self._models and self._users.get(h, 0) == 0:
+                    if horizon is None and h in self._pinned:
+                        continue
+                    del self._models[h]
+                    self._pinned.discard(h)
+        gc.collect()
+
+registry = ModelRegistry()
+
+def get_model(horizon):
+    """
+    Get the process-wide shared IPSRNet instance for a horizon.
+
+    Parameters
+    ----------
+    horizon : string
+        Either "20m", "30m", "60m" or "120m".
+
+    Returns
+    -------
+    model : IPSRNet instance
+    """
+    return registry.get(horizon)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 09:12:40 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+from datetime import timedelta
+import numpy as np
+from Metrics import metrics
+
+# matplotlib and cv2 are imported by the rendering functions, so that
+# window_bounds and the modules only slicing windows import quickly
+
+def draw_panels(fig, df_b, df_p, s, e):
+    """
+    Draw the four stacked panels (BTOTAL, Np, Vp/1e2, Tp/1e5) on a figure.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure of size (4, 4) on which the panels are drawn.
+    df_b : pd.DataFrame
+        DataFrame of shape (n, 1). Column name should be "BTOTAL".
+    df_p : pd.DataFrame
+        DataFrame of shape (n, 3). Column names should be "Np", "Vp" and "Tp".
+    s : datetime
+        Start time of observed period.
+    e : datetime
+        End time of observed period.
+
+    Returns
+    -------
+    None
+    """
+    from matplotlib.ticker import MaxNLocator
+    fig.subplots_adjust(wspace=0, hspace=0.2)
+
+    series = [df_b['BTOTAL'], df_p['Np'], df_p['Vp']/(10**2), df_p['Tp']/(10**5)]
+    for i, values in enumerate(series):
+        ax = fig.add_subplot(4, 1, i+1)
+        for axis in ['top','bottom','left','right']:
+            ax.spines[axis].set_linewidth(0.25)
+
+        ax.plot(values.index, values, color='black', linewidth=0.3, marker='+', markersize=1, mec='black', mew=0.1)
+        ax.set_xlim(s, e)
+        ax.yaxis.set_major_locator(MaxNLocator(5))
+        ax.tick_params(bottom=False, labelbottom=False)
+        ax.tick_params(axis='y', labelsize=5, pad=0.5, length=1, width=0.25)
+
+def render_window(df_b, df_p, s, e, dpi=512, pad_inches=0.1):
+    """
+    Render the panels into an in-memory image, without touching disk.
+
+    The figure is drawn on an Agg canvas and cropped to its tight bounding
+    box, reproducing what savefig(bbox_inches='tight') writes to the PNG.
+
+    Parameters
+    ----------
+    df_b : pd.DataFrame
+        DataFrame of shape (n, 1). Column name should be "BTOTAL".
+    df_p : pd.DataFrame
+        DataFrame of shape (n, 3). Column names should be "Np", "Vp" and "Tp".
+    s : datetime
+        Start time of observed period.
+    e : datetime
+        End time of observed period.
+    dpi : int, optional
+        Resolution of the rendering. The default is 512.
+    pad_inches : float, optional
+        Padding around the tight bounding box. The default is 0.1.
+
+    Returns
+    -------
+    image : array
+        uint8 array of shape (H, W, 3), in the BGR channel order returned
+        by cv2.imread, so it can be passed straight to the IPSRNet instances.
+    """
+    import cv2
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    with metrics.timer('render_seconds', renderer='matplotlib'):
+        fig = Figure(figsize=(4,4), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        draw_panels(fig, df_b, df_p, s, e)
+        canvas.draw()
+
+    rgba = np.asarray(canvas.buffer_rgba())
+    height, width = rgba.shape[:2]
+    bbox = fig.get_tightbbox(canvas.get_renderer()).padded(pad_inches)
+    x0 = int(np.floor(bbox.x0*dpi))
+    x1 = int(np.ceil(bbox.x1*dpi))
+    y0 = height - int(np.ceil(bbox.y1*dpi))
+    y1 = height - int(np.floor(bbox.y0*dpi))
+
+    # the padded box may go past the figure edges, which savefig fills with white
+    image = np.full((y1-y0, x1-x0, 3), 255, dtype=np.uint8)
+    cx0, cx1 = max(x0, 0), min(x1, width)
+    cy0, cy1 = max(y0, 0), min(y1, height)
+    image[cy0-y0:cy1-y0, cx0-x0:cx1-x0] = cv2.cvtColor(rgba[cy0:cy1, cx0:cx1], cv2.COLOR_RGBA2BGR)
+    return image
+
+def save_window(image, folder_to_save):
+    """
+    Save a rendered window the way the case studies were generated,
+    upscaled to 2048x2048.
+
+    Parameters
+    ----------
+    image : array
+        Image returned by render_window.
+    folder_to_save : string
+        filename to which the image is saved.
+
+    Returns
+    -------
+    None
+    """
+    import cv2
+    with metrics.timer('save_seconds'):
+        image = cv2.resize(image, (2048, 2048), interpolation=cv2.INTER_CUBIC)
+        cv2.imwrite(folder_to_save, image)
+
+def window_bounds(date, time_window):
+    """
+    Parameters
+    ----------
+    date : datetime
+        Centre of the window.
+    time_window : int
+        Half duration of the window, in minutes, as in ACE and STEREO.
+
+    Returns
+    -------
+    date_start : datetime
+        Start time of the window.
+    date_end : datetime
+        End time of the window.
+    """
+    date_start = date - timedelta(minutes = time_window)
+    date_end = date + timedelta(minutes = time_window-1)
+    return date_start, date_end
+
+def render_windows(df_b, df_p, centres, time_window, renderer=render_window):
+    """
+    Render the windows centred at each date from an already loaded series.
+
+    Parameters
+    ----------
+    df_b : pd.DataFrame
+        DataFrame with column "BTOTAL", covering every window.
+    df_p : pd.DataFrame
+        DataFrame with columns "Np", "Vp" and "Tp", covering every window.
+    centres : iterable
+        Centres (datetime) of the windows.
+    time_window : int
+        Half duration of the windows, in minutes.
+    renderer : callable, optional
+        Function renderer(df_b, df_p, s, e) returning the image.
+        The default is render_window.
+
+    Yields
+    ------
+    image : array
+        Rendered window, in the order of centres.
+    """
+    for centre in centres:
+        s, e = window_bounds(centre, time_window)
+        yield renderer(df_b.loc[s:e], df_p.loc[s:e], s, e)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:47:21 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+RENDERERS = {'matplotlib': ('Render', 'render_window'),
+             'raster': ('Raster', 'rasterize_window')}
+
+_renderer = None
+
+def _init_worker(renderer):
+    global _renderer
+    import matplotlib
+    matplotlib.use('Agg')
+    if isinstance(renderer, str):
+        import importlib
+        module, function = RENDERERS[renderer]
+        renderer = getattr(importlib.import_module(module), function)
+    _renderer = renderer
+
+def _to_shared(image):
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1), track=False)
+    except TypeError:
+        # Python < 3.13: the parent unlinks the block, so the worker must not track it
+        shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+    shm.close()
+    return shm.name, image.shape, image.dtype.str
+
+def _from_shared(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _unlink(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+def _read_blocks(blocks):
+    # images of a chunk, unlinking the unread blocks if the consumer stops early
+    read = 0
+    try:
+        for block in blocks:
+            read += 1
+            yield _from_shared(*block)
+    finally:
+        for name, _, _ in blocks[read:]:
+            _unlink(name)
+
+def _discard(futures):
+    # unlink the blocks of results that will not be read
+    for future in futures:
+        try:
+            blocks = future.result()
+        except Exception:
+            continue
+        for name, _, _ in blocks:
+            _unlink(name)
+
+def _render_chunk(windows, target_size):
+    import cv2
+    blocks = []
+    for df_b, df_p, s, e in windows:
+        image = _renderer(df_b, df_p, s, e)
+        if target_size is not None:
+            image = cv2.resize(image, target_size, interpolation=cv2.INTER_AREA)
+        blocks.append(_to_shared(image))
+    return blocks
+
+class RenderPool():
+    def __init__(self, workers=None, chunksize=4, renderer='matplotlib', target_size=None, start_method='spawn'):
+        """
+        Initializes a pool of worker processes rendering windows in parallel.
+
+        Each worker keeps a non-interactive (Agg) backend for its whole life.
+        Images come back through shared memory blocks rather than temporary
+        files, and only their names are sent between processes.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of worker processes. The default is os.cpu_count().
+        chunksize : int, optional
+            Number of windows rendered per task. The default is 4.
+        renderer : string or callable, optional
+            'matplotlib' (Render.render_window), 'raster'
+            (Raster.rasterize_window) or a picklable function
+            renderer(df_b, df_p, s, e). The default is 'matplotlib'.
+        target_size : tuple, optional
+            If given, images are resized in the workers to this (width, height),
+            e.g. the target_size of an IPSRNet instance. The default is None.
+        start_method : string, optional
+            multiprocessing start method. 'spawn' is safe when TensorFlow is
+            loaded in the parent. The default is 'spawn'.
+        """
+        self.workers = workers or os.cpu_count()
+        self.chunksize = chunksize
+        self.target_size = target_size
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context(start_method),
+                                             initializer=_init_worker, initargs=(renderer,))
+
+    def _tasks(self, windows):
+        chunk = []
+        for window in windows:
+            chunk.append(window)
+            if len(chunk) == self.chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def imap(self, windows):
+        """
+        Parameters
+        ----------
+        windows : iterable
+            (df_b, df_p, s, e) tuples, as taken by Render.render_window.
+            Consumed lazily, with at most 2 tasks in flight per worker.
+
+        Yields
+        ------
+        image : array
+            Rendered window, in the order of windows.
+        """
+        pending = deque()
+        try:
+            for chunk in self._tasks(windows):
+                pending.append(self._executor.submit(_render_chunk, chunk, self.target_size))
+                while len(pending) >= 2 * self.workers:
+                    yield from _read_blocks(pending.popleft().result())
+            while pending:
+                yield from _read_blocks(pending.popleft().result())
+        finally:
+            _discard(pending)
+
+    def imap_unordered(self, windows):
+        """
+        Parameters
+        ----------
+        windows : iterable
+            (df_b, df_p, s, e) tuples, as taken by Render.render_window.
+
+        Yields
+        ------
+        index : int
+            Position of the window in windows.
+        image : array
+            Rendered window, as soon as its chunk completes.
+        """
+        pending = {}
+        start = 0
+        tasks = self._tasks(windows)
+        try:
+            while True:
+                for chunk in tasks:
+                    pending[self._executor.submit(_render_chunk, chunk, self.target_size)] = start
+                    start += len(chunk)
+                    if len(pending) >= 2 * self.workers:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    first = pending.pop(future)
+                    images = _read_blocks(future.result())
+                    try:
+                        for i, image in enumerate(images):
+                            yield first + i, image
+                    finally:
+                        images.close()
+        finally:
+            _discard(pending)
+
+    def map(self, windows):
+        """
+        Parameters
+        ----------
+        windows : iterable
+            (df_b, df_p, s, e) tuples, as taken by Render.render_window.
+
+        Returns
+        -------
+        images : list
+            Rendered windows, in the order of windows.
+        """
+        return list(self.imap(windows))
+
+    def close(self):
+        """
+        Stop the worker processes.
+
+        Returns
+        -------
+        None
+        """
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -5,16 +5,11 @@ Created on Thu Nov 21 16:23:12 2024
 @author: Luís Eduardo Sales do Nascimento
 """
 
-import matplotlib.pyplot as plt
-import os
 import numpy as np
 #import pandas as pd
-from matplotlib.ticker import MaxNLocator
-import cv2
 from datetime import datetime, timedelta
-from sunpy.net import Fido
-from sunpy.net import attrs as a
-from sunpy.timeseries import TimeSeries
+from Render import render_window, save_window
+from Acquire import acquirer
 
 
 
@@ -50,14 +45,28 @@ def Get_STEREO_data(start, end, spacecraft='STA'):
     if sc!='STA' and sc!='STB':
         raise Exception("Only 'STA' or 'STB' are valid values for 'spacecraft' parameter.")
 
-    trange = a.Time(start, end)
-    if sc=='STA':
-        dataset = a.cdaweb.Dataset.sta_l2_magplasma_1m
-    if sc=='STB':
-        dataset = a.cdaweb.Dataset.stb_l2_magplasma_1m
-    result = Fido.search(trange, dataset)
-    
-    downloaded_files = Fido.fetch(result, progress=False)
+    return acquirer.fetch(sc, start, end)
+
+def to_STEREO_dfs(downloaded_files, start, end):
+    """
+        Parameters
+        ----------
+        downloaded_files : list
+            sta_l2_magplasma_1m or stb_l2_magplasma_1m CDF files.
+        start : datetime
+            Start time of observed period.
+        end : datetime
+            End time of observed period.
+            
+        Returns
+        -------
+        IMF_df : pd.DataFrame
+            DataFrame of shape (n, 1) with column "BTOTAL", with cadence of 1 minute.
+        plasma_df : pd.DataFrame
+            DataFrame of shape (n, 3) with columns "Np", "Vp" and "Tp", with
+            cadence of 1 minute.
+    """
+    from sunpy.timeseries import TimeSeries
     df = TimeSeries(downloaded_files, concatenate=True)
     df = df.to_dataframe()
     df = df.loc[start:end]
@@ -70,7 +79,7 @@ def Get_STEREO_data(start, end, spacecraft='STA'):
     
     return IMF_df, plasma_df
 
-def plot_STEREO(df_b, df_p, s, e, folder_to_save):
+def plot_STEREO(df_b, df_p, s, e, folder_to_save=None):
     """
         Plot timeseries of solar wind plasma and interplanetary magnetic 
         field parameters from STEREO Spacecraft
@@ -89,66 +98,23 @@ def plot_STEREO(df_b, df_p, s, e, folder_to_save):
             Start time of observed period.
         e : datetime
             End time of observed period.
-        folder_to_save : string
-            filename to which the image is saved. 
+        folder_to_save : string, optional
+            filename to which the image is saved. If None, the image is only
+            rendered in memory. The default is None. 
             
         Returns
         -------
-        None
-            Plot and save figure with the given data but does not return anything.
+        image : array
+            Rendered figure as a uint8 BGR array, ready to be passed to the
+            IPSRNet instances.
     """
-    fig = plt.figure(figsize=(4,4))
-    plt.subplots_adjust(wspace=0, hspace=0.2)
-    
-    ax1_plt = fig.add_subplot(4, 1, 1)
-    ax2_plt = fig.add_subplot(4, 1, 2)
-    ax3_plt = fig.add_subplot(4, 1, 3)
-    ax4_plt = fig.add_subplot(4, 1, 4)
-
-    for axis in ['top','bottom','left','right']:
-        ax1_plt.spines[axis].set_linewidth(0.25)
-        ax2_plt.spines[axis].set_linewidth(0.25)
-        ax3_plt.spines[axis].set_linewidth(0.25)
-        ax4_plt.spines[axis].set_linewidth(0.25)
-
-    ax1_plt.plot(df_b.index, df_b['BTOTAL'], color='black', linewidth=0.3, marker='+', markersize=1, mec='black', mew=0.1)
-    ax1_plt.set_xlim(s, e)
-    ax1_plt.yaxis.set_major_locator(MaxNLocator(5))
-    ax1_plt.tick_params(bottom=False, labelbottom=False)
-    ax1_plt.tick_params(axis='y', labelsize=5, pad=0.5, length=1, width=0.25)
-    
-    ax2_plt.plot(df_p.index, df_p['Np'], color='black', linewidth=0.3, marker='+', markersize=1, mec='black', mew=0.1)
-    ax2_plt.set_xlim(s, e)
-    ax2_plt.yaxis.set_major_locator(MaxNLocator(5))
-    ax2_plt.tick_params(bottom=False, labelbottom=False)
-    ax2_plt.tick_params(axis='y', labelsize=5, pad=0.5, length=1, width=0.25)
-    
-    ax3_plt.plot(df_p.index, df_p['Vp']/(10**2), color='black', linewidth=0.3, marker='+', markersize=1, mec='black', mew=0.1)
-    ax3_plt.set_xlim(s, e)
-    ax3_plt.yaxis.set_major_locator(MaxNLocator(5))
-    ax3_plt.tick_params(bottom=False, labelbottom=False)
-    ax3_plt.tick_params(axis='y', labelsize=5, pad=0.5, length=1, width=0.25)
-    
-    ax4_plt.plot(df_p.index, df_p['Tp']/(10**5), color='black', linewidth=0.3,marker='+', markersize=1, mec='black', mew=0.1)
-    ax4_plt.set_xlim(s, e)
-    ax4_plt.yaxis.set_major_locator(MaxNLocator(5))
-    ax4_plt.tick_params(bottom=False, labelbottom=False)
-    ax4_plt.tick_params(axis='y', labelsize=5, pad=0.5, length=1, width=0.25)
-    
-    fig.savefig(folder_to_save, format='png', bbox_inches='tight', dpi=512)
-    plt.cla()
-    plt.close('all')
-    
-    #opencv
-    image = cv2.imread(folder_to_save)
-    image = cv2.resize(image, (2048, 2048), interpolation=cv2.INTER_CUBIC)
-    
-    if os.path.exists(folder_to_save):
-        os.remove(folder_to_save)
-    cv2.imwrite(folder_to_save, image)
+    image = render_window(df_b, df_p, s, e)
+    if folder_to_save is not None:
+        save_window(image, folder_to_save)
+    return image
 
 
-def STEREO(shock_date, folder_to_save, time_window=15, spacecraft='STA'):
+def STEREO(shock_date, folder_to_save=None, time_window=15, spacecraft='STA', store=None):
     """
         Download and plot timeseries of solar wind plasma and interplanetary magnetic 
         field parameters from STEREO Spacecraft
@@ -158,8 +124,9 @@ def STEREO(shock_date, folder_to_save, time_window=15, spacecraft='STA'):
         shock_date : string or datetime
             Date to analyze the occurrence of an interplanetary shock wave. 
             If shock_date is a string must be in the format "%Y-%m-%d %H:%M:%S".
-        folder_to_save : string
-            filename to which the image is saved. 
+        folder_to_save : string, optional
+            filename to which the image is saved. If None, the image is only
+            rendered in memory. The default is None. 
         time_window : int, optional
             Duration of observation time for the interplanetary shock wave, 
             covering both upstream and downstream parameters.
@@ -170,12 +137,17 @@ def STEREO(shock_date, folder_to_save, time_window=15, spacecraft='STA'):
             "STA" means get data from STEREO-A spacecraft.
             "STB" means get data from STEREO-B spacecraft.
             The default is 'STA'.
+        store : DataStore.SeriesStore, optional
+            Local store from which the data is served, fetching only the
+            missing days. If None, the data is downloaded from CDAWeb.
+            The default is None.
             
             
         Returns
         -------
-        None
-            Plot and save figure with the given data but does not return anything.
+        image : array
+            Rendered figure as a uint8 BGR array, ready to be passed to the
+            IPSRNet instances.
     """
     if type(shock_date) == str:
         date =  datetime.strptime(shock_date, '%Y-%m-%d %H:%M:%S')
@@ -191,6 +163,9 @@ def STEREO(shock_date, folder_to_save, time_window=15, spacecraft='STA'):
     date_start = date - timedelta(minutes = time_window)
     date_end = date + timedelta(minutes = time_window-1)
     
-    df_b, df_p = Get_STEREO_data(date_start, date_end, spacecraft=sc)
+    if store is None:
+        df_b, df_p = Get_STEREO_data(date_start, date_end, spacecraft=sc)
+    else:
+        df_b, df_p = store.get(sc, date_start, date_end)
     
-    plot_STEREO(df_b,df_p, date_start, date_end, folder_to_save)
\ No newline at end of file
+    return plot_STEREO(df_b,df_p, date_start, date_end, folder_to_save)
\ No newline at end of file
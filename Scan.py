@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 13:55:10 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+from datetime import datetime, timedelta
+from itertools import tee
+import numpy as np
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import check_spacecraft, load_series, parse_date
+from Render import render_window, render_windows, window_bounds
+
+# output given to the windows rejected by a prescreen
+REJECTED = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+def iter_windows(spacecraft, start, end, horizon='30m', stride=1, store=None, renderer=render_window, pool=None,
+                 acquirer=None, ahead=1, prescreen=None):
+    """
+    Render the windows of a time range, loading one day of data at a time.
+
+    Parameters
+    ----------
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+    start : string or datetime
+        Centre of the first window. If a string, in the format "%Y-%m-%d %H:%M:%S".
+    end : string or datetime
+        Latest centre of a window. If a string, in the format "%Y-%m-%d %H:%M:%S".
+    horizon : string, optional
+        Either "20m", "30m", "60m" or "120m". The default is '30m'.
+    stride : int or timedelta, optional
+        Step between window centres, in minutes if an int. The default is 1.
+    store : DataStore.SeriesStore, optional
+        Local store from which the data is served. If None, each day is
+        downloaded from CDAWeb. The default is None.
+    renderer : callable, optional
+        Function renderer(df_b, df_p, s, e) returning the image.
+        The default is Render.render_window.
+    pool : RenderPool.RenderPool, optional
+        Pool of worker processes rendering the windows in parallel, in
+        which case renderer is ignored. The default is None.
+    acquirer : Acquire.Acquirer, optional
+        If given, the days are downloaded with it instead of the store,
+        with the next days in flight while the current one is rendered
+        and classified. The default is None.
+    ahead : int, optional
+        Number of days downloaded ahead by the acquirer. The default is 1.
+    prescreen : Prescreen.Prescreen, optional
+        Filter run on the series of each day before rendering; rejected
+        windows are not rendered. The default is None.
+
+    Yields
+    ------
+    centre : datetime
+        Centre of the window.
+    image : array
+        Rendered window, or None if rejected by the prescreen.
+    """
+    sc = check_spacecraft(spacecraft)
+    if horizon not in TIME_WINDOWS:
+        raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizon' parameter.")
+    time_window = TIME_WINDOWS[horizon]
+    if not isinstance(stride, timedelta):
+        stride = timedelta(minutes=stride)
+    start, end = parse_date(start, 'start'), parse_date(end, 'end')
+
+    def days():
+        centre = start
+        while centre <= end:
+            day_end = datetime(centre.year, centre.month, centre.day) + timedelta(days=1)
+            centres = []
+            while centre <= end and centre < day_end:
+                centres.append(centre)
+                centre += stride
+            yield centres
+
+    def periods(chunks):
+        for centres in chunks:
+            data_start, _ = window_bounds(centres[0], time_window)
+            _, data_end = window_bounds(centres[-1], time_window)
+            yield data_start, data_end
+
+    chunks, ahead_chunks = tee(days())
+    if acquirer is not None:
+        series = acquirer.prefetch(sc, periods(ahead_chunks), ahead=ahead)
+    else:
+        series = (load_series(sc, s, e, store=store) for s, e in periods(ahead_chunks))
+
+    for centres, (df_b, df_p) in zip(chunks, series):
+        kept = centres
+        if prescreen is not None:
+            passed = prescreen.mask(df_b, df_p, centres, time_window)
+            kept = [c for c, p in zip(centres, passed) if p]
+        if pool is None:
+            images = render_windows(df_b, df_p, kept, time_window, renderer=renderer)
+        else:
+            bounds = (window_bounds(c, time_window) for c in kept)
+            images = pool.imap((df_b.loc[s:e], df_p.loc[s:e], s, e) for s, e in bounds)
+        if prescreen is None:
+            yield from zip(centres, images)
+        else:
+            for c, p in zip(centres, passed):
+                yield c, (next(images) if p else None)
+
+def scan(spacecraft, start, end, horizon='30m', stride=1, model=None, store=None, batch_size=32, renderer=render_window, pool=None,
+         acquirer=None, prescreen=None, embeddings=None):
+    """
+    Classify every window of a time range with batched inference.
+
+    Data is loaded once per day and windows are rendered as they are
+    needed, so memory use does not grow with the length of the range.
+
+    Parameters
+    ----------
+    spacecraft : string
+        Either "ACE", "STA" or "STB" (case-insensitive).
+    start : string or datetime
+        Centre of the first window. If a string, in the format "%Y-%m-%d %H:%M:%S".
+    end : string or datetime
+        Latest centre of a window. If a string, in the format "%Y-%m-%d %H:%M:%S".
+    horizon : string, optional
+        Either "20m", "30m", "60m" or "120m". The default is '30m'.
+    stride : int or timedelta, optional
+        Step between window centres, in minutes if an int. The default is 1.
+    model : IPSRNet instance, optional
+        Model for the horizon. If None, the shared instance of
+        Registry.get_model is used. The default is None.
+    store : DataStore.SeriesStore, optional
+        Local store from which the data is served. The default is None.
+    batch_size : int, optional
+        Number of windows classified at a time. The default is 32.
+    renderer : callable, optional
+        Function renderer(df_b, df_p, s, e) returning the image.
+        The default is Render.render_window.
+    pool : RenderPool.RenderPool, optional
+        Pool of worker processes rendering the windows in parallel.
+        The default is None.
+    acquirer : Acquire.Acquirer, optional
+        Downloads the next day while the current one is classified, see
+        iter_windows. The default is None.
+    prescreen : Prescreen.Prescreen, optional
+        Filter skipping the rendering and classification of quiet windows,
+        whose output is then a copy of REJECTED, yielded in time order with
+        the other windows, as soon as no accepted window is pending before
+        it. Its 'skipped' attribute counts them.
+        The default is None.
+    embeddings : Embeddings.EmbeddingStore, optional
+        Store where the features of every classified window are recorded,
+        with its centre and spacecraft. The default is None.
+
+    Yields
+    ------
+    centre : datetime
+        Centre of the window.
+    output : array
+        Probability of each class, in the format [Prob Neg, Prob FF, Prob FR]
+    """
+    if model is None:
+        from Registry import get_model
+        model = get_model(horizon)
+
+    windows = iter_windows(spacecraft, start, end, horizon=horizon, stride=stride, store=store, renderer=renderer, pool=pool,
+                           acquirer=acquirer, prescreen=prescreen)
+
+    def classify(batch):
+        images = [image for _, image in batch if image is not None]
+        if embeddings is None:
+            outputs = model.predict_batch(images, batch_size=batch_size)
+        else:
+            outputs, features = model.predict_batch(images, batch_size=batch_size, return_features=True)
+            embeddings.add(horizon, features, [centre for centre, image in batch if image is not None], spacecraft)
+        outputs = iter(outputs)
+        for centre, image in batch:
+            yield centre, REJECTED.copy() if image is None else next(outputs)
+
+    # rejected windows wait only behind accepted ones, so the output stays in
+    # time order; a long quiet stretch flushes the batch before it is full
+    batch = []
+    accepted = 0
+    for centre, image in windows:
+        if image is None and not batch:
+            yield centre, REJECTED.copy()
+            continue
+        batch.append((centre, image))
+        accepted += image is not None
+        if accepted == batch_size or len(batch) >= 4 * batch_size:
+            yield from classify(batch)
+            batch = []
+            accepted = 0
+    if batch:
+        yield from classify(batch)
+
+class EventMerger():
+    def __init__(self, threshold=0.5, max_gap=None):
+        """
+        Merges consecutive windows classified as shocks into events.
+
+        Parameters
+        ----------
+        threshold : float, optional
+            A window is a detection when Prob FF + Prob FR >= threshold.
+            The default is 0.5.
+        max_gap : timedelta, optional
+            Largest distance between two detections of the same event.
+            If None, detections are merged only when no negative window
+            lies between them. The default is None.
+        """
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self._event = None
+
+    def update(self, centre, output):
+        """
+        Parameters
+        ----------
+        centre : datetime
+            Centre of the window.
+        output : array
+            Output of the model for the window, [Prob Neg, Prob FF, Prob FR].
+
+        Returns
+        -------
+        event : dict or None
+            The previous event, once it can no longer grow. See 'close'.
+        """
+        finished = None
+        detected = output[1] + output[2] >= self.threshold
+        if self._event is not None:
+            gap_closed = not detected if self.max_gap is None else centre - self._event['end'] > self.max_gap
+            if gap_closed:
+                finished = self.close()
+        if detected:
+            if self._event is None:
+                self._event = {'start': centre, 'end': centre, 'time': centre,
+                               'output': np.array(output), 'windows': 0}
+            event = self._event
+            event['end'] = centre
+            event['windows'] += 1
+            if output[1] + output[2] > event['output'][1] + event['output'][2]:
+                event['time'] = centre
+                event['output'] = np.array(output)
+        return finished
+
+    def close(self):
+        """
+        Returns
+        -------
+        event : dict or None
+            The event in progress, with keys 'start' and 'end' (first and
+            last detected centres), 'time' and 'output' (centre and output
+            of the highest scoring window), 'label' ('FF' or 'FR') and
+            'windows' (number of detections). None if there is none.
+        """
+        event, self._event = self._event, None
+        if event is not None:
+            event['label'] = LABELS[1 + int(np.argmax(event['output'][1:]))]
+        return event
+
+def merge_events(records, threshold=0.5, max_gap=None):
+    """
+    Parameters
+    ----------
+    records : iterable
+        (centre, output) pairs in time order, such as the output of scan.
+    threshold : float, optional
+        A window is a detection when Prob FF + Prob FR >= threshold.
+        The default is 0.5.
+    max_gap : timedelta, optional
+        Largest distance between two detections of the same event.
+        The default is None. See EventMerger.
+
+    Yields
+    ------
+    event : dict
+        Detected event. See EventMerger.close.
+    """
+    merger = EventMerger(threshold=threshold, max_gap=max_gap)
+    for centre, output in records:
+        event = merger.update(centre, output)
+        if event is not None:
+            yield event
+    event = merger.close()
+    if event is not None:
+        yield event
@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:05:37 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+import numpy as np
+import pandas as pd
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import check_spacecraft, load_series, parse_date
+from Render import render_window, window_bounds
+from Metrics import metrics
+
+class MicroBatcher():
+    def __init__(self, horizon, registry=None, max_batch=32, max_wait=0.005):
+        """
+        Initializes a worker thread coalescing concurrent requests of a
+        horizon into batches.
+
+        A batch is run as soon as max_batch images are queued, or max_wait
+        seconds after its first image arrived, whichever comes first.
+
+        Parameters
+        ----------
+        horizon : string
+            Either "20m", "30m", "60m" or "120m".
+        registry : Registry.ModelRegistry, optional
+            Registry providing the model. The default is Registry.registry.
+        max_batch : int, optional
+            Largest batch. The default is 32.
+        max_wait : float, optional
+            Longest time, in seconds, a request waits for others to join
+            its batch. The default is 0.005.
+        """
+        if registry is None:
+            from Registry import registry
+        self.horizon = horizon
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        """
+        Parameters
+        ----------
+        image : array
+            Rendered window (BGR uint8), of any size.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Resolves to (output, timing), with output in the format
+            [Prob Neg, Prob FF, Prob FR] and timing a dict with
+            'queue_seconds', 'inference_seconds' and 'batch_size'.
+        """
+        future = Future()
+        self._queue.put((image, time.perf_counter(), future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[1] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                with self.registry.use(self.horizon) as model:
+                    outputs = model.predict_batch([image for image, _, _ in batch], batch_size=len(batch))
+            except Exception as error:
+                for _, _, future in batch:
+                    future.set_exception(error)
+                continue
+            finished = time.perf_counter()
+            metrics.count('server_batches_total', horizon=self.horizon)
+            metrics.count('server_batched_requests_total', len(batch), horizon=self.horizon)
+            for (_, queued, future), output in zip(batch, outputs):
+                future.set_result((output, {'queue_seconds': started - queued,
+                                            'inference_seconds': finished - started,
+                                            'batch_size': len(batch)}))
+
+    def close(self):
+        """
+        Stop the worker thread after the queued requests.
+
+        Returns
+        -------
+        None
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+class BadRequest(Exception):
+    """
+    Request that cannot be decoded or validated, answered with HTTP 400.
+    Any other failure (data loading, rendering, inference) is answered
+    with HTTP 500.
+    """
+
+def _series_frames(series):
+    df_b = pd.DataFrame({'BTOTAL': np.asarray(series['BTOTAL'], dtype=np.float64)},
+                        index=pd.to_datetime(series['time_b']))
+    df_p = pd.DataFrame({c: np.asarray(series[c], dtype=np.float64) for c in ['Np', 'Vp', 'Tp']},
+                        index=pd.to_datetime(series['time_p']))
+    return df_b, df_p
+
+class InferenceServer():
+    def __init__(self, horizons=('20m', '30m', '60m', '120m'), registry=None, max_batch=32, max_wait=0.005,
+                 store=None, renderer=render_window):
+        """
+        Initializes a local HTTP server sharing one instance of each IPSRNet
+        model between all its clients.
+
+        Endpoints:
+            POST /predict/<horizon> with an encoded image (PNG/JPEG) as body,
+            or a JSON body describing a time-series window, either
+            {"spacecraft": "ACE", "time": "2015-03-17 04:05:00"} (served from
+            the store, or downloaded) or {"time": ..., "series": {"time_b": [...],
+            "BTOTAL": [...], "time_p": [...], "Np": [...], "Vp": [...], "Tp": [...]}}.
+            GET /health lists the horizons served.
+
+        Parameters
+        ----------
+        horizons : tuple, optional
+            Horizons served; their models are loaded at start.
+            The default is all of them.
+        registry : Registry.ModelRegistry, optional
+            Registry providing the models. The default is Registry.registry.
+        max_batch : int, optional
+            Largest micro-batch. The default is 32.
+        max_wait : float, optional
+            Longest time, in seconds, a request waits for a micro-batch to
+            fill. The default is 0.005.
+        store : DataStore.SeriesStore, optional
+            Local store serving the windows requested by time. The default is None.
+        renderer : callable, optional
+            Function renderer(df_b, df_p, s, e) returning the image.
+            The default is Render.render_window.
+        """
+        if registry is None:
+            from Registry import registry
+        for horizon in horizons:
+            if horizon not in TIME_WINDOWS:
+                raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizons' parameter.")
+            with registry.use(horizon):
+                pass
+        self.store = store
+        self.renderer = renderer
+        # matplotlib is not thread-safe, and handlers run in concurrent threads
+        self._render_lock = threading.Lock()
+        self.batchers = {h: MicroBatcher(h, registry=registry, max_batch=max_batch, max_wait=max_wait) for h in horizons}
+        self._server = None
+
+    def _parse(self, horizon, body, content_type):
+        # decoded image, or the window to load and render; BadRequest if invalid
+        import cv2
+        try:
+            if content_type.startswith('application/json'):
+                request = json.loads(body)
+                date = parse_date(request['time'], 'time')
+                s, e = window_bounds(date, TIME_WINDOWS[horizon])
+                if 'series' in request:
+                    return None, (_series_frames(request['series']), s, e)
+                return None, (check_spacecraft(request['spacecraft']), s, e)
+            image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except Exception as error:
+            raise BadRequest(str(error))
+        if image is None:
+            raise BadRequest("The body is not a valid image.")
+        return image, None
+
+    def _window(self, window):
+        source, s, e = window
+        if isinstance(source, str):
+            df_b, df_p = load_series(source, s, e, store=self.store)
+        else:
+            df_b, df_p = source
+        with self._render_lock:
+            return self.renderer(df_b.loc[s:e], df_p.loc[s:e], s, e)
+
+    def handle(self, horizon, body, content_type):
+        """
+        Classify the image or window of a request.
+
+        Parameters
+        ----------
+        horizon : string
+            Horizon of the model.
+        body : bytes
+            Body of the request.
+        content_type : string
+            Content type of the body; 'application/json' for windows.
+
+        Returns
+        -------
+        response : dict
+            Keys 'horizon', 'probabilities' (per class), 'label' and 'timing'
+            (seconds spent decoding or rendering, queued, in inference and
+            in total, plus the size of the micro-batch).
+        """
+        if horizon not in self.batchers:
+            raise BadRequest("Horizon " + horizon + " is not served.")
+        started = time.perf_counter()
+        image, window = self._parse(horizon, body, content_type)
+        if window is not None:
+            image = self._window(window)
+        prepared = time.perf_counter()
+        output, timing = self.batchers[horizon].submit(image).result()
+        timing['prepare_seconds'] = prepared - started
+        timing['total_seconds'] = time.perf_counter() - started
+        metrics.observe('server_request_seconds', timing['total_seconds'], horizon=horizon)
+        return {'horizon': horizon,
+                'probabilities': {label: float(p) for label, p in zip(LABELS, output)},
+                'label': LABELS[int(np.argmax(output))],
+                'timing': timing}
+
+    def serve(self, port=8080, host='127.0.0.1', block=True):
+        """
+        Parameters
+        ----------
+        port : int, optional
+            Port to listen on. The default is 8080.
+        host : string, optional
+            Address to bind. The default is '127.0.0.1'.
+        block : bool, optional
+            If False, the server runs in a daemon thread. The default is True.
+
+        Returns
+        -------
+        server : http.server.ThreadingHTTPServer
+            The server, once stopped if block is True.
+        """
+        app = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._reply(200, {'horizons': list(app.batchers)})
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def do_POST(self):
+                parts = self.path.strip('/').split('/')
+                if len(parts) != 2 or parts[0] != 'predict':
+                    self._reply(404, {'error': 'not found'})
+                    return
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if parts[1] not in app.batchers:
+                    self._reply(404, {'error': 'horizon ' + parts[1] + ' is not served'})
+                    return
+                try:
+                    self._reply(200, app.handle(parts[1], body, self.headers.get('Content-Type', '')))
+                except BadRequest as error:
+                    self._reply(400, {'error': str(error)})
+                except Exception as error:
+                    self._reply(500, {'error': str(error)})
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        if not block:
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            return self._server
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+        return self._server
+
+    def close(self):
+        """
+        Stop the server and the batchers.
+
+        Returns
+        -------
+        None
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for batcher in self.batchers.values():
+            batcher.close()
+
+def load_test(url, payloads, content_type='image/png', requests=200, concurrency=16):
+    """
+    Send concurrent requests to a running InferenceServer.
+
+    Parameters
+    ----------
+    url : string
+        Endpoint, e.g. 'http://127.0.0.1:8080/predict/30m'.
+    payloads : list
+        Bodies (bytes) sent in turn.
+    content_type : string, optional
+        Content type of the bodies. The default is 'image/png'.
+    requests : int, optional
+        Number of requests. The default is 200.
+    concurrency : int, optional
+        Number of clients sending requests at the same time. The default is 16.
+
+    Returns
+    -------
+    report : dict
+        Throughput (requests per second), latency percentiles (p50, p90,
+        p99 and mean, in seconds), mean micro-batch size and errors.
+    """
+    def send(i):
+        request = Request(url, data=payloads[i % len(payloads)], headers={'Content-Type': content_type})
+        started = time.perf_counter()
+        try:
+            with urlopen(request) as response:
+                reply = json.loads(response.read())
+        except Exception:
+            return None, None
+        return time.perf_counter() - started, reply['timing']['batch_size']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r[0] is not None]
+    latencies = np.array([r[0] for r in ok]) if ok else np.zeros(1)
+    return {'requests': requests, 'concurrency': concurrency, 'errors': requests - len(ok),
+            'throughput': len(ok) / elapsed,
+            'p50': float(np.percentile(latencies, 50)), 'p90': float(np.percentile(latencies, 90)),
+            'p99': float(np.percentile(latencies, 99)), 'mean': float(latencies.mean()),
+            'mean_batch_size': float(np.mean([r[1] for r in ok])) if ok else 0.0}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local IPSRNet inference server with micro-batching.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='Run the server.')
+    serve.add_argument('--horizons', nargs='+', default=['20m', '30m', '60m', '120m'])
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--max-batch', type=int, default=32)
+    serve.add_argument('--max-wait', type=float, default=0.005, help='Seconds.')
+    serve.add_argument('--store', default=None, help='Folder of a DataStore.SeriesStore.')
+    test = commands.add_parser('load-test', help='Measure throughput and latency of a running server.')
+    test.add_argument('images', nargs='+', help='Image files sent in turn.')
+    test.add_argument('--url', default='http://127.0.0.1:8080/predict/30m')
+    test.add_argument('--requests', type=int, default=200)
+    test.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        from DataStore import SeriesStore
+        store = None if args.store is None else SeriesStore(args.store)
+        server = InferenceServer(horizons=tuple(args.horizons), max_batch=args.max_batch, max_wait=args.max_wait, store=store)
+        print('Serving', ', '.join(args.horizons), 'on http://%s:%d' % (args.host, args.port))
+        server.serve(port=args.port, host=args.host)
+    else:
+        payloads = []
+        for path in args.images:
+            with open(path, 'rb') as f:
+                payloads.append(f.read())
+        for concurrency in args.concurrency:
+            report = load_test(args.url, payloads, requests=args.requests, concurrency=concurrency)
+            print(json.dumps(report))
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:34:52 2026
+
+@author: Luís Eduardo Sales do Nascimento
+"""
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from IPSRNet import TIME_WINDOWS, LABELS
+from DataStore import SeriesStore, check_spacecraft, parse_date
+from Render import render_window, window_bounds
+from Metrics import metrics
+
+COLUMNS = ('BTOTAL', 'Np', 'Vp', 'Tp')
+CADENCES = {'ACE': timedelta(seconds=64), 'STA': timedelta(minutes=1), 'STB': timedelta(minutes=1)}
+
+class RingBuffer():
+    def __init__(self, capacity):
+        """
+        Initializes a fixed-size buffer of the latest samples of a parameter.
+
+        Parameters
+        ----------
+        capacity : int
+            Number of samples kept.
+        """
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.full(capacity, np.nan)
+        self.size = 0
+        self._next = 0
+
+    def append(self, times, values):
+        """
+        Parameters
+        ----------
+        times : array
+            Times of the samples, as datetime64[ns], in increasing order.
+        values : array
+            Values of the samples.
+
+        Returns
+        -------
+        n : int
+            Number of samples added. Samples not newer than the last one
+            are ignored.
+        """
+        times = np.asarray(times, dtype='datetime64[ns]').astype(np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if self.size:
+            newer = times > self.times[(self._next - 1) % self.capacity]
+            times, values = times[newer], values[newer]
+        times, values = times[-self.capacity:], values[-self.capacity:]
+        n = len(times)
+        index = (self._next + np.arange(n)) % self.capacity
+        self.times[index] = times
+        self.values[index] = values
+        self._next = (self._next + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return n
+
+    @property
+    def first(self):
+        return pd.Timestamp(self.times[(self._next - self.size) % self.capacity]) if self.size else None
+
+    @property
+    def last(self):
+        return pd.Timestamp(self.times[(self._next - 1) % self.capacity]) if self.size else None
+
+    def series(self):
+        """
+        Returns
+        -------
+        series : pd.Series
+            Buffered samples, oldest first.
+        """
+        index = (self._next - self.size + np.arange(self.size)) % self.capacity
+        return pd.Series(self.values[index], index=pd.to_datetime(self.times[index]))
+
+class StreamingDetector():
+    def __init__(self, spacecraft='ACE', horizon='30m', model=None, thresholds=None, renderer=render_window, on_alert=None):
+        """
+        Initializes a detector fed with samples as they arrive.
+
+        The latest samples of BTOTAL, Np, Vp and Tp are kept in ring buffers
+        sized to one window. Each step classifies the latest complete window,
+        centred time_window minutes before the newest sample, and is only
+        run when new samples have landed. When several cadence steps arrive
+        at once only the newest window is classified, so the cost of a step
+        is always one render and one batch-1 prediction.
+
+        Parameters
+        ----------
+        spacecraft : string, optional
+            Either "ACE", "STA" or "STB" (case-insensitive). The default is 'ACE'.
+        horizon : string, optional
+            Either "20m", "30m", "60m" or "120m". The default is '30m'.
+        model : IPSRNet instance, optional
+            Model for the horizon. If None, the shared instance of
+            Registry.get_model is used. The default is None.
+        thresholds : dict, optional
+            Alert thresholds on Prob FF and Prob FR, e.g. {'FF': 0.5, 'FR': 0.5}.
+            The default is 0.5 for both.
+        renderer : callable, optional
+            Function renderer(df_b, df_p, s, e) returning the image.
+            Raster.rasterize_window gives the lowest latency.
+            The default is Render.render_window.
+        on_alert : callable, optional
+            Called as on_alert(alert) for every alert. The default is None.
+        """
+        self.spacecraft = check_spacecraft(spacecraft)
+        if horizon not in TIME_WINDOWS:
+            raise Exception("Only '20m', '30m', '60m' or '120m' are valid values for 'horizon' parameter.")
+        if model is None:
+            from Registry import get_model
+            model = get_model(horizon)
+        self.horizon = horizon
+        self.time_window = TIME_WINDOWS[horizon]
+        self.model = model
+        self.thresholds = {'FF': 0.5, 'FR': 0.5} if thresholds is None else thresholds
+        self.renderer = renderer
+        self.on_alert = on_alert
+
+        cadence = CADENCES[self.spacecraft].total_seconds()
+        capacity = int(np.ceil(2 * self.time_window * 60 / cadence)) + 2
+        self.buffers = {column: RingBuffer(capacity) for column in COLUMNS}
+        self.output = None
+        self._centre = None
+        self._pending = False
+
+    def push(self, IMF_df=None, plasma_df=None):
+        """
+        Add new samples to the buffers, without classifying.
+
+        Parameters
+        ----------
+        IMF_df : pd.DataFrame, optional
+            New samples with column "BTOTAL". The default is None.
+        plasma_df : pd.DataFrame, optional
+            New samples with columns "Np", "Vp" and "Tp". The default is None.
+
+        Returns
+        -------
+        n : int
+            Number of new samples.
+        """
+        n = 0
+        if IMF_df is not None:
+            n += self.buffers['BTOTAL'].append(IMF_df.index.values, IMF_df['BTOTAL'].values)
+        if plasma_df is not None:
+            for column in ['Np', 'Vp', 'Tp']:
+                n += self.buffers[column].append(plasma_df.index.values, plasma_df[column].values)
+        if n:
+            self._pending = True
+        return n
+
+    def latest_window(self):
+        """
+        Returns
+        -------
+        centre : datetime
+            Centre of the latest complete window, or None if the buffers do
+            not cover a window yet.
+        """
+        if any(buffer.size == 0 for buffer in self.buffers.values()):
+            return None
+        newest = min(buffer.last for buffer in self.buffers.values())
+        oldest = max(buffer.first for buffer in self.buffers.values())
+        centre = newest.floor('min').to_pydatetime() - timedelta(minutes=self.time_window - 1)
+        s, _ = window_bounds(centre, self.time_window)
+        if oldest > s + CADENCES[self.spacecraft]:
+            return None
+        return centre
+
+    def step(self):
+        """
+        Classify the latest window if new samples have landed.
+
+        Returns
+        -------
+        result : dict
+            Keys 'time' (centre of the window), 'output' ([Prob Neg, Prob FF,
+            Prob FR]), 'alerts' (list of alerts raised) and 'latency'
+            (seconds taken by the step), or None if nothing was classified.
+        """
+        if not self._pending:
+            return None
+        self._pending = False
+        centre = self.latest_window()
+        if centre is None or centre == self._centre:
+            return None
+
+        t0 = time.perf_counter()
+        s, e = window_bounds(centre, self.time_window)
+        df_b = self.buffers['BTOTAL'].series().loc[s:e].to_frame('BTOTAL')
+        df_p = pd.DataFrame({c: self.buffers[c].series() for c in ['Np', 'Vp', 'Tp']}).loc[s:e]
+        image = self.renderer(df_b, df_p, s, e)
+        output = self.model.predict(image)
+
+        alerts = []
+        for i, label in enumerate(LABELS):
+            if label not in self.thresholds:
+                continue
+            threshold = self.thresholds[label]
+            previous = 0.0 if self.output is None else self.output[i]
+            if previous < threshold <= output[i]:
+                alerts.append({'time': centre, 'label': label, 'probability': float(output[i]), 'output': output})
+        self.output = output
+        self._centre = centre
+        latency = time.perf_counter() - t0
+
+        metrics.observe('stream_step_seconds', latency, horizon=self.horizon)
+        for alert in alerts:
+            metrics.count('stream_alerts_total', horizon=self.horizon, label=alert['label'])
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        return {'time': centre, 'output': output, 'alerts': alerts, 'latency': latency}
+
+    def update(self, IMF_df=None, plasma_df=None):
+        """
+        Add new samples and classify the latest window.
+
+        Returns
+        -------
+        result : dict
+            See step.
+        """
+        self.push(IMF_df, plasma_df)
+        return self.step()
+
+    def run(self, source):
+        """
+        Parameters
+        ----------
+        source : iterable
+            (IMF_df, plasma_df) tuples of new samples, e.g. a ReplaySource.
+
+        Yields
+        ------
+        result : dict
+            Result of every classified step, see step.
+        """
+        for IMF_df, plasma_df in source:
+            result = self.update(IMF_df, plasma_df)
+            if result is not None:
+                yield result
+
+class ReplaySource():
+    def __init__(self, store, spacecraft, start, end, samples=1, speed=None):
+        """
+        Initializes a source replaying recorded series as if they arrived live.
+
+        Parameters
+        ----------
+        store : DataStore.SeriesStore or string
+            Store holding the recorded days, or its folder (then read offline).
+        spacecraft : string
+            Either "ACE", "STA" or "STB" (case-insensitive).
+        start : string or datetime
+            Start of the replay. If a string, in the format "%Y-%m-%d %H:%M:%S".
+        end : string or datetime
+            End of the replay. If a string, in the format "%Y-%m-%d %H:%M:%S".
+        samples : int, optional
+            Number of cadence steps delivered at a time. The default is 1.
+        speed : float, optional
+            Replay speed relative to real time (e.g. 60 delivers one minute
+            of data per second). If None, samples are delivered as fast as
+            they are consumed. The default is None.
+        """
+        self.store = SeriesStore(store, offline=True) if isinstance(store, str) else store
+        self.spacecraft = check_spacecraft(spacecraft)
+        self.start = parse_date(start, 'start')
+        self.end = parse_date(end, 'end')
+        self.step = CADENCES[self.spacecraft] * samples
+        self.speed = speed
+
+    def __iter__(self):
+        """
+        Yields
+        ------
+        IMF_df : pd.DataFrame
+            Samples of "BTOTAL" that arrived during the step.
+        plasma_df : pd.DataFrame
+            Samples of "Np", "Vp" and "Tp" that arrived during the step.
+        """
+        day = datetime(self.start.year, self.start.month, self.start.day)
+        tick = self.start
+        rest_b = rest_p = None
+        while day <= self.end:
+            day_end = min(day + timedelta(days=1) - timedelta(microseconds=1), self.end)
+            df_b, df_p = self.store.get(self.spacecraft, max(day, self.start), day_end)
+            if rest_b is not None:
+                # samples of the previous day after its last tick
+                df_b, df_p = pd.concat([rest_b, df_b]), pd.concat([rest_p, df_p])
+            i_b = i_p = 0
+            while tick <= day_end:
+                j_b = df_b.index.searchsorted(tick, side='right')
+                j_p = df_p.index.searchsorted(tick, side='right')
+                if self.speed:
+                    time.sleep(self.step.total_seconds() / self.speed)
+                yield df_b.iloc[i_b:j_b], df_p.iloc[i_p:j_p]
+                i_b, i_p = j_b, j_p
+                tick += self.step
+            rest_b, rest_p = df_b.iloc[i_b:], df_p.iloc[i_p:]
+            day += timedelta(days=1)
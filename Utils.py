@@ -5,9 +5,7 @@ Created on Sat Nov 23 20:46:05 2024
 @author: luise
 """
 
-from keras import ops
 import os
-import cv2
 
 def createFolder(caminho):
     """
@@ -41,6 +39,7 @@ def recall(y_true, y_pred):
     -------
     recall_keras : The recall value.
     """
+    from keras import ops
     
     true_positives = ops.sum(ops.round(ops.clip(y_true * y_pred, 0, 1)))
     possible_positives = ops.sum(ops.round(ops.clip(y_true, 0, 1)))
@@ -61,6 +60,7 @@ def load_image(path, target_size=(224,224)):
     img : array
         Output image.
     """
+    import cv2
     
     img = cv2.imread(path)
     img = cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)